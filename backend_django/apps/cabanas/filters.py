@@ -0,0 +1,128 @@
+# apps/cabanas/filters.py
+
+from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from .models import Cabana, Servicio
+
+
+def leer_bbox(texto):
+    """(sur, oeste, norte, este) de un parámetro bbox=oeste,sur,este,norte"""
+    try:
+        oeste, sur, este, norte = (float(valor) for valor in texto.split(','))
+    except ValueError:
+        raise ValidationError({'bbox': 'Usa el formato oeste,sur,este,norte en grados.'})
+    if not (-90 <= sur <= norte <= 90 and -180 <= oeste <= 180 and -180 <= este <= 180):
+        raise ValidationError({'bbox': 'Coordenadas fuera de rango o sur mayor que norte.'})
+    return sur, oeste, norte, este
+
+
+class CabanaFilter(filters.FilterSet):
+    """
+    Filtros del catálogo de cabañas, incluida la búsqueda por fechas y huéspedes
+    """
+    fecha_inicio = filters.DateFilter(method='filtrar_disponibilidad')
+    fecha_fin = filters.DateFilter(method='filtrar_disponibilidad')
+    huespedes = filters.NumberFilter(field_name='capacidad', lookup_expr='gte')
+    precio_min = filters.NumberFilter(field_name='costo_por_noche', lookup_expr='gte')
+    precio_max = filters.NumberFilter(field_name='costo_por_noche', lookup_expr='lt')
+    # Cabañas con todos los servicios indicados (?servicios=1&servicios=3)
+    servicios = filters.ModelMultipleChoiceFilter(queryset=Servicio.objects.all(), conjoined=True)
+
+    class Meta:
+        model = Cabana
+        fields = ['estado', 'capacidad', 'permite_mascotas', 'team']
+
+    def filtrar_disponibilidad(self, queryset, name, value):
+        fecha_inicio = self.form.cleaned_data.get('fecha_inicio')
+        fecha_fin = self.form.cleaned_data.get('fecha_fin')
+
+        if not fecha_inicio or not fecha_fin:
+            raise ValidationError({'detail': 'Se requieren fecha_inicio y fecha_fin juntas.'})
+        if fecha_fin <= fecha_inicio:
+            raise ValidationError({'fecha_fin': 'Debe ser posterior a fecha_inicio.'})
+
+        # Ambas fechas llaman a este método; el filtro se aplica una sola vez
+        if name != 'fecha_inicio':
+            return queryset
+        return queryset.disponibles_entre(fecha_inicio, fecha_fin)
+
+
+class BusquedaCabanasFilter(BaseFilterBackend):
+    """
+    Búsqueda de texto con ?q= (se acepta también ?search=), ordenada por relevancia
+    salvo que el cliente pida otro orden con ?ordering=. Va después de OrderingFilter.
+    """
+    parametros = ['q', 'search']
+    # Las búsquedas más largas se recortan
+    max_longitud = 100
+
+    def get_texto(self, request):
+        for parametro in self.parametros:
+            texto = request.query_params.get(parametro, '').strip()
+            if texto:
+                return texto[:self.max_longitud]
+        return ''
+
+    def reordena(self, request):
+        return bool(self.get_texto(request))
+
+    def filter_queryset(self, request, queryset, view):
+        texto = self.get_texto(request)
+        if not texto:
+            return queryset
+        queryset = queryset.buscar(texto)
+        if not request.query_params.get(OrderingFilter.ordering_param):
+            queryset = queryset.order_by('-relevancia', '-id')
+        return queryset
+
+
+class UbicacionCabanasFilter(BaseFilterBackend):
+    """
+    Búsqueda geográfica: ?lat=&lng=&radio_km= (cabañas dentro del radio) y
+    ?bbox=oeste,sur,este,norte (dentro del rectángulo). Ordena por distancia al
+    punto, o al centro del rectángulo, salvo que se pida otro orden con ?ordering=.
+    Va después de OrderingFilter.
+    """
+    radio_km_por_defecto = 50
+    max_radio_km = 500
+
+    def reordena(self, request):
+        return any(parametro in request.query_params for parametro in ('lat', 'lng', 'bbox'))
+
+    def _numero(self, request, parametro, minimo, maximo):
+        try:
+            valor = float(request.query_params[parametro])
+        except ValueError:
+            raise ValidationError({parametro: 'Debe ser un número.'})
+        if not minimo <= valor <= maximo:
+            raise ValidationError({parametro: f'Debe estar entre {minimo} y {maximo}.'})
+        return valor
+
+    def filter_queryset(self, request, queryset, view):
+        if not self.reordena(request):
+            return queryset
+
+        punto = None
+        if 'lat' in request.query_params or 'lng' in request.query_params:
+            if not ('lat' in request.query_params and 'lng' in request.query_params):
+                raise ValidationError({'detail': 'Se requieren lat y lng juntas.'})
+            punto = (self._numero(request, 'lat', -90, 90), self._numero(request, 'lng', -180, 180))
+
+        if 'bbox' in request.query_params:
+            sur, oeste, norte, este = leer_bbox(request.query_params['bbox'])
+            queryset = queryset.en_caja(sur, oeste, norte, este)
+            if punto is None:
+                centro_lng = (oeste + este) / 2 if oeste <= este else ((oeste + este + 360) / 2 + 180) % 360 - 180
+                punto = ((sur + norte) / 2, centro_lng)
+            queryset = queryset.con_distancia(*punto)
+        else:
+            radio_km = self.radio_km_por_defecto
+            if 'radio_km' in request.query_params:
+                radio_km = self._numero(request, 'radio_km', 0, self.max_radio_km)
+            queryset = queryset.cerca_de(*punto, radio_km)
+
+        if not request.query_params.get(OrderingFilter.ordering_param):
+            queryset = queryset.order_by('distancia_km', 'id')
+        return queryset
@@ -0,0 +1,167 @@
+# apps/cabanas/geo.py
+
+import math
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import (
+    ASin, Cos, Floor, Greatest, Least, Ln, Pi, Power, Radians, Sin, Sqrt, Tan,
+)
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Con 9 caracteres cada celda mide unos 5 x 5 m
+PRECISION_GEOHASH = 9
+# Celdas como máximo en el prefiltro; por encima se usa una precisión más gruesa
+MAX_CELDAS = 16
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = 111.32
+
+
+def codificar_geohash(lat, lng, precision=PRECISION_GEOHASH):
+    """Geohash de un punto: alterna bits de longitud y latitud en base 32"""
+    intervalo_lat, intervalo_lng = [-90.0, 90.0], [-180.0, 180.0]
+    caracteres, valor, bit, es_lng = [], 0, 0, True
+    while len(caracteres) < precision:
+        intervalo, coordenada = (intervalo_lng, lng) if es_lng else (intervalo_lat, lat)
+        medio = (intervalo[0] + intervalo[1]) / 2
+        if coordenada >= medio:
+            valor = (valor << 1) | 1
+            intervalo[0] = medio
+        else:
+            valor <<= 1
+            intervalo[1] = medio
+        es_lng = not es_lng
+        bit += 1
+        if bit == 5:
+            caracteres.append(BASE32[valor])
+            valor, bit = 0, 0
+    return ''.join(caracteres)
+
+
+def tamano_celda(precision):
+    """(alto, ancho) en grados de una celda geohash de esta precisión"""
+    bits = 5 * precision
+    return 180 / 2 ** (bits // 2), 360 / 2 ** ((bits + 1) // 2)
+
+
+def caja_alrededor(lat, lng, radio_km):
+    """(sur, oeste, norte, este) que contiene el círculo; oeste > este si cruza el antimeridiano"""
+    delta_lat = radio_km / KM_POR_GRADO
+    sur, norte = lat - delta_lat, lat + delta_lat
+    if sur <= -90 or norte >= 90:
+        # El círculo contiene un polo: todas las longitudes
+        return max(sur, -90.0), -180.0, min(norte, 90.0), 180.0
+    delta_lng = radio_km / (KM_POR_GRADO * math.cos(math.radians(lat)))
+    if delta_lng >= 180:
+        return sur, -180.0, norte, 180.0
+    oeste = (lng - delta_lng + 540) % 360 - 180
+    este = (lng + delta_lng + 540) % 360 - 180
+    return sur, oeste, norte, este
+
+
+def celdas_caja(sur, oeste, norte, este, max_celdas=MAX_CELDAS):
+    """
+    Prefijos geohash que cubren la caja, con la precisión más fina que no pase de
+    max_celdas (por cada lado del antimeridiano). None si ni un carácter alcanza.
+    """
+    if oeste > este:
+        partes = [celdas_caja(sur, oeste, norte, 180.0, max_celdas), celdas_caja(sur, -180.0, norte, este, max_celdas)]
+        return None if None in partes else sorted(set(partes[0]) | set(partes[1]))
+
+    for precision in range(PRECISION_GEOHASH, 0, -1):
+        alto, ancho = tamano_celda(precision)
+        filas = range(int((sur + 90) // alto), int(min(norte + 90, 180 - 1e-9) // alto) + 1)
+        columnas = range(int((oeste + 180) // ancho), int(min(este + 180, 360 - 1e-9) // ancho) + 1)
+        if len(filas) * len(columnas) <= max_celdas:
+            return sorted({
+                codificar_geohash(-90 + (fila + 0.5) * alto, -180 + (columna + 0.5) * ancho, precision)
+                for fila in filas for columna in columnas
+            })
+    return None
+
+
+def distancia_km(lat, lng, campo_lat='latitud', campo_lng='longitud'):
+    """Expresión SQL con la distancia haversine (km) desde el punto a las coordenadas del modelo"""
+    lat = Value(float(lat), output_field=FloatField())
+    lng = Value(float(lng), output_field=FloatField())
+    a = (
+        Power(Sin(Radians(F(campo_lat) - lat) / 2), 2)
+        + Cos(Radians(lat)) * Cos(Radians(F(campo_lat))) * Power(Sin(Radians(F(campo_lng) - lng) / 2), 2)
+    )
+    # Least evita que el redondeo deje el argumento de ASIN por encima de 1
+    return 2 * RADIO_TIERRA_KM * ASin(Least(Sqrt(a), Value(1.0)), output_field=FloatField())
+
+
+# Mapa: teselas XYZ (Web Mercator), como las de los mapas en el navegador
+LATITUD_MAXIMA_MERCATOR = 85.05112878
+
+
+def tesela(lat, lng, zoom):
+    """(x, y) de la tesela que contiene el punto"""
+    n = 2 ** zoom
+    lat = max(-LATITUD_MAXIMA_MERCATOR, min(LATITUD_MAXIMA_MERCATOR, lat))
+    x = int((lng + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def caja_tesela(zoom, x, y):
+    """(sur, oeste, norte, este) de una tesela"""
+    n = 2 ** zoom
+
+    def latitud(fila):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * fila / n))))
+
+    return latitud(y + 1), x / n * 360 - 180, latitud(y), (x + 1) / n * 360 - 180
+
+
+def teselas_caja(sur, oeste, norte, este, zoom):
+    """Teselas (x, y) que cubren la caja; oeste > este si cruza el antimeridiano"""
+    x_oeste, y_norte = tesela(norte, oeste, zoom)
+    x_este, y_sur = tesela(sur, este, zoom)
+    if oeste <= este:
+        columnas = range(x_oeste, x_este + 1)
+    elif x_oeste > x_este:
+        columnas = [*range(x_oeste, 2 ** zoom), *range(0, x_este + 1)]
+    else:
+        # Cruza el antimeridiano y da la vuelta entera
+        columnas = range(2 ** zoom)
+    return [(x, y) for x in columnas for y in range(y_norte, y_sur + 1)]
+
+
+def caja_teselas(zoom, teselas):
+    """(sur, oeste, norte, este) que cubre las teselas, dadas en el orden de teselas_caja"""
+    filas = [y for _, y in teselas]
+    sur, oeste, _, _ = caja_tesela(zoom, teselas[0][0], max(filas))
+    _, _, norte, este = caja_tesela(zoom, teselas[-1][0], min(filas))
+    if len({x for x, _ in teselas}) == 2 ** zoom:
+        oeste, este = -180.0, 180.0
+    return sur, oeste, norte, este
+
+
+def tesela_sql(zoom, campo_lat='latitud', campo_lng='longitud'):
+    """Expresiones SQL con la x y la y de la tesela de las coordenadas del modelo"""
+    n = Value(float(2 ** zoom), output_field=FloatField())
+    ultima = Value(float(2 ** zoom - 1), output_field=FloatField())
+    cero = Value(0.0, output_field=FloatField())
+    lat = Radians(Greatest(
+        Least(F(campo_lat), Value(LATITUD_MAXIMA_MERCATOR)), Value(-LATITUD_MAXIMA_MERCATOR),
+        output_field=FloatField(),
+    ))
+    x = Floor((F(campo_lng) + Value(180.0)) / Value(360.0) * n)
+    # asinh(tan(lat)) = ln(tan(lat) + 1 / cos(lat)), igual que en tesela()
+    y = Floor((Value(1.0) - Ln(Tan(lat) + Value(1.0) / Cos(lat)) / Pi()) / Value(2.0) * n)
+    return (
+        Greatest(Least(x, ultima), cero, output_field=FloatField()),
+        Greatest(Least(y, ultima), cero, output_field=FloatField()),
+    )
+
+
+def precision_para_zoom(zoom):
+    """
+    Precisión de geohash cuyas celdas miden como mucho un cuarto del ancho de una
+    tesela de este zoom: la rejilla con la que se agrupan las cabañas en el mapa.
+    """
+    precision = 1
+    while (5 * precision + 1) // 2 < zoom + 2 and precision < PRECISION_GEOHASH:
+        precision += 1
+    return precision
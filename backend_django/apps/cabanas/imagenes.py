@@ -0,0 +1,156 @@
+# apps/cabanas/imagenes.py
+
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Anchos (px) de las variantes WebP; la de JPEG usa el mayor como respaldo
+ANCHOS_VARIANTES = (320, 640, 1280)
+CALIDAD_WEBP = 80
+CALIDAD_JPEG = 82
+# Lado mayor (px) con el que se guarda el original tras procesarlo
+LADO_MAXIMO_ORIGINAL = 2560
+# Fondo sobre el que se aplanan las zonas transparentes al pasar a JPEG
+COLOR_FONDO_JPEG = (255, 255, 255)
+
+
+def _codificar(imagen, formato, **opciones):
+    buffer = BytesIO()
+    imagen.save(buffer, format=formato, **opciones)
+    return ContentFile(buffer.getvalue())
+
+
+def _guardar(imagen, ruta, formato, **opciones):
+    contenido = _codificar(imagen, formato, **opciones)
+    if default_storage.exists(ruta):
+        default_storage.delete(ruta)
+    return default_storage.save(ruta, contenido)
+
+
+def _tiene_transparencia(imagen):
+    return imagen.mode in ('RGBA', 'LA', 'PA') or 'transparency' in imagen.info
+
+
+def _rgb_o_rgba(imagen):
+    """RGBA si la imagen tiene transparencia (la conservan PNG y WebP), si no RGB"""
+    return imagen.convert('RGBA' if _tiene_transparencia(imagen) else 'RGB')
+
+
+def _aplanar(imagen):
+    """RGB para JPEG: lo transparente queda sobre COLOR_FONDO_JPEG, no en negro"""
+    if not _tiene_transparencia(imagen):
+        return imagen.convert('RGB')
+    imagen = imagen.convert('RGBA')
+    fondo = Image.new('RGB', imagen.size, COLOR_FONDO_JPEG)
+    fondo.paste(imagen, mask=imagen.getchannel('A'))
+    return fondo
+
+
+def _redimensionar(original, ancho):
+    if original.width <= ancho:
+        return original
+    alto = round(original.height * ancho / original.width)
+    return original.resize((ancho, alto), Image.Resampling.LANCZOS)
+
+
+def normalizar_original(imagen_cabana):
+    """
+    Reescribe el archivo subido con la orientación EXIF aplicada, sin metadatos (EXIF
+    y GPS incluidos) y con el lado mayor limitado a LADO_MAXIMO_ORIGINAL. Conserva el
+    formato si es JPEG, PNG o WebP; cualquier otro se guarda como JPEG con un nombre
+    nuevo. No guarda el modelo ni borra el archivo anterior si cambia de nombre.
+    """
+    with imagen_cabana.imagen.open('rb') as archivo:
+        original = Image.open(archivo)
+        formato = original.format if original.format in ('JPEG', 'PNG', 'WEBP') else 'JPEG'
+        icc_profile = original.info.get('icc_profile')
+        imagen = ImageOps.exif_transpose(original)
+        imagen.thumbnail((LADO_MAXIMO_ORIGINAL, LADO_MAXIMO_ORIGINAL), Image.Resampling.LANCZOS)
+
+    opciones = {'icc_profile': icc_profile} if icc_profile else {}
+    if formato == 'JPEG':
+        imagen = _aplanar(imagen)
+        opciones.update(quality=CALIDAD_JPEG, optimize=True, progressive=True)
+    elif formato == 'WEBP':
+        opciones.update(quality=CALIDAD_WEBP)
+
+    raiz, extension = os.path.splitext(imagen_cabana.imagen.name)
+    if formato == 'JPEG' and extension.lower() not in ('.jpg', '.jpeg'):
+        # El almacenamiento elige un nombre libre para no pisar el archivo de otra imagen
+        ruta = default_storage.save(f'{raiz}.jpg', _codificar(imagen, formato, **opciones))
+    else:
+        ruta = _guardar(imagen, imagen_cabana.imagen.name, formato, **opciones)
+    # Asignar la ruta (y no solo .name) descarta el archivo abierto en caché
+    imagen_cabana.imagen = ruta
+    return ruta
+
+
+def borrar_variantes(imagen_cabana):
+    """Borra del almacenamiento los archivos de las variantes de una imagen"""
+    variantes = imagen_cabana.variantes or {}
+    for ruta in [*variantes.get('webp', {}).values(), variantes.get('jpeg')]:
+        if ruta and default_storage.exists(ruta):
+            default_storage.delete(ruta)
+
+
+def generar_variantes(imagen_cabana, guardar=True):
+    """
+    Genera las versiones reducidas de una ImagenCabana: una WebP por cada ancho de
+    ANCHOS_VARIANTES (sin ampliar las imágenes pequeñas) y una JPEG de respaldo.
+    Guarda las rutas en imagen_cabana.variantes (y el modelo, salvo guardar=False).
+    """
+    borrar_variantes(imagen_cabana)
+
+    with imagen_cabana.imagen.open('rb') as archivo:
+        original = Image.open(archivo)
+        # Aplicar la orientación EXIF antes de redimensionar; las variantes no llevan EXIF
+        original = _rgb_o_rgba(ImageOps.exif_transpose(original))
+
+    carpeta = os.path.join('cabanas', 'variantes', str(imagen_cabana.pk))
+    webp = {}
+    for ancho in ANCHOS_VARIANTES:
+        variante = _redimensionar(original, ancho)
+        webp[str(variante.width)] = _guardar(
+            variante, os.path.join(carpeta, f'{variante.width}.webp'), 'WEBP', quality=CALIDAD_WEBP
+        )
+        if variante is original:
+            # La imagen ya es más estrecha que este ancho: no hay más tamaños útiles
+            break
+
+    respaldo = _redimensionar(original, ANCHOS_VARIANTES[-1])
+    jpeg = _guardar(
+        _aplanar(respaldo), os.path.join(carpeta, f'{respaldo.width}.jpg'), 'JPEG',
+        quality=CALIDAD_JPEG, optimize=True, progressive=True
+    )
+
+    imagen_cabana.variantes = {'origen': imagen_cabana.imagen.name, 'webp': webp, 'jpeg': jpeg}
+    if guardar:
+        imagen_cabana.save(update_fields=['variantes'])
+    return imagen_cabana.variantes
+
+
+def srcset(imagen_cabana, request=None):
+    """
+    Mapa de URLs de las variantes: {'webp': {'320w': url, ...}, 'jpeg': url}.
+    Devuelve None si aún no se generaron.
+    """
+    return srcset_variantes(imagen_cabana.variantes, request)
+
+
+def srcset_variantes(variantes, request=None):
+    """Como srcset(), a partir del campo variantes ya leído"""
+    variantes = variantes or {}
+    if not variantes.get('webp'):
+        return None
+
+    def url(ruta):
+        url = default_storage.url(ruta)
+        return request.build_absolute_uri(url) if request else url
+
+    return {
+        'webp': {f'{ancho}w': url(ruta) for ancho, ruta in variantes['webp'].items()},
+        'jpeg': url(variantes['jpeg']),
+    }
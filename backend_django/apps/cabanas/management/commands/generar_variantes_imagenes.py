@@ -0,0 +1,41 @@
+# apps/cabanas/management/commands/generar_variantes_imagenes.py
+
+from django.core.management.base import BaseCommand
+
+from apps.cabanas.imagenes import generar_variantes
+from apps.cabanas.models import ImagenCabana
+
+
+class Command(BaseCommand):
+    help = "Genera las versiones reducidas (WebP y JPEG) de las imágenes de cabañas que no las tienen"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cabana', type=int, action='append', dest='cabanas',
+            help="ID de la cabaña cuyas imágenes procesar (se puede repetir). Por defecto, todas."
+        )
+        parser.add_argument(
+            '--todas', action='store_true',
+            help="Regenera también las imágenes que ya tienen variantes."
+        )
+
+    def handle(self, *args, **options):
+        imagenes = ImagenCabana.objects.order_by('id')
+        if options['cabanas']:
+            imagenes = imagenes.filter(cabana_id__in=options['cabanas'])
+        if not options['todas']:
+            imagenes = imagenes.filter(variantes={})
+
+        generadas = errores = 0
+        for imagen in imagenes.iterator():
+            try:
+                generar_variantes(imagen)
+                generadas += 1
+            except (OSError, ValueError) as e:
+                # Archivo ausente o que Pillow no puede leer: se informa y se sigue
+                errores += 1
+                self.stdout.write(self.style.WARNING(f"Imagen {imagen.pk} ({imagen.imagen.name}): {e}"))
+
+        self.stdout.write(self.style.SUCCESS(f"{generadas} imágenes procesadas."))
+        if errores:
+            self.stdout.write(self.style.WARNING(f"{errores} imágenes no se pudieron procesar."))
@@ -0,0 +1,25 @@
+# apps/cabanas/management/commands/recalcular_calificaciones.py
+
+from django.core.management.base import BaseCommand
+
+from apps.cabanas.models import Cabana
+from apps.cabanas.signals import marcar_cabanas_actualizadas
+
+
+class Command(BaseCommand):
+    help = "Reconstruye la suma, el número de reseñas y el promedio de calificación de las cabañas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cabana', type=int, action='append', dest='cabanas',
+            help="ID de la cabaña a recalcular (se puede repetir). Por defecto, todas."
+        )
+
+    def handle(self, *args, **options):
+        cabanas = Cabana.objects.all()
+        if options['cabanas']:
+            cabanas = cabanas.filter(pk__in=options['cabanas'])
+
+        actualizadas = cabanas.recalcular_calificaciones()
+        marcar_cabanas_actualizadas(cabanas.values_list('pk', flat=True))
+        self.stdout.write(self.style.SUCCESS(f"{actualizadas} cabañas recalculadas."))
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:07
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def rellenar_calificaciones(apps, schema_editor):
+    Cabana = apps.get_model('cabanas', 'Cabana')
+    Resena = apps.get_model('cabanas', 'Resena')
+    resenas = Resena.objects.filter(cabana=OuterRef('pk')).order_by().values('cabana')
+    Cabana.objects.update(
+        suma_calificaciones=Coalesce(Subquery(resenas.annotate(s=Sum('calificacion')).values('s')), 0),
+        num_resenas=Coalesce(Subquery(resenas.annotate(c=Count('id')).values('c')), 0),
+        calificacion_promedio=Coalesce(
+            Subquery(resenas.annotate(a=Avg('calificacion')).values('a')),
+            Value(0.0),
+            output_field=FloatField(),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cabanas', '0001_initial'),
+        ('teams', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cabana',
+            name='calificacion_promedio',
+            field=models.DecimalField(decimal_places=1, default=0, editable=False, max_digits=2),
+        ),
+        migrations.AddField(
+            model_name='cabana',
+            name='num_resenas',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cabana',
+            name='suma_calificaciones',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='cabana',
+            index=models.Index(fields=['estado', '-calificacion_promedio'], name='cabanas_cab_estado_6c5407_idx'),
+        ),
+        migrations.RunPython(rellenar_calificaciones, migrations.RunPython.noop),
+    ]
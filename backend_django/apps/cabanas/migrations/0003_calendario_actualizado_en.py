@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cabanas', '0002_calificaciones_agregadas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cabana',
+            name='calendario_actualizado_en',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cabanas', '0003_calendario_actualizado_en'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagencabana',
+            name='variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cabanas', '0004_imagen_variantes'),
+    ]
+
+    operations = [
+        # Las imágenes ya subidas se consideran listas; las nuevas empiezan procesándose
+        migrations.AddField(
+            model_name='imagencabana',
+            name='estado',
+            field=models.CharField(choices=[('procesando', 'Procesando'), ('lista', 'Lista'), ('error', 'Error')], default='lista', editable=False, max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='imagencabana',
+            name='estado',
+            field=models.CharField(choices=[('procesando', 'Procesando'), ('lista', 'Lista'), ('error', 'Error')], default='procesando', editable=False, max_length=20),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:37
+
+import apps.cabanas.models
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def rellenar_vectores(apps, schema_editor):
+    """Mismo vector que CabanaQuerySet.actualizar_vector_busqueda, para las cabañas existentes"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Cabana = apps.get_model('cabanas', 'Cabana')
+    Servicio = apps.get_model('cabanas', 'Servicio')
+    servicios = Servicio.objects.filter(cabana=OuterRef('pk')).order_by().values('cabana').annotate(
+        nombres=StringAgg('nombre', ' ')
+    ).values('nombres')
+    Cabana.objects.update(vector_busqueda=(
+        SearchVector('nombre', weight='A', config='spanish')
+        + SearchVector('descripcion', weight='B', config='spanish')
+        + SearchVector(Subquery(servicios), weight='C', config='spanish')
+        + SearchVector('reglas_casa', weight='D', config='spanish')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cabanas', '0005_imagen_estado'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='cabana',
+            name='vector_busqueda',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='cabana',
+            index=apps.cabanas.models.IndiceGin(fields=['vector_busqueda'], name='cabana_vector_busqueda_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='cabana',
+            index=apps.cabanas.models.IndiceGin(
+                django.contrib.postgres.indexes.OpClass('nombre', name='gin_trgm_ops'), name='cabana_nombre_trgm_gin'
+            ),
+        ),
+        migrations.RunPython(rellenar_vectores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:41
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cabanas', '0006_busqueda'),
+        ('teams', '0002_team_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cabana',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='cabana',
+            name='latitud',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='cabana',
+            name='longitud',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddIndex(
+            model_name='cabana',
+            index=models.Index(fields=['geohash'], name='cabana_geohash_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -1,10 +1,21 @@
 # apps/cabanas/models.py - Versión completada
 
-from django.db import models
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, SearchVectorField, TrigramWordSimilarity,
+)
+from django.db import connections, models
+from django.db.models import (
+    Avg, Case, Count, Exists, F, FloatField, OuterRef, Prefetch, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Cast, Coalesce, Substr
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.text import slugify
 from apps.usuarios.models import Usuario
 from apps.teams.models import Team
+from myproject.slugs import crear_con_valor_unico
+from .geo import caja_alrededor, celdas_caja, codificar_geohash, distancia_km, tesela_sql
 
 
 class Servicio(models.Model):
@@ -22,6 +33,292 @@ class Servicio(models.Model):
         ordering = ['nombre']
 
 
+# Reseñas que se incluyen en el detalle de una cabaña; el resto se pagina aparte
+RESENAS_EN_DETALLE = 5
+
+# Caracteres de la descripción que se envían en los listados
+LONGITUD_EXTRACTO = 200
+# Columnas de Cabana que se leen para los listados (ver valores_listado)
+CAMPOS_LISTADO = [
+    'id', 'slug', 'nombre', 'capacidad', 'costo_por_noche', 'estado', 'superficie',
+    'numero_habitaciones', 'numero_banos', 'permite_mascotas', 'latitud', 'longitud',
+    'calificacion_promedio', 'num_resenas', 'creada_en',
+]
+
+# Búsqueda de texto completo: configuración de PostgreSQL y peso de cada campo
+# (los mismos que aplica ts_rank por defecto a las categorías A-D)
+CONFIGURACION_BUSQUEDA = 'spanish'
+PESOS_BUSQUEDA = {'A': 1.0, 'B': 0.4, 'C': 0.2, 'D': 0.1}
+# Máximo de palabras de la búsqueda que se tienen en cuenta fuera de PostgreSQL
+MAX_TERMINOS_BUSQUEDA = 5
+
+# Rangos de las facetas del catálogo: capacidad inclusiva y precio por noche (MXN)
+# de desde (incluido) a hasta (excluido); None deja el rango abierto
+RANGOS_CAPACIDAD = [(1, 2), (3, 4), (5, 6), (7, None)]
+RANGOS_PRECIO = [(0, 1000), (1000, 2000), (2000, 4000), (4000, None)]
+
+
+class IndiceGin(GinIndex):
+    """
+    GinIndex que solo se crea en PostgreSQL. En otras bases de datos (SQLite en los
+    tests) la búsqueda no lo usa y las migraciones no ejecutan nada.
+    """
+    sin_postgresql = '-- Índice GIN: solo en PostgreSQL'
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return self.sin_postgresql
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+    def remove_sql(self, model, schema_editor, **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return self.sin_postgresql
+        return super().remove_sql(model, schema_editor, **kwargs)
+
+
+def _vector_busqueda():
+    """Nombre (A), descripción (B), nombres de servicios (C) y reglas de la casa (D)"""
+    servicios = Servicio.objects.filter(cabana=OuterRef('pk')).order_by().values('cabana').annotate(
+        nombres=StringAgg('nombre', ' ')
+    ).values('nombres')
+    return (
+        SearchVector('nombre', weight='A', config=CONFIGURACION_BUSQUEDA)
+        + SearchVector('descripcion', weight='B', config=CONFIGURACION_BUSQUEDA)
+        + SearchVector(Subquery(servicios), weight='C', config=CONFIGURACION_BUSQUEDA)
+        + SearchVector('reglas_casa', weight='D', config=CONFIGURACION_BUSQUEDA)
+    )
+
+
+class CabanaQuerySet(models.QuerySet):
+
+    def valores_listado(self, campos=None):
+        """
+        Filas (diccionarios) para los listados, sin instanciar modelos: solo las
+        columnas que se muestran, el nombre del equipo por JOIN y la descripción
+        recortada en la base de datos (un carácter de más indica que sigue). Los
+        servicios y la imagen principal los carga CabanaListadoSerializer por página.
+        Con campos (los del listado que se envían) solo se leen los que hacen falta;
+        id y creada_en siempre, porque los usan las cargas por página y el cursor.
+        """
+        if campos is not None:
+            campos = set(campos) | {'id', 'creada_en'}
+
+        def lee(campo):
+            return campos is None or campo in campos
+
+        # num_resenas se envía como total_resenas
+        columnas = [
+            columna for columna in CAMPOS_LISTADO
+            if lee('total_resenas' if columna == 'num_resenas' else columna)
+        ]
+        anotaciones = {}
+        if lee('descripcion'):
+            anotaciones['descripcion_extracto'] = Substr('descripcion', 1, LONGITUD_EXTRACTO + 1)
+        if lee('team_name'):
+            anotaciones['team_name'] = F('team__name')
+        return self.values(*columnas, **anotaciones)
+
+    def with_detail_data(self):
+        """
+        Carga lo que necesita el detalle: equipo, servicios, imágenes y solo las
+        últimas RESENAS_EN_DETALLE reseñas por cabaña (el prefetch recortado usa
+        una función de ventana, así que no se leen las demás reseñas).
+        """
+        return self.select_related('team').defer('vector_busqueda').prefetch_related(
+            'servicios',
+            'imagenes',
+            Prefetch(
+                'resenas',
+                queryset=Resena.objects.select_related('usuario__persona').order_by(
+                    '-fecha_creacion', '-id'
+                )[:RESENAS_EN_DETALLE],
+                to_attr='resenas_recientes',
+            ),
+        )
+
+    def disponibles_entre(self, fecha_inicio, fecha_fin):
+        """
+        Excluye las cabañas con alguna noche ocupada en el rango, usando un único
+        NOT EXISTS sobre el índice (cabana, fecha) de OcupacionNoche.
+        """
+        from apps.reservas.models import OcupacionNoche
+
+        ocupadas = OcupacionNoche.objects.filter(
+            cabana=OuterRef('pk'),
+            fecha__gte=fecha_inicio,
+            fecha__lt=fecha_fin,
+        )
+        return self.filter(~Exists(ocupadas))
+
+    def aplicar_delta_calificacion(self, delta_suma, delta_num):
+        """
+        Ajusta los agregados de calificación con expresiones F en un solo UPDATE,
+        sin leer la cabaña ni recalcular sobre todas sus reseñas.
+        """
+        suma = F('suma_calificaciones') + delta_suma
+        num = F('num_resenas') + delta_num
+        return self.update(
+            suma_calificaciones=suma,
+            num_resenas=num,
+            calificacion_promedio=Case(
+                When(num_resenas__gt=-delta_num, then=Cast(suma, FloatField()) / num),
+                default=Value(0.0),
+                output_field=FloatField(),
+            ),
+        )
+
+    def en_caja(self, sur, oeste, norte, este):
+        """
+        Cabañas dentro de la caja (oeste > este si cruza el antimeridiano). Primero
+        acota por prefijos de geohash, que usan el índice B-tree, y luego compara
+        las coordenadas exactas.
+        """
+        queryset = self.filter(latitud__gte=sur, latitud__lte=norte)
+        if oeste <= este:
+            queryset = queryset.filter(longitud__gte=oeste, longitud__lte=este)
+        else:
+            queryset = queryset.filter(Q(longitud__gte=oeste) | Q(longitud__lte=este))
+
+        celdas = celdas_caja(sur, oeste, norte, este)
+        if celdas:
+            prefiltro = Q()
+            for celda in celdas:
+                prefiltro |= Q(geohash__startswith=celda)
+            queryset = queryset.filter(prefiltro)
+        return queryset
+
+    def con_distancia(self, lat, lng):
+        """Anota distancia_km (haversine, calculada en SQL) desde el punto"""
+        return self.annotate(distancia_km=distancia_km(lat, lng))
+
+    def cerca_de(self, lat, lng, radio_km):
+        """Cabañas a radio_km o menos del punto, con distancia_km anotada"""
+        return self.en_caja(*caja_alrededor(lat, lng, radio_km)).con_distancia(lat, lng).filter(
+            distancia_km__lte=radio_km
+        )
+
+    def grupos_mapa(self, zoom, precision):
+        """
+        Un GROUP BY por tesela del zoom y prefijo de geohash de la precisión dada:
+        cuántas cabañas hay en cada celda y su centro (la media de sus coordenadas).
+        """
+        tesela_x, tesela_y = tesela_sql(zoom)
+        return self.order_by().annotate(
+            tesela_x=tesela_x, tesela_y=tesela_y, celda=Substr('geohash', 1, precision)
+        ).values('tesela_x', 'tesela_y', 'celda').annotate(
+            total=Count('pk'), lat=Avg('latitud'), lng=Avg('longitud')
+        ).values('tesela_x', 'tesela_y', 'lat', 'lng', 'total')
+
+    def puntos_mapa(self):
+        """Lo mínimo para dibujar cada cabaña en el mapa, sin instanciar modelos"""
+        return self.order_by().values(
+            'id', 'slug', lat=F('latitud'), lng=F('longitud'), precio=F('costo_por_noche')
+        )
+
+    def _es_postgresql(self):
+        return connections[self.db].vendor == 'postgresql'
+
+    def actualizar_vector_busqueda(self):
+        """
+        Recalcula vector_busqueda en un solo UPDATE. Solo existe en PostgreSQL; en
+        otras bases de datos la búsqueda no lo usa y no se hace nada.
+        """
+        if not self._es_postgresql():
+            return 0
+        return self.update(vector_busqueda=_vector_busqueda())
+
+    def buscar(self, texto):
+        """
+        Filtra por texto y anota relevancia. En PostgreSQL usa el vector ponderado
+        (índice GIN) y, para tolerar erratas, la similitud por trigramas del nombre.
+        En otras bases de datos, como SQLite en los tests, cada palabra debe aparecer
+        en algún campo y la relevancia suma los pesos de los campos donde aparece.
+        """
+        if self._es_postgresql():
+            consulta = SearchQuery(texto, config=CONFIGURACION_BUSQUEDA, search_type='websearch')
+            return self.annotate(
+                relevancia=SearchRank(F('vector_busqueda'), consulta)
+                + TrigramWordSimilarity(texto, 'nombre') * PESOS_BUSQUEDA['B']
+            ).filter(Q(vector_busqueda=consulta) | Q(nombre__trigram_word_similar=texto))
+
+        filtro = Q()
+        relevancia = Value(0.0)
+        for termino in texto.split()[:MAX_TERMINOS_BUSQUEDA]:
+            en_servicios = Exists(Servicio.objects.filter(cabana=OuterRef('pk'), nombre__icontains=termino))
+            campos = [
+                (Q(nombre__icontains=termino), 'A'),
+                (Q(descripcion__icontains=termino), 'B'),
+                (Q(en_servicios), 'C'),
+                (Q(reglas_casa__icontains=termino), 'D'),
+            ]
+            coincide = Q()
+            for condicion, peso in campos:
+                coincide |= condicion
+                relevancia += Case(
+                    When(condicion, then=Value(PESOS_BUSQUEDA[peso])),
+                    default=Value(0.0), output_field=FloatField(),
+                )
+            filtro &= coincide
+        return self.annotate(relevancia=relevancia).filter(filtro)
+
+    def facetas(self):
+        """
+        Conteos para los filtros del catálogo sobre este queryset (ya filtrado): por
+        servicio activo, rango de capacidad, rango de precio y mascotas. Todos salen
+        de una sola consulta con agregación condicional, más la lista de servicios.
+        """
+        servicios = list(Servicio.objects.filter(activo=True).values_list('pk', 'nombre'))
+        asignados = Cabana.servicios.through.objects.filter(cabana=OuterRef('pk'))
+
+        agregados = {'con_mascotas': Count('pk', filter=Q(permite_mascotas=True)), 'total': Count('pk')}
+        for servicio_id, _ in servicios:
+            agregados[f'servicio_{servicio_id}'] = Count(
+                'pk', filter=Q(Exists(asignados.filter(servicio_id=servicio_id)))
+            )
+        for i, (desde, hasta) in enumerate(RANGOS_CAPACIDAD):
+            rango = Q(capacidad__gte=desde) & (Q(capacidad__lte=hasta) if hasta is not None else Q())
+            agregados[f'capacidad_{i}'] = Count('pk', filter=rango)
+        for i, (desde, hasta) in enumerate(RANGOS_PRECIO):
+            rango = Q(costo_por_noche__gte=desde) & (Q(costo_por_noche__lt=hasta) if hasta is not None else Q())
+            agregados[f'precio_{i}'] = Count('pk', filter=rango)
+
+        # Filtrar por pk evita arrastrar anotaciones y orden del listado a la agregación
+        conteos = Cabana.objects.filter(pk__in=self.order_by().values('pk')).aggregate(**agregados)
+        return {
+            'servicios': [
+                {'id': servicio_id, 'nombre': nombre, 'total': conteos[f'servicio_{servicio_id}']}
+                for servicio_id, nombre in servicios
+            ],
+            'capacidad': [
+                {'desde': desde, 'hasta': hasta, 'total': conteos[f'capacidad_{i}']}
+                for i, (desde, hasta) in enumerate(RANGOS_CAPACIDAD)
+            ],
+            'precio': [
+                {'desde': desde, 'hasta': hasta, 'total': conteos[f'precio_{i}']}
+                for i, (desde, hasta) in enumerate(RANGOS_PRECIO)
+            ],
+            'permite_mascotas': {
+                'true': conteos['con_mascotas'],
+                'false': conteos['total'] - conteos['con_mascotas'],
+            },
+        }
+
+    def recalcular_calificaciones(self):
+        """Reconstruye los agregados de calificación en bloque a partir de las reseñas"""
+        resenas = Resena.objects.filter(cabana=OuterRef('pk')).order_by().values('cabana')
+        suma = Coalesce(Subquery(resenas.annotate(s=Sum('calificacion')).values('s')), 0)
+        num = Coalesce(Subquery(resenas.annotate(c=Count('id')).values('c')), 0)
+        return self.update(
+            suma_calificaciones=suma,
+            num_resenas=num,
+            calificacion_promedio=Coalesce(
+                Subquery(resenas.annotate(a=Avg('calificacion')).values('a')),
+                Value(0.0),
+                output_field=FloatField(),
+            ),
+        )
+
+
 class Cabana(models.Model):
     # Solo mantendremos estos estados según los requerimientos
     ESTADO_CHOICES = [
@@ -41,6 +338,14 @@ class Cabana(models.Model):
 
     # Ubicación y características
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='disponible')
+    latitud = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitud = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    # Se calcula al guardar a partir de latitud y longitud (ver geo.py)
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
 
     # Servicios
     servicios = models.ManyToManyField(Servicio, blank=True)
@@ -56,20 +361,51 @@ class Cabana(models.Model):
     hora_checkin = models.TimeField(null=True, blank=True)
     hora_checkout = models.TimeField(null=True, blank=True)
 
+    # Agregados de reseñas, mantenidos por las señales de Resena
+    suma_calificaciones = models.PositiveIntegerField(default=0, editable=False)
+    num_resenas = models.PositiveIntegerField(default=0, editable=False)
+    calificacion_promedio = models.DecimalField(max_digits=2, decimal_places=1, default=0, editable=False)
+
     # Campos de auditoría
     creada_en = models.DateTimeField(auto_now_add=True)
     actualizada_en = models.DateTimeField(auto_now=True)
+    calendario_actualizado_en = models.DateTimeField(null=True, blank=True, editable=False)
+    # Texto indexado para la búsqueda (solo en PostgreSQL; ver CabanaQuerySet.buscar)
+    vector_busqueda = SearchVectorField(null=True, editable=False)
+
+    objects = CabanaQuerySet.as_manager()
+
+    # Columnas que solo se escriben con UPDATE (deltas con F() o recálculos en bloque):
+    # save() no las toca, o una instancia cargada antes las devolvería a valores viejos
+    CAMPOS_MANTENIDOS = {
+        'suma_calificaciones', 'num_resenas', 'calificacion_promedio',
+        'calendario_actualizado_en', 'vector_busqueda',
+    }
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base_slug = slugify(self.nombre)
-            slug = base_slug
-            counter = 1
-            while Cabana.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            diferidos = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key
+                and campo.name not in self.CAMPOS_MANTENIDOS and campo.attname not in diferidos
+            ]
+        if self.latitud is not None and self.longitud is not None:
+            self.geohash = codificar_geohash(self.latitud, self.longitud)
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitud', 'longitud'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+
+        if self.slug:
+            return super().save(*args, **kwargs)
+
+        def guardar(slug):
             self.slug = slug
-        super().save(*args, **kwargs)
+            super(Cabana, self).save(*args, **kwargs)
+
+        crear_con_valor_unico(Cabana, 'slug', slugify(self.nombre) or 'cabana', guardar)
 
     def __str__(self):
         return self.nombre
@@ -81,30 +417,44 @@ class Cabana(models.Model):
         indexes = [
             models.Index(fields=['estado']),
             models.Index(fields=['slug']),
+            models.Index(fields=['estado', '-calificacion_promedio']),
+            # varchar_pattern_ops permite usar el índice con LIKE 'prefijo%' en PostgreSQL
+            models.Index(fields=['geohash'], name='cabana_geohash_idx', opclasses=['varchar_pattern_ops']),
+            # Búsqueda de texto completo y tolerancia a erratas en el nombre (ver buscar)
+            IndiceGin(fields=['vector_busqueda'], name='cabana_vector_busqueda_gin'),
+            IndiceGin(OpClass('nombre', name='gin_trgm_ops'), name='cabana_nombre_trgm_gin'),
         ]
 
-    @property
-    def calificacion_promedio(self):
-        from django.db.models import Avg
-        promedio = self.resenas.aggregate(Avg('calificacion'))['calificacion__avg']
-        return round(promedio, 1) if promedio else 0
-
     @property
     def total_resenas(self):
-        return self.resenas.count()
+        return self.num_resenas
 
     @property
     def imagen_principal(self):
+        # Los listados no pasan por aquí: CabanaListadoListSerializer carga las de toda la página
         return self.imagenes.filter(es_principal=True).first()
 
 
 class ImagenCabana(models.Model):
+    PROCESANDO = 'procesando'
+    LISTA = 'lista'
+    ERROR = 'error'
+    ESTADOS = [
+        (PROCESANDO, 'Procesando'),
+        (LISTA, 'Lista'),
+        (ERROR, 'Error'),
+    ]
+
     cabana = models.ForeignKey(Cabana, related_name='imagenes', on_delete=models.CASCADE)
     imagen = models.ImageField(upload_to='cabanas/%Y/%m/')
     es_principal = models.BooleanField(default=False)
     descripcion = models.CharField(max_length=255, blank=True, null=True)
     orden = models.PositiveIntegerField(default=0)
     creada_en = models.DateTimeField(auto_now_add=True)
+    # Rutas de las versiones reducidas (ver apps/cabanas/imagenes.py)
+    variantes = models.JSONField(default=dict, blank=True, editable=False)
+    # El worker (manage.py run_worker) corrige y reduce la imagen después de subirla
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PROCESANDO, editable=False)
 
     def __str__(self):
         return f"Imagen de {self.cabana.nombre}"
@@ -132,4 +482,11 @@ class Resena(models.Model):
         verbose_name = 'Reseña'
         verbose_name_plural = 'Reseñas'
         ordering = ['-fecha_creacion']
-        unique_together = ['cabana', 'usuario']  # Un usuario solo puede reseñar una vez por cabaña
\ No newline at end of file
+        unique_together = ['cabana', 'usuario']  # Un usuario solo puede reseñar una vez por cabaña
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guardamos la calificación cargada para calcular el delta al actualizar
+        instance._calificacion_original = instance.__dict__.get('calificacion')
+        return instance
@@ -1,32 +1,45 @@
 # apps/cabanas/serializers.py
 
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
 from rest_framework import serializers
-from .models import Cabana, Servicio, ImagenCabana, Resena
+from rest_framework.reverse import reverse
+from .models import LONGITUD_EXTRACTO, RESENAS_EN_DETALLE, Cabana, Servicio, ImagenCabana, Resena
+from .imagenes import srcset, srcset_variantes
 from apps.usuarios.serializers import PersonaSerializer
 from apps.teams.serializers import TeamSerializer
+from myproject.campos import CamposElegiblesMixin
+from myproject.incluidos import IncluiblesMixin
 from django.contrib.auth import get_user_model
 from rest_framework.exceptions import ValidationError
 
 User = get_user_model()
 
-class ServicioSerializer(serializers.ModelSerializer):
+class ServicioSerializer(CamposElegiblesMixin, serializers.ModelSerializer):
     class Meta:
         model = Servicio
         fields = ['id', 'nombre', 'icono', 'descripcion', 'activo']
 
-class ImagenCabanaSerializer(serializers.ModelSerializer):
+class ImagenCabanaSerializer(CamposElegiblesMixin, serializers.ModelSerializer):
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = ImagenCabana
-        fields = ['id', 'imagen', 'es_principal', 'descripcion', 'orden', 'creada_en']
-        read_only_fields = ['creada_en']
+        fields = ['id', 'imagen', 'srcset', 'estado', 'es_principal', 'descripcion', 'orden', 'creada_en']
+        read_only_fields = ['creada_en', 'estado']
 
-class ResenaSerializer(serializers.ModelSerializer):
+    def get_srcset(self, obj):
+        return srcset(obj, self.context.get('request'))
+
+class ResenaSerializer(CamposElegiblesMixin, serializers.ModelSerializer):
     usuario_info = serializers.SerializerMethodField()
     
     class Meta:
         model = Resena
         fields = ['id', 'calificacion', 'comentario', 'fecha_creacion', 'fecha_actualizacion', 'usuario', 'usuario_info']
         read_only_fields = ['fecha_creacion', 'fecha_actualizacion', 'usuario']
+        relaciones_de_campos = {'usuario_info': ('usuario',)}
     
     def get_usuario_info(self, obj):
         if hasattr(obj.usuario, 'persona'):
@@ -39,13 +52,15 @@ class ResenaSerializer(serializers.ModelSerializer):
             'nombre_usuario': obj.usuario.nombre_usuario
         }
 
-class CabanaListSerializer(serializers.ModelSerializer):
+class CabanaListSerializer(CamposElegiblesMixin, serializers.ModelSerializer):
     """Serializer para listado de cabañas (información básica)"""
     servicios = ServicioSerializer(many=True, read_only=True)
     imagen_principal = serializers.SerializerMethodField()
-    calificacion_promedio = serializers.ReadOnlyField()
-    total_resenas = serializers.ReadOnlyField()
+    imagen_principal_srcset = serializers.SerializerMethodField()
+    calificacion_promedio = serializers.FloatField(read_only=True)
+    total_resenas = serializers.IntegerField(source='num_resenas', read_only=True)
     team_name = serializers.CharField(source='team.name', read_only=True)
+    distancia_km = serializers.SerializerMethodField()
     
     class Meta:
         model = Cabana
@@ -53,10 +68,12 @@ class CabanaListSerializer(serializers.ModelSerializer):
             'id', 'slug', 'nombre', 'descripcion', 'capacidad', 
             'costo_por_noche', 'estado', 'servicios', 'superficie',
             'numero_habitaciones', 'numero_banos', 'permite_mascotas',
-            'imagen_principal', 'calificacion_promedio', 'total_resenas',
+            'latitud', 'longitud', 'distancia_km',
+            'imagen_principal', 'imagen_principal_srcset', 'calificacion_promedio', 'total_resenas',
             'team_name', 'creada_en'
         ]
         read_only_fields = ['slug', 'creada_en', 'calificacion_promedio', 'total_resenas']
+        relaciones_de_campos = {'imagen_principal': ('imagenes',), 'imagen_principal_srcset': ('imagenes',)}
     
     def get_imagen_principal(self, obj):
         imagen = obj.imagen_principal
@@ -66,13 +83,129 @@ class CabanaListSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(imagen.imagen.url)
         return None
 
-class CabanaDetailSerializer(serializers.ModelSerializer):
+    def get_imagen_principal_srcset(self, obj):
+        imagen = obj.imagen_principal
+        return srcset(imagen, self.context.get('request')) if imagen else None
+
+    def get_distancia_km(self, obj):
+        # Solo viene anotada en las búsquedas por ubicación
+        distancia = getattr(obj, 'distancia_km', None)
+        return round(distancia, 2) if distancia is not None else None
+
+def servicios_por_id(ids):
+    """Servicios que acompañan a un listado, indexados por id, con una sola consulta"""
+    if not ids:
+        return {}
+    return {
+        servicio['id']: servicio
+        for servicio in Servicio.objects.filter(pk__in=ids).values(*ServicioSerializer.Meta.fields)
+    }
+
+class CabanaListadoListSerializer(serializers.ListSerializer):
+    """
+    Carga servicios e imagen principal de toda la página con una consulta cada uno,
+    y solo si la respuesta lleva esos campos.
+    """
+
+    def to_representation(self, data):
+        filas = list(data)
+        ids = [fila['id'] for fila in filas]
+        nombres = self.child.nombres_campos()
+        servicios, imagenes = defaultdict(list), {}
+        if ids and 'servicios' in nombres:
+            asignados = Cabana.servicios.through.objects.filter(cabana_id__in=ids).order_by(
+                'servicio__nombre'
+            ).values_list('cabana_id', 'servicio_id')
+            for cabana_id, servicio_id in asignados:
+                servicios[cabana_id].append(servicio_id)
+        if ids and {'imagen_principal', 'imagen_principal_srcset'} & set(nombres):
+            principales = ImagenCabana.objects.filter(cabana_id__in=ids, es_principal=True).values(
+                'cabana_id', 'imagen', 'variantes'
+            )
+            for imagen in principales:
+                imagenes.setdefault(imagen['cabana_id'], imagen)
+        return [
+            self.child.to_representation({
+                **fila, 'servicios': servicios[fila['id']], 'imagen_principal': imagenes.get(fila['id']),
+            })
+            for fila in filas
+        ]
+
+class CabanaListadoSerializer(serializers.BaseSerializer):
+    """
+    Listado de cabañas a partir de las filas de CabanaQuerySet.valores_listado(),
+    con los mismos campos que CabanaListSerializer salvo que la descripción es un
+    extracto y los servicios van como ids (la vista añade servicios_por_id).
+    Con ?fields= / ?omit= solo se calculan los campos elegidos.
+    """
+    # Campos de la respuesta, en orden
+    campos = [
+        'id', 'slug', 'nombre', 'descripcion', 'capacidad',
+        'costo_por_noche', 'estado', 'servicios', 'superficie',
+        'numero_habitaciones', 'numero_banos', 'permite_mascotas',
+        'latitud', 'longitud', 'distancia_km',
+        'imagen_principal', 'imagen_principal_srcset', 'calificacion_promedio', 'total_resenas',
+        'team_name', 'creada_en',
+    ]
+    # Mismo formato que los campos de CabanaListSerializer
+    formato_costo = serializers.DecimalField(max_digits=10, decimal_places=2)
+    formato_fecha = serializers.DateTimeField()
+
+    class Meta:
+        list_serializer_class = CabanaListadoListSerializer
+
+    @classmethod
+    def elegir_campos(cls, elegidos):
+        """Campos que se envían según los elegidos en la petición (None: todos)"""
+        return cls.campos if elegidos is None else elegidos.filtrar(cls.campos)
+
+    def nombres_campos(self):
+        if not hasattr(self, '_nombres_campos'):
+            self._nombres_campos = self.elegir_campos(self.context.get('campos'))
+        return self._nombres_campos
+
+    def to_representation(self, fila):
+        request = self.context.get('request')
+        imagen = fila.get('imagen_principal')
+
+        def descripcion():
+            texto = fila['descripcion_extracto']
+            if len(texto) > LONGITUD_EXTRACTO:
+                texto = texto[:LONGITUD_EXTRACTO].rstrip() + '…'
+            return texto
+
+        def imagen_principal():
+            if imagen and imagen['imagen'] and request:
+                return request.build_absolute_uri(default_storage.url(imagen['imagen']))
+            return None
+
+        def distancia_km():
+            distancia = fila.get('distancia_km')
+            return round(distancia, 2) if distancia is not None else None
+
+        calculados = {
+            'descripcion': descripcion,
+            'costo_por_noche': lambda: self.formato_costo.to_representation(fila['costo_por_noche']),
+            'distancia_km': distancia_km,
+            'imagen_principal': imagen_principal,
+            'imagen_principal_srcset': lambda: srcset_variantes(imagen['variantes'], request) if imagen else None,
+            'calificacion_promedio': lambda: float(fila['calificacion_promedio']),
+            'total_resenas': lambda: fila['num_resenas'],
+            'creada_en': lambda: self.formato_fecha.to_representation(fila['creada_en']),
+        }
+        return {
+            nombre: calculados[nombre]() if nombre in calculados else fila[nombre]
+            for nombre in self.nombres_campos()
+        }
+
+class CabanaDetailSerializer(CamposElegiblesMixin, IncluiblesMixin, serializers.ModelSerializer):
     """Serializer para detalle completo de cabaña"""
     servicios = ServicioSerializer(many=True, read_only=True)
     imagenes = ImagenCabanaSerializer(many=True, read_only=True)
-    resenas = ResenaSerializer(many=True, read_only=True)
-    calificacion_promedio = serializers.ReadOnlyField()
-    total_resenas = serializers.ReadOnlyField()
+    resenas = serializers.SerializerMethodField()
+    resenas_url = serializers.SerializerMethodField()
+    calificacion_promedio = serializers.FloatField(read_only=True)
+    total_resenas = serializers.IntegerField(source='num_resenas', read_only=True)
     team = TeamSerializer(read_only=True)
     
     class Meta:
@@ -81,11 +214,32 @@ class CabanaDetailSerializer(serializers.ModelSerializer):
             'id', 'slug', 'nombre', 'descripcion', 'capacidad',
             'costo_por_noche', 'estado', 'servicios', 'superficie',
             'numero_habitaciones', 'numero_banos', 'permite_mascotas',
+            'latitud', 'longitud',
             'reglas_casa', 'hora_checkin', 'hora_checkout',
-            'imagenes', 'resenas', 'calificacion_promedio', 'total_resenas',
+            'imagenes', 'resenas', 'resenas_url', 'calificacion_promedio', 'total_resenas',
             'team', 'creada_en', 'actualizada_en'
         ]
         read_only_fields = ['slug', 'creada_en', 'actualizada_en', 'calificacion_promedio', 'total_resenas']
+        incluibles = {'servicios': ServicioSerializer, 'team': TeamSerializer}
+        relaciones_de_campos = {'resenas': ('resenas',)}
+
+    def get_resenas(self, obj):
+        """Solo las últimas reseñas; el listado completo está en resenas_url"""
+        resenas = getattr(obj, 'resenas_recientes', None)
+        if resenas is None:
+            resenas = obj.resenas.select_related('usuario__persona').order_by(
+                '-fecha_creacion', '-id'
+            )[:RESENAS_EN_DETALLE]
+        return ResenaSerializer(resenas, many=True, context=self.context).data
+
+    def get_resenas_url(self, obj):
+        return reverse('cabana-resenas', kwargs={'pk': obj.pk}, request=self.context.get('request'))
+
+class CabanaResumenSerializer(CamposElegiblesMixin, serializers.ModelSerializer):
+    """Lo básico de una cabaña, para incluirla junto a otros recursos"""
+    class Meta:
+        model = Cabana
+        fields = ['id', 'slug', 'nombre', 'capacidad', 'costo_por_noche', 'team']
 
 class CabanaCreateUpdateSerializer(serializers.ModelSerializer):
     """Serializer para crear/actualizar cabañas"""
@@ -101,7 +255,7 @@ class CabanaCreateUpdateSerializer(serializers.ModelSerializer):
             'nombre', 'descripcion', 'capacidad', 'costo_por_noche',
             'estado', 'servicios', 'superficie', 'numero_habitaciones',
             'numero_banos', 'permite_mascotas', 'reglas_casa',
-            'hora_checkin', 'hora_checkout'
+            'hora_checkin', 'hora_checkout', 'latitud', 'longitud'
         ]
     
     def validate_capacidad(self, value):
@@ -119,10 +273,19 @@ class CabanaCreateUpdateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("La superficie debe ser mayor a 0.")
         return value
 
+    def validate(self, data):
+        latitud = data.get('latitud', getattr(self.instance, 'latitud', None))
+        longitud = data.get('longitud', getattr(self.instance, 'longitud', None))
+        if (latitud is None) != (longitud is None):
+            raise serializers.ValidationError("Indica latitud y longitud juntas.")
+        return data
+
 class ImagenCabanaCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = ImagenCabana
-        fields = ['imagen', 'es_principal', 'descripcion', 'orden']
+        fields = ['id', 'imagen', 'estado', 'es_principal', 'descripcion', 'orden']
+        # estado llega como 'procesando': el worker reduce la imagen después
+        read_only_fields = ['estado']
     
     def validate(self, data):
         # Si se marca como principal, verificar que no haya otra imagen principal
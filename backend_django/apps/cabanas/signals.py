@@ -1,32 +1,75 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
-from django.db.models import Avg
-from .models import Resena, Cabana, ImagenCabana
+from django.utils import timezone
+from .models import Resena, Cabana, ImagenCabana, Servicio
+from .imagenes import borrar_variantes
+from .tareas import encolar_procesado_imagen
+from apps.teams.models import Team
+from apps.usuarios.models import Persona, Usuario
+from myproject.cache import invalidar
+
+
+def invalidar_cabanas(*cabana_ids):
+    """Invalida el listado público y el detalle de estas cabañas en la caché de respuestas"""
+    invalidar('cabanas', *[f"cabana:{cabana_id}" for cabana_id in cabana_ids])
+
+def marcar_cabanas_actualizadas(cabana_ids):
+    """
+    Adelanta actualizada_en de estas cabañas cuando cambia algo que se muestra con
+    ellas (imágenes, reseñas, servicios, equipo), de modo que su ETag cambie, e
+    invalida su caché de respuestas
+    """
+    cabana_ids = list(cabana_ids)
+    if cabana_ids:
+        Cabana.objects.filter(pk__in=cabana_ids).update(actualizada_en=timezone.now())
+        invalidar_cabanas(*cabana_ids)
 
 @receiver(post_save, sender=Resena)
 def actualizar_calificacion_cabana(sender, instance, created, **kwargs):
     """
-    Actualiza la calificación promedio y el número de reseñas de una cabaña
-    cuando se crea o modifica una reseña
+    Actualiza la suma, el número de reseñas y el promedio de una cabaña
+    cuando se crea o modifica una reseña, aplicando solo la diferencia
     """
-    cabana = instance.cabana
-    # Calcular nuevo promedio
-    promedio = Resena.objects.filter(cabana=cabana).aggregate(Avg('calificacion'))
-    cabana.calificacion_promedio = promedio['calificacion__avg'] or 0
-    # Actualizar número de reseñas
-    cabana.num_resenas = Resena.objects.filter(cabana=cabana).count()
-    cabana.save()
+    if created:
+        Cabana.objects.filter(pk=instance.cabana_id).aplicar_delta_calificacion(instance.calificacion, 1)
+    else:
+        anterior = getattr(instance, '_calificacion_original', None)
+        if anterior is None:
+            # Instancia no cargada desde la base de datos: reconstruir solo esta cabaña
+            Cabana.objects.filter(pk=instance.cabana_id).recalcular_calificaciones()
+        elif anterior != instance.calificacion:
+            Cabana.objects.filter(pk=instance.cabana_id).aplicar_delta_calificacion(
+                instance.calificacion - anterior, 0
+            )
+    instance._calificacion_original = instance.calificacion
 
 @receiver(post_delete, sender=Resena)
 def actualizar_calificacion_cabana_delete(sender, instance, **kwargs):
     """
     Actualiza la calificación cuando se elimina una reseña
     """
-    cabana = instance.cabana
-    promedio = Resena.objects.filter(cabana=cabana).aggregate(Avg('calificacion'))
-    cabana.calificacion_promedio = promedio['calificacion__avg'] or 0
-    cabana.num_resenas = Resena.objects.filter(cabana=cabana).count()
-    cabana.save()
+    anterior = getattr(instance, '_calificacion_original', None) or instance.calificacion
+    Cabana.objects.filter(pk=instance.cabana_id).aplicar_delta_calificacion(-anterior, -1)
+
+@receiver(post_save, sender=ImagenCabana)
+def procesar_imagen_subida(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Encola el procesado de la imagen al subirla o cambiar el archivo; la petición
+    responde enseguida con la imagen en estado 'procesando'
+    """
+    if update_fields and 'imagen' not in update_fields:
+        return
+    if not instance.imagen:
+        return
+    if created or (
+        instance.estado != ImagenCabana.PROCESANDO
+        and (instance.variantes or {}).get('origen') != instance.imagen.name
+    ):
+        encolar_procesado_imagen(instance)
+
+@receiver(post_delete, sender=ImagenCabana)
+def borrar_variantes_imagen(sender, instance, **kwargs):
+    borrar_variantes(instance)
 
 @receiver(post_save, sender=ImagenCabana)
 def asegurar_una_imagen_principal(sender, instance, created, **kwargs):
@@ -42,4 +85,94 @@ def asegurar_una_imagen_principal(sender, instance, created, **kwargs):
     elif not ImagenCabana.objects.filter(cabana=instance.cabana, es_principal=True).exists():
         # Si no hay imagen principal, hacer esta la principal
         instance.es_principal = True
-        instance.save()
\ No newline at end of file
+        instance.save()
+
+
+@receiver(post_save, sender=Cabana)
+@receiver(post_delete, sender=Cabana)
+def invalidar_cache_cabana(sender, instance, **kwargs):
+    invalidar_cabanas(instance.pk)
+
+@receiver(m2m_changed, sender=Cabana.servicios.through)
+def invalidar_cache_servicios_cabana(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # Se vacía un servicio: hay que saber antes qué cabañas lo tenían
+        instance._cabanas_previas = list(instance.cabana_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        marcar_cabanas_actualizadas(pk_set if reverse else [instance.pk])
+    elif action == 'post_clear':
+        marcar_cabanas_actualizadas(getattr(instance, '_cabanas_previas', []) if reverse else [instance.pk])
+
+@receiver(post_save, sender=ImagenCabana)
+@receiver(post_delete, sender=ImagenCabana)
+@receiver(post_save, sender=Resena)
+@receiver(post_delete, sender=Resena)
+def invalidar_cache_cabana_relacionada(sender, instance, **kwargs):
+    marcar_cabanas_actualizadas([instance.cabana_id])
+
+@receiver(post_save, sender=Servicio)
+def invalidar_cache_servicio(sender, instance, created, **kwargs):
+    invalidar('servicios')
+    if not created:
+        marcar_cabanas_actualizadas(instance.cabana_set.values_list('pk', flat=True))
+
+@receiver(pre_delete, sender=Servicio)
+def invalidar_cache_servicio_delete(sender, instance, **kwargs):
+    # Antes de borrar, mientras las cabañas aún lo tienen asignado
+    invalidar('servicios')
+    instance._cabanas_previas = list(instance.cabana_set.values_list('pk', flat=True))
+    marcar_cabanas_actualizadas(instance._cabanas_previas)
+
+@receiver(post_save, sender=Team)
+def invalidar_cache_equipo(sender, instance, created, **kwargs):
+    # El nombre del equipo aparece en el listado y en el detalle de sus cabañas
+    if not created:
+        marcar_cabanas_actualizadas(instance.cabanas.values_list('pk', flat=True))
+
+@receiver(post_save, sender=Persona)
+@receiver(post_save, sender=Usuario)
+def invalidar_cache_autor_resenas(sender, instance, created, **kwargs):
+    # El nombre y el usuario del autor aparecen en sus reseñas y en el detalle de cabaña.
+    # Solo cuenta si cambiaron: el usuario (y con él su persona) se guarda en cada login.
+    if sender is Persona:
+        nombre, anterior = (instance.nombre, instance.apellido), getattr(instance, '_nombre_original', None)
+        instance._nombre_original = nombre
+        usuario_id = instance.usuario_id
+    else:
+        nombre, anterior = instance.nombre_usuario, getattr(instance, '_nombre_usuario_original', None)
+        instance._nombre_usuario_original = nombre
+        usuario_id = instance.pk
+    if created or nombre == anterior:
+        return
+    resenas = Resena.objects.filter(usuario_id=usuario_id)
+    cabana_ids = list(resenas.values_list('cabana_id', flat=True))
+    if cabana_ids:
+        resenas.update(fecha_actualizacion=timezone.now())
+        marcar_cabanas_actualizadas(cabana_ids)
+
+@receiver(post_save, sender=Cabana)
+def actualizar_busqueda_cabana(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not {'nombre', 'descripcion', 'reglas_casa'} & set(update_fields):
+        return
+    Cabana.objects.filter(pk=instance.pk).actualizar_vector_busqueda()
+
+@receiver(m2m_changed, sender=Cabana.servicios.through)
+def actualizar_busqueda_servicios_cabana(sender, instance, action, reverse, pk_set, **kwargs):
+    # Los nombres de los servicios forman parte del vector de búsqueda de la cabaña
+    if action in ('post_add', 'post_remove'):
+        cabana_ids = pk_set if reverse else [instance.pk]
+    elif action == 'post_clear':
+        cabana_ids = getattr(instance, '_cabanas_previas', []) if reverse else [instance.pk]
+    else:
+        return
+    Cabana.objects.filter(pk__in=cabana_ids).actualizar_vector_busqueda()
+
+@receiver(post_save, sender=Servicio)
+def actualizar_busqueda_servicio(sender, instance, created, **kwargs):
+    if not created:
+        Cabana.objects.filter(servicios=instance).actualizar_vector_busqueda()
+
+@receiver(post_delete, sender=Servicio)
+def actualizar_busqueda_servicio_delete(sender, instance, **kwargs):
+    # invalidar_cache_servicio_delete guardó las cabañas que lo tenían
+    Cabana.objects.filter(pk__in=instance._cabanas_previas).actualizar_vector_busqueda()
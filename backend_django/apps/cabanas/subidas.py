@@ -0,0 +1,140 @@
+# apps/cabanas/subidas.py
+
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from PIL import Image, UnidentifiedImageError
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from apps.tareas.cola import encolar_varias
+from .models import ImagenCabana
+from .signals import marcar_cabanas_actualizadas
+from .tareas import PROCESAR_IMAGEN
+
+# Bytes necesarios para reconocer el formato por su firma
+LONGITUD_CABECERA = 12
+
+
+class SubidaDemasiadoGrande(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "La subida supera el tamaño máximo permitido."
+    default_code = 'subida_demasiado_grande'
+
+
+def formato_por_cabecera(cabecera):
+    """Formato de imagen según los primeros bytes del archivo, o None si no se reconoce"""
+    if cabecera.startswith(b'\xff\xd8\xff'):
+        return 'JPEG'
+    if cabecera.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'PNG'
+    if cabecera[:4] == b'RIFF' and cabecera[8:12] == b'WEBP':
+        return 'WEBP'
+    if cabecera[:6] in (b'GIF87a', b'GIF89a'):
+        return 'GIF'
+    return None
+
+
+class SubidaImagenesHandler(TemporaryFileUploadHandler):
+    """
+    Recibe las imágenes de una subida por lotes trozo a trozo en archivos temporales
+    (nunca enteras en memoria). Rechaza la petición en cuanto un archivo no empieza
+    como una imagen o se pasan los límites por archivo, de total o de número de archivos.
+    """
+    campo = 'imagenes'
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length and content_length > settings.SUBIDA_LOTE_MAX_BYTES:
+            raise SubidaDemasiadoGrande(self._mensaje_total())
+        self.total = 0
+        self.archivos = 0
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        if field_name != self.campo:
+            raise SkipFile()
+        self.archivos += 1
+        if self.archivos > settings.SUBIDA_LOTE_MAX_ARCHIVOS:
+            raise ValidationError({self.campo: [
+                f"No se pueden subir más de {settings.SUBIDA_LOTE_MAX_ARCHIVOS} imágenes a la vez."
+            ]})
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.recibidos = 0
+        self.cabecera = b''
+
+    def receive_data_chunk(self, raw_data, start):
+        self.recibidos += len(raw_data)
+        self.total += len(raw_data)
+        if self.recibidos > settings.SUBIDA_IMAGEN_MAX_BYTES:
+            self._rechazar(SubidaDemasiadoGrande(
+                f"'{self.file_name}' supera el máximo de "
+                f"{settings.SUBIDA_IMAGEN_MAX_BYTES // (1024 * 1024)} MB por imagen."
+            ))
+        if self.total > settings.SUBIDA_LOTE_MAX_BYTES:
+            self._rechazar(SubidaDemasiadoGrande(self._mensaje_total()))
+
+        if self.cabecera is not None:
+            self.cabecera += raw_data[:LONGITUD_CABECERA]
+            if len(self.cabecera) >= LONGITUD_CABECERA:
+                self._validar_cabecera()
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if self.cabecera is not None:
+            # Archivo más corto que la cabecera
+            self._validar_cabecera()
+        archivo = super().file_complete(file_size)
+        try:
+            # Image.open solo lee la cabecera: dimensiones sin decodificar la imagen
+            with Image.open(archivo) as imagen:
+                pixeles = imagen.width * imagen.height
+        except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+            self._rechazar(self._no_es_imagen())
+        if pixeles > Image.MAX_IMAGE_PIXELS:
+            self._rechazar(ValidationError({self.campo: [
+                f"'{self.file_name}' tiene demasiados píxeles."
+            ]}))
+        archivo.seek(0)
+        return archivo
+
+    def _validar_cabecera(self):
+        if formato_por_cabecera(self.cabecera) is None:
+            self._rechazar(self._no_es_imagen())
+        self.cabecera = None
+
+    def _no_es_imagen(self):
+        return ValidationError({self.campo: [
+            f"'{self.file_name}' no es una imagen JPEG, PNG, WebP o GIF válida."
+        ]})
+
+    def _mensaje_total(self):
+        return f"La subida supera el máximo de {settings.SUBIDA_LOTE_MAX_BYTES // (1024 * 1024)} MB en total."
+
+    def _rechazar(self, error):
+        # Borra el temporal del archivo a medias antes de cortar la petición
+        self.file.close()
+        raise error
+
+
+def crear_imagenes(cabana, archivos):
+    """
+    Crea las ImagenCabana de una subida por lotes con un solo bulk_create (que
+    guarda los archivos en el almacenamiento) y encola su procesado. bulk_create no
+    envía señales, así que aquí se hace lo que harían: imagen principal, cola y caché.
+    """
+    with transaction.atomic():
+        resumen = cabana.imagenes.aggregate(
+            ultimo_orden=Max('orden'), principales=Count('pk', filter=Q(es_principal=True))
+        )
+        orden = 0 if resumen['ultimo_orden'] is None else resumen['ultimo_orden'] + 1
+        sin_principal = not resumen['principales']
+        imagenes = ImagenCabana.objects.bulk_create([
+            ImagenCabana(
+                cabana=cabana, imagen=archivo, orden=orden + i,
+                es_principal=sin_principal and i == 0,
+            )
+            for i, archivo in enumerate(archivos)
+        ])
+        encolar_varias(PROCESAR_IMAGEN, [{'imagen_id': imagen.pk} for imagen in imagenes])
+        marcar_cabanas_actualizadas([cabana.pk])
+    return imagenes
@@ -0,0 +1,45 @@
+# apps/cabanas/tareas.py
+
+from django.core.files.storage import default_storage
+
+from apps.tareas.cola import encolar, tarea
+from .imagenes import generar_variantes, normalizar_original
+from .models import ImagenCabana
+
+PROCESAR_IMAGEN = 'cabanas.procesar_imagen'
+
+
+def encolar_procesado_imagen(imagen_cabana):
+    """Marca la imagen como 'procesando' y deja su procesado en la cola del worker"""
+    if imagen_cabana.estado != ImagenCabana.PROCESANDO:
+        imagen_cabana.estado = ImagenCabana.PROCESANDO
+        ImagenCabana.objects.filter(pk=imagen_cabana.pk).update(estado=ImagenCabana.PROCESANDO)
+    encolar(PROCESAR_IMAGEN, imagen_id=imagen_cabana.pk)
+
+
+def marcar_imagen_con_error(imagen_id):
+    imagen = ImagenCabana.objects.filter(pk=imagen_id).first()
+    if imagen is not None:
+        imagen.estado = ImagenCabana.ERROR
+        # save() y no update(): las señales invalidan la caché y el ETag de la cabaña
+        imagen.save(update_fields=['estado'])
+
+
+@tarea(PROCESAR_IMAGEN, al_fallar=marcar_imagen_con_error)
+def procesar_imagen(imagen_id):
+    """
+    Corrige la orientación, quita los metadatos y limita el tamaño del original, y
+    genera sus variantes WebP/JPEG. Un solo guardado deja la imagen 'lista'.
+    """
+    imagen = ImagenCabana.objects.filter(pk=imagen_id).first()
+    if imagen is None:
+        # Se borró antes de que el worker llegara a ella
+        return
+    anterior = imagen.imagen.name
+    normalizar_original(imagen)
+    generar_variantes(imagen, guardar=False)
+    imagen.estado = ImagenCabana.LISTA
+    imagen.save(update_fields=['imagen', 'variantes', 'estado'])
+    if imagen.imagen.name != anterior:
+        # Se convirtió a JPEG con otro nombre: el original ya no se usa
+        default_storage.delete(anterior)
@@ -0,0 +1,380 @@
+import os
+import random
+import shutil
+import tempfile
+from datetime import date
+from io import BytesIO
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from apps.reservas.models import Reserva, ReservaCabana, marcar_calendarios
+from apps.teams.models import Team, TeamMember
+from apps.usuarios.models import Cliente, Usuario
+from .geo import caja_alrededor, celdas_caja, codificar_geohash
+from .imagenes import generar_variantes
+from .tareas import marcar_imagen_con_error
+from .models import Cabana, ImagenCabana, Resena, Servicio
+
+
+def archivo_imagen(imagen, formato='PNG', nombre='imagen.png'):
+    buffer = BytesIO()
+    imagen.save(buffer, format=formato)
+    return ContentFile(buffer.getvalue(), name=nombre)
+
+
+class MediaTemporalTest(TestCase):
+    """Guarda los archivos de cada test en una carpeta temporal"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        ajuste = override_settings(MEDIA_ROOT=self.media)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        self.cabana = Cabana.objects.create(
+            team=Team.objects.create(name='Equipo'), nombre='Cabaña', descripcion='d',
+            capacidad=2, costo_por_noche=100,
+        )
+
+
+class GuardarCabanaDesactualizadaTest(TestCase):
+    def test_no_pisa_agregados_ni_calendario(self):
+        cabana = Cabana.objects.create(
+            team=Team.objects.create(name='Equipo'), nombre='Cabaña', descripcion='d',
+            capacidad=2, costo_por_noche=100,
+        )
+        desactualizada = Cabana.objects.get(pk=cabana.pk)
+        usuario = Usuario.objects.create_user(email='autor@test.com', password='x', nombre_usuario='autor')
+        Resena.objects.create(cabana=cabana, usuario=usuario, calificacion=5, comentario='c')
+        marcar_calendarios([cabana.pk])
+        calendario = Cabana.objects.get(pk=cabana.pk).calendario_actualizado_en
+
+        desactualizada.nombre = 'Otro nombre'
+        desactualizada.save()
+        cabana.refresh_from_db()
+        self.assertEqual(cabana.nombre, 'Otro nombre')
+        self.assertEqual((cabana.num_resenas, cabana.suma_calificaciones), (1, 5))
+        self.assertEqual(float(cabana.calificacion_promedio), 5.0)
+        self.assertEqual(cabana.calendario_actualizado_en, calendario)
+
+
+class IncluirRelacionesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.team = Team.objects.create(name='Equipo')
+        self.servicio = Servicio.objects.create(nombre='Wifi')
+        self.cabana = Cabana.objects.create(
+            team=self.team, nombre='Cabaña', descripcion='d', capacidad=2, costo_por_noche=100,
+        )
+        self.cabana.servicios.add(self.servicio)
+        self.client = APIClient()
+
+    def test_include_servicios_en_el_listado(self):
+        response = self.client.get('/api/cabanas/cabanas/?include=servicios')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['servicios'], [self.servicio.pk])
+        self.assertEqual(response.data['included']['servicios'][self.servicio.pk]['nombre'], 'Wifi')
+        self.assertNotIn('servicios', response.data)
+
+    def test_include_servicios_y_team_en_el_detalle(self):
+        response = self.client.get(f'/api/cabanas/cabanas/{self.cabana.pk}/?include=servicios,team')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['servicios'], response.data['team']), ([self.servicio.pk], self.team.pk))
+        self.assertEqual(response.data['included']['servicios'][self.servicio.pk]['nombre'], 'Wifi')
+        self.assertEqual(response.data['included']['team'][self.team.pk]['name'], 'Equipo')
+
+    def test_include_team_en_el_listado_responde_400(self):
+        self.assertEqual(self.client.get('/api/cabanas/cabanas/?include=team').status_code, 400)
+
+
+class SlugTest(TestCase):
+    def test_ignora_sufijos_que_no_caben_en_un_entero(self):
+        team = Team.objects.create(name='Equipo')
+        for slug in ('cabana', 'cabana-2', 'cabana-5512345678'):
+            Cabana.objects.create(team=team, nombre='x', slug=slug, descripcion='d', capacidad=2, costo_por_noche=100)
+        cabana = Cabana.objects.create(team=team, nombre='Cabaña', descripcion='d', capacidad=2, costo_por_noche=100)
+        self.assertEqual(cabana.slug, 'cabana-3')
+
+
+class VariantesTransparenciaTest(MediaTemporalTest):
+    def test_transparencia_en_webp_y_fondo_blanco_en_jpeg(self):
+        # Mitad izquierda transparente, mitad derecha roja
+        original = Image.new('RGBA', (400, 200), (0, 0, 0, 0))
+        original.paste((255, 0, 0, 255), (200, 0, 400, 200))
+        imagen = ImagenCabana.objects.create(cabana=self.cabana, imagen=archivo_imagen(original))
+
+        variantes = generar_variantes(imagen, guardar=False)
+        with default_storage.open(variantes['jpeg']) as archivo:
+            jpeg = Image.open(archivo).convert('RGB')
+            self.assertGreater(min(jpeg.getpixel((10, 100))), 245)
+            self.assertGreater(jpeg.getpixel((390, 100))[0], 245)
+        with default_storage.open(variantes['webp']['320']) as archivo:
+            webp = Image.open(archivo)
+            self.assertEqual(webp.mode, 'RGBA')
+            self.assertEqual(webp.getpixel((5, 50))[3], 0)
+
+
+class ImagenConErrorTest(MediaTemporalTest):
+    def test_marcar_con_error_cambia_la_version_de_la_cabana(self):
+        imagen = ImagenCabana.objects.create(
+            cabana=self.cabana, imagen=archivo_imagen(Image.new('RGB', (10, 10)))
+        )
+        antes = Cabana.objects.get(pk=self.cabana.pk).actualizada_en
+        marcar_imagen_con_error(imagen.pk)
+        imagen.refresh_from_db()
+        self.assertEqual(imagen.estado, ImagenCabana.ERROR)
+        self.assertGreater(Cabana.objects.get(pk=self.cabana.pk).actualizada_en, antes)
+
+
+@override_settings(SUBIDA_IMAGEN_MAX_BYTES=2000, SUBIDA_LOTE_MAX_BYTES=100000, SUBIDA_LOTE_MAX_ARCHIVOS=3)
+class SubidaImagenesTest(MediaTemporalTest):
+    def setUp(self):
+        super().setUp()
+        self.temporales = tempfile.mkdtemp()
+        ajuste = override_settings(FILE_UPLOAD_TEMP_DIR=self.temporales)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        self.addCleanup(shutil.rmtree, self.temporales, ignore_errors=True)
+        usuario = Usuario.objects.create_user(email='admin@test.com', password='x', nombre_usuario='admin')
+        TeamMember.objects.create(team=self.cabana.team, user=usuario, role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(usuario)
+        self.url = f'/api/cabanas/cabanas/{self.cabana.pk}/agregar_imagenes/'
+
+    def imagen(self, lado=8, nombre='imagen.png'):
+        # Ruido: el PNG no se comprime y su tamaño crece con el lado
+        return archivo_imagen(Image.frombytes('RGB', (lado, lado), os.urandom(lado * lado * 3)), nombre=nombre)
+
+    def subir(self, archivos):
+        return self.client.post(self.url, {'imagenes': archivos}, format='multipart')
+
+    def assertSinRestos(self):
+        self.assertEqual(os.listdir(self.temporales), [])
+        self.assertFalse(ImagenCabana.objects.exists())
+
+    def test_sube_el_lote(self):
+        response = self.subir([self.imagen(), self.imagen()])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ImagenCabana.objects.filter(cabana=self.cabana).count(), 2)
+
+    def test_imagen_demasiado_grande(self):
+        response = self.subir([self.imagen(), self.imagen(lado=40, nombre='grande.png')])
+        self.assertEqual(response.status_code, 413)
+        self.assertSinRestos()
+
+    def test_lote_demasiado_grande(self):
+        with override_settings(SUBIDA_LOTE_MAX_BYTES=3000):
+            response = self.subir([self.imagen(lado=20) for _ in range(3)])
+        self.assertEqual(response.status_code, 413)
+        self.assertSinRestos()
+
+    def test_demasiados_archivos(self):
+        response = self.subir([self.imagen() for _ in range(4)])
+        self.assertEqual(response.status_code, 400)
+        self.assertSinRestos()
+
+    def test_archivo_que_no_es_imagen(self):
+        response = self.subir([self.imagen(), ContentFile(b'no es una imagen', name='texto.png')])
+        self.assertEqual(response.status_code, 400)
+        self.assertSinRestos()
+
+
+class BusquedaGeograficaTest(TestCase):
+    def setUp(self):
+        self.team = Team.objects.create(name='Equipo')
+
+    def crear_cabana(self, nombre, lat, lng):
+        return Cabana.objects.create(
+            team=self.team, nombre=nombre, descripcion='d', capacidad=2, costo_por_noche=100,
+            latitud=lat, longitud=lng,
+        )
+
+    def assertCubre(self, celdas, lat, lng):
+        geohash = codificar_geohash(lat, lng)
+        self.assertTrue(any(geohash.startswith(celda) for celda in celdas), (lat, lng, celdas))
+
+    def test_prefijos_cubren_la_caja(self):
+        azar = random.Random(0)
+        for sur, oeste, norte, este in [(-33.5, -70.8, -33.3, -70.5), (-41.2, -72.1, -41.1, -71.9), (10, 30, 40, 80)]:
+            celdas = celdas_caja(sur, oeste, norte, este)
+            self.assertTrue(celdas)
+            for _ in range(200):
+                self.assertCubre(celdas, azar.uniform(sur, norte), azar.uniform(oeste, este))
+            # Las esquinas también
+            for lat in (sur, norte):
+                for lng in (oeste, este):
+                    self.assertCubre(celdas, lat, lng)
+
+    def test_prefijos_de_caja_que_cruza_el_antimeridiano(self):
+        celdas = celdas_caja(-1, 179.5, 1, -179.5)
+        for lng in (179.5, 179.99, 180.0, -180.0, -179.99, -179.5):
+            self.assertCubre(celdas, 0.5, lng)
+        self.assertFalse(any(codificar_geohash(0, 0).startswith(celda) for celda in celdas))
+
+    def test_caja_alrededor_cruza_el_antimeridiano(self):
+        sur, oeste, norte, este = caja_alrededor(0, 179.99, 20)
+        self.assertGreater(oeste, este)
+        self.assertLess(oeste, 179.99)
+        self.assertGreater(este, -180)
+
+    def test_radio_haversine(self):
+        self.crear_cabana('Centro', -33.45, -70.66)
+        self.crear_cabana('Cerca', -33.40, -70.60)  # ~8 km
+        self.crear_cabana('Lejos', -34.00, -70.66)  # ~61 km
+        cabanas = {c.nombre: c.distancia_km for c in Cabana.objects.cerca_de(-33.45, -70.66, 50)}
+        self.assertEqual(set(cabanas), {'Centro', 'Cerca'})
+        self.assertAlmostEqual(cabanas['Centro'], 0, places=3)
+        self.assertAlmostEqual(cabanas['Cerca'], 7.9, delta=0.2)
+
+    def test_radio_que_cruza_el_antimeridiano(self):
+        self.crear_cabana('Este', 0, 179.95)  # ~4,4 km
+        self.crear_cabana('Oeste', 0, -179.95)  # ~6,7 km al otro lado
+        self.crear_cabana('Lejos', 0, 178)  # ~221 km
+        cabanas = {c.nombre: c.distancia_km for c in Cabana.objects.cerca_de(0, 179.99, 20)}
+        self.assertEqual(set(cabanas), {'Este', 'Oeste'})
+        self.assertAlmostEqual(cabanas['Oeste'], 6.7, delta=0.1)
+
+        response = APIClient().get('/api/cabanas/cabanas/', {'lat': 0, 'lng': 179.99, 'radio_km': 20})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['nombre'] for c in response.data['results']], ['Este', 'Oeste'])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'El vector de búsqueda y los trigramas solo existen en PostgreSQL')
+class BusquedaTextoTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        team = Team.objects.create(name='Equipo')
+        datos = [
+            ('Refugio del lago', 'Vista al bosque'),
+            ('Cabaña Pinos', 'A pasos del lago'),
+            ('Casa Sierra', 'Vista a la montaña'),
+        ]
+        for nombre, descripcion in datos:
+            Cabana.objects.create(team=team, nombre=nombre, descripcion=descripcion, capacidad=2, costo_por_noche=100)
+
+    def nombres(self, texto):
+        response = APIClient().get('/api/cabanas/cabanas/', {'q': texto})
+        return [cabana['nombre'] for cabana in response.data['results']]
+
+    def test_ordena_por_relevancia(self):
+        # El nombre pesa más que la descripción
+        self.assertEqual(self.nombres('lago'), ['Refugio del lago', 'Cabaña Pinos'])
+
+    def test_tolera_erratas_en_el_nombre(self):
+        self.assertEqual(self.nombres('refugo'), ['Refugio del lago'])
+
+
+class FacetasTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        team = Team.objects.create(name='Equipo')
+        self.wifi = Servicio.objects.create(nombre='Wifi')
+        for capacidad, costo, mascotas, wifi in [(2, 500, True, True), (4, 1500, False, False), (8, 5000, False, True)]:
+            cabana = Cabana.objects.create(
+                team=team, nombre='Cabaña', descripcion='d', capacidad=capacidad,
+                costo_por_noche=costo, permite_mascotas=mascotas,
+            )
+            if wifi:
+                cabana.servicios.add(self.wifi)
+
+    def test_cuenta_sobre_el_listado_filtrado(self):
+        facetas = APIClient().get('/api/cabanas/cabanas/', {'precio_min': 1000}).data['facets']
+        self.assertEqual(facetas['servicios'], [{'id': self.wifi.pk, 'nombre': 'Wifi', 'total': 1}])
+        self.assertEqual([rango['total'] for rango in facetas['capacidad']], [0, 1, 0, 1])
+        self.assertEqual([rango['total'] for rango in facetas['precio']], [0, 1, 0, 1])
+        self.assertEqual(facetas['permite_mascotas'], {'true': 0, 'false': 2})
+
+
+class FiltrosCatalogoTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        team = Team.objects.create(name='Equipo')
+        wifi, parrilla, jacuzzi = (Servicio.objects.create(nombre=nombre) for nombre in ('Wifi', 'Parrilla', 'Jacuzzi'))
+        self.servicios = [wifi.pk, parrilla.pk]
+        self.cabanas = {}
+        for nombre, costo, servicios in [
+            ('A', 1000, [wifi, parrilla]), ('B', 1500, [wifi]), ('C', 2000, [wifi, parrilla]),
+            ('D', 500, [wifi, parrilla, jacuzzi]),
+        ]:
+            cabana = Cabana.objects.create(team=team, nombre=nombre, descripcion='d', capacidad=2, costo_por_noche=costo)
+            cabana.servicios.add(*servicios)
+            self.cabanas[nombre] = cabana
+
+    def nombres(self, **parametros):
+        response = APIClient().get('/api/cabanas/cabanas/', parametros)
+        self.assertEqual(response.status_code, 200)
+        return sorted(cabana['nombre'] for cabana in response.data['results'])
+
+    def test_precio_min_incluido_y_precio_max_excluido(self):
+        self.assertEqual(self.nombres(precio_min=1000), ['A', 'B', 'C'])
+        self.assertEqual(self.nombres(precio_max=2000), ['A', 'B', 'D'])
+        self.assertEqual(self.nombres(precio_min=1000, precio_max=2000), ['A', 'B'])
+
+    def test_servicios_exige_todos(self):
+        self.assertEqual(self.nombres(servicios=self.servicios), ['A', 'C', 'D'])
+
+    def test_servicios_y_fechas_sin_filas_repetidas(self):
+        usuario = Usuario.objects.create_user(email='cliente@test.com', password='x', nombre_usuario='cliente')
+        reserva = Reserva.objects.create(
+            cliente=Cliente.objects.create(persona=usuario.persona),
+            fecha_inicio=date(2026, 7, 10), fecha_fin=date(2026, 7, 12), precio_final=100,
+        )
+        ReservaCabana.objects.create(reserva=reserva, cabana=self.cabanas['A'])
+        reserva.ocupar([self.cabanas['A']])
+
+        fechas = {'fecha_inicio': '2026-07-11', 'fecha_fin': '2026-07-13'}
+        self.assertEqual(self.nombres(servicios=self.servicios, **fechas), ['C', 'D'])
+        self.assertEqual(self.nombres(servicios=self.servicios, precio_max=2000, **fechas), ['D'])
+
+
+class MapaTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        team = Team.objects.create(name='Equipo')
+        self.santiago = [
+            Cabana.objects.create(
+                team=team, nombre='Santiago', descripcion='d', capacidad=2, costo_por_noche=100, latitud=lat, longitud=lng,
+            ).pk
+            for lat, lng in [(-33.45, -70.66), (-33.46, -70.65), (-33.44, -70.67)]
+        ]
+        for nombre, lat, lng in [('Valdivia', -39.81, -73.24), ('Fiyi', -17.7, 178.4), ('Samoa', -14.3, -170.7)]:
+            Cabana.objects.create(
+                team=team, nombre=nombre, descripcion='d', capacidad=2, costo_por_noche=100, latitud=lat, longitud=lng,
+            )
+
+    def mapa(self, **parametros):
+        response = APIClient().get('/api/cabanas/cabanas/mapa/', parametros)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def totales(self, datos):
+        return sorted(grupo['total'] for grupo in datos['grupos'])
+
+    def test_grupos_al_cambiar_de_zoom(self):
+        chile = {'bbox': '-80,-45,-65,-30'}
+        # Con zoom 1 Santiago y Valdivia caen en la misma celda; con zoom 2, no. La
+        # tesela de zoom 1 (todo el suroeste) trae también a Samoa
+        self.assertEqual(self.totales(self.mapa(zoom=1, **chile)), [1, 4])
+        self.assertEqual(self.totales(self.mapa(zoom=2, **chile)), [1, 3])
+
+    def test_caja_que_cruza_el_antimeridiano(self):
+        datos = self.mapa(zoom=4, bbox='170,-25,-165,-5')
+        self.assertEqual(self.totales(datos), [1, 1])
+        self.assertEqual(sorted(round(grupo['lng']) for grupo in datos['grupos']), [-171, 178])
+
+    def test_pasa_de_grupos_a_puntos(self):
+        centro = {'bbox': '-70.68,-33.47,-70.64,-33.43'}
+        datos = self.mapa(zoom=13, **centro)
+        self.assertEqual(sum(self.totales(datos)), 3)
+        self.assertEqual(datos['puntos'], [])
+
+        datos = self.mapa(zoom=14, **centro)
+        self.assertEqual(datos['grupos'], [])
+        self.assertEqual(sorted(punto['id'] for punto in datos['puntos']), sorted(self.santiago))
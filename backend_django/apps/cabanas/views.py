@@ -2,26 +2,68 @@
 
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.db.models import Max, Q
+from django.utils import timezone
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 
+from .filters import BusquedaCabanasFilter, CabanaFilter, UbicacionCabanasFilter, leer_bbox
+from .geo import LATITUD_MAXIMA_MERCATOR, caja_teselas, precision_para_zoom, tesela, teselas_caja
 from .models import Cabana, Servicio, ImagenCabana, Resena
+from .subidas import SubidaImagenesHandler, crear_imagenes
 from .serializers import (
-    CabanaListSerializer, CabanaDetailSerializer, CabanaCreateUpdateSerializer,
+    CabanaListSerializer, CabanaListadoSerializer, CabanaDetailSerializer, CabanaCreateUpdateSerializer,
     ServicioSerializer, ImagenCabanaSerializer, ImagenCabanaCreateSerializer,
-    ResenaSerializer, ResenaCreateSerializer
+    ResenaSerializer, ResenaCreateSerializer, servicios_por_id,
 )
-from apps.teams.models import TeamMember
+from apps.teams.permissions import IsTeamMember, obtener_membresias, rol_en_equipo
+from apps.reservas.models import OcupacionNoche
+from myproject.cache import (
+    GetCondicionalMixin, RespuestaCacheadaMixin, respuesta_condicional, valor_cacheado, valores_cacheados,
+)
+from myproject.campos import CamposElegidosMixin
+from myproject.incluidos import IncluidosMixin
+from myproject.pagination import PaginacionEstandar, PaginacionCursorCabanas, PaginacionCursorResenas
 
 from apps.cabanas import serializers
 
+MAX_DIAS_CALENDARIO = 366
+# Parámetros que no cambian el conjunto de cabañas y no entran en la clave de las facetas
+PARAMETROS_SIN_FACETAS = {'page', 'page_size', 'cursor', OrderingFilter.ordering_param}
+
+# Acciones que devuelven listados de cabañas con CabanaListadoSerializer
+ACCIONES_LISTADO = ['list', 'mis_cabanas', 'cabanas_por_equipo']
+
+# Mapa: desde este zoom se envían cabañas sueltas en vez de grupos
+ZOOM_PUNTOS_MAPA = 14
+ZOOM_MAXIMO_MAPA = 20
+# Teselas de 256 px como máximo por petición (una pantalla grande ronda las 40)
+MAX_TESELAS_MAPA = 64
+# Parámetros que no filtran las cabañas del mapa y no entran en la clave de sus teselas
+PARAMETROS_FUERA_DEL_MAPA = PARAMETROS_SIN_FACETAS | {'zoom', 'bbox', 'lat', 'lng', 'radio_km'}
+
+
+def _agrupar_noches(fechas):
+    """
+    Agrupa noches ordenadas en rangos consecutivos. Como en Reserva,
+    fecha_fin es el día de salida (la primera noche libre).
+    """
+    rangos = []
+    for fecha in fechas:
+        if rangos and rangos[-1]['fecha_fin'] == fecha:
+            rangos[-1]['fecha_fin'] = fecha + timedelta(days=1)
+        else:
+            rangos.append({'fecha_inicio': fecha, 'fecha_fin': fecha + timedelta(days=1)})
+    return rangos
+
 
-class ServicioViewSet(viewsets.ReadOnlyModelViewSet):
+class ServicioViewSet(RespuestaCacheadaMixin, CamposElegidosMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para servicios - Solo lectura para todos los usuarios
     """
@@ -29,51 +71,150 @@ class ServicioViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ServicioSerializer
     permission_classes = [permissions.AllowAny]
 
+    def get_espacios_listado(self):
+        return ['servicios']
 
-class CabanaViewSet(viewsets.ModelViewSet):
+    def get_espacios_detalle(self, lookup):
+        return ['servicios']
+
+
+class CabanaViewSet(
+    GetCondicionalMixin, RespuestaCacheadaMixin, IncluidosMixin, CamposElegidosMixin, viewsets.ModelViewSet
+):
     """
     ViewSet para cabañas con diferentes permisos según la acción
     """
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['estado', 'capacidad', 'permite_mascotas', 'team']
-    search_fields = ['nombre', 'descripcion']
+    campo_modificacion = 'actualizada_en'
+    filter_backends = [DjangoFilterBackend, OrderingFilter, BusquedaCabanasFilter, UbicacionCabanasFilter]
+    filterset_class = CabanaFilter
     ordering_fields = ['costo_por_noche', 'capacidad', 'creada_en', 'calificacion_promedio']
-    ordering = ['-creada_en']
+    ordering = ['-creada_en', '-id']
+    pagination_class = PaginacionCursorCabanas
+
+    @property
+    def incluibles(self):
+        # Las filas de los listados solo llevan team_name: el equipo se incluye en el detalle
+        return ('servicios', 'team') if self.action == 'retrieve' else ('servicios',)
+
+    @property
+    def paginator(self):
+        """
+        Paginación por cursor sobre el orden por defecto. Si el cliente pide otro
+        orden (que puede no ser único) o los filtros ordenan por relevancia o
+        distancia, se pagina por número de página.
+        """
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get(OrderingFilter.ordering_param) or any(
+                backend().reordena(self.request) for backend in (BusquedaCabanasFilter, UbicacionCabanasFilter)
+            ):
+                self._paginator = PaginacionEstandar()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
     def get_queryset(self):
-        if self.action in ['list', 'retrieve']:
-            # Para listar y ver detalles, solo cabañas disponibles
-            return Cabana.objects.filter(estado='disponible').prefetch_related(
-                'servicios', 'imagenes', 'resenas__usuario__persona', 'team'
-            )
-        else:
-            # Para crear, actualizar, eliminar - todas las cabañas del usuario
-            user = self.request.user
-            if user.is_authenticated:
-                # Obtener cabañas de los equipos donde el usuario es miembro
-                team_ids = TeamMember.objects.filter(user=user).values_list('team_id', flat=True)
-                return Cabana.objects.filter(team_id__in=team_ids).prefetch_related(
-                    'servicios', 'imagenes', 'resenas__usuario__persona', 'team'
-                )
-            return Cabana.objects.none()
+        if self.action == 'list':
+            # Las calificaciones se leen de los agregados guardados, no hace falta cargar reseñas
+            return Cabana.objects.filter(estado='disponible').valores_listado(self._campos_listado())
+        elif self.action in ['calendario', 'resenas', 'mapa']:
+            return Cabana.objects.filter(estado='disponible')
+        elif self.action == 'retrieve':
+            # Para ver detalles, solo cabañas disponibles y solo sus últimas reseñas
+            return Cabana.objects.filter(estado='disponible').with_detail_data()
+        # Para crear, actualizar, eliminar - todas las cabañas de los equipos del usuario
+        team_ids = list(obtener_membresias(self.request))
+        cabanas = Cabana.objects.filter(team_id__in=team_ids)
+        if self.action in ['agregar_imagen', 'agregar_imagenes']:
+            # Subir imágenes solo necesita la cabaña
+            return cabanas
+        return cabanas.prefetch_related('servicios', 'imagenes', 'team')
 
     def get_serializer_class(self):
-        if self.action == 'list':
-            return CabanaListSerializer
+        if self.action in ACCIONES_LISTADO:
+            return CabanaListadoSerializer
         elif self.action == 'retrieve':
             return CabanaDetailSerializer
+        elif self.action == 'resenas':
+            return ResenaSerializer
         else:
             return CabanaCreateUpdateSerializer
 
+    def _campos_listado(self):
+        """Campos de CabanaListadoSerializer que lleva esta respuesta (?fields= / ?omit=)"""
+        return CabanaListadoSerializer.elegir_campos(self.get_campos())
+
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'calendario', 'resenas', 'mapa']:
             # Cualquiera puede ver las cabañas disponibles
             permission_classes = [permissions.AllowAny]
+        elif self.action in ['update', 'partial_update', 'destroy', 'agregar_imagen', 'agregar_imagenes']:
+            # Editar una cabaña requiere ser miembro de su equipo
+            permission_classes = [permissions.IsAuthenticated, IsTeamMember]
         else:
-            # Solo usuarios autenticados pueden crear/editar
+            # Solo usuarios autenticados pueden crear
             permission_classes = [permissions.IsAuthenticated]
         return [permission() for permission in permission_classes]
 
+    def initialize_request(self, request, *args, **kwargs):
+        request = super().initialize_request(request, *args, **kwargs)
+        if self.action == 'agregar_imagenes':
+            # Debe asignarse antes de leer el cuerpo de la petición
+            request._request.upload_handlers = [SubidaImagenesHandler(request._request)]
+        return request
+
+    def _filtra_por_fechas(self):
+        return 'fecha_inicio' in self.request.query_params or 'fecha_fin' in self.request.query_params
+
+    def get_agregados_modificacion(self):
+        agregados = super().get_agregados_modificacion()
+        if self._filtra_por_fechas():
+            # El filtro de disponibilidad depende además de las noches ocupadas
+            agregados['calendario'] = Max('calendario_actualizado_en')
+        return agregados
+
+    def get_espacios_listado(self):
+        espacios = ['cabanas', 'servicios']
+        if self._filtra_por_fechas():
+            espacios.append('ocupacion')
+        return espacios
+
+    def get_espacios_detalle(self, lookup):
+        return [f"cabana:{lookup}", 'servicios']
+
+    def _firma_filtros(self, excluidos):
+        """Parámetros de la petición, salvo los excluidos, en un orden estable"""
+        return urlencode(sorted(
+            (clave, valor)
+            for clave, valores in self.request.query_params.lists()
+            if clave not in excluidos
+            for valor in valores
+        ))
+
+    def get_facetas(self):
+        """
+        Facetas del listado filtrado. Se cachean por combinación de filtros: todas las
+        páginas y órdenes de una misma búsqueda comparten los conteos.
+        """
+        return valor_cacheado(
+            f"facetas|{self._firma_filtros(PARAMETROS_SIN_FACETAS)}", self.get_espacios_listado(),
+            lambda: self.filter_queryset(self.get_queryset()).facetas(), prefijo='facetas'
+        )
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.action in ACCIONES_LISTADO and 'servicios' in self._campos_listado():
+            # Cada servicio se describe una vez por página; las cabañas llevan sus ids
+            servicios = servicios_por_id({
+                servicio_id for cabana in data for servicio_id in cabana['servicios']
+            })
+            if self.incluye('servicios'):
+                response.data['included']['servicios'] = servicios
+            else:
+                response.data['servicios'] = servicios
+        if self.action == 'list':
+            response.data['facets'] = self.get_facetas()
+        return response
+
     def perform_create(self, serializer):
         """Crear cabaña asignándola a un equipo del usuario"""
         # Obtener el team_id del request
@@ -82,30 +223,11 @@ class CabanaViewSet(viewsets.ModelViewSet):
             raise serializers.ValidationError({"team_id": "Este campo es requerido."})
         
         # Verificar que el usuario pertenezca al equipo
-        team_member = TeamMember.objects.filter(
-            user=self.request.user,
-            team_id=team_id
-        ).first()
-        
-        if not team_member:
+        if rol_en_equipo(self.request, team_id) is None:
             raise serializers.ValidationError({"team_id": "No tienes permisos para crear cabañas en este equipo."})
         
         serializer.save(team_id=team_id)
 
-    def perform_update(self, serializer):
-        """Verificar permisos antes de actualizar"""
-        cabana = self.get_object()
-        
-        # Verificar que el usuario pertenezca al equipo de la cabaña
-        team_member = TeamMember.objects.filter(
-            user=self.request.user,
-            team=cabana.team
-        ).first()
-        
-        if not team_member:
-            raise PermissionDenied("No tienes permisos para editar esta cabaña.")
-        
-        serializer.save()
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -127,19 +249,6 @@ class CabanaViewSet(viewsets.ModelViewSet):
         return Response(output_serializer.data)
 
 
-    def perform_destroy(self, instance):
-        """Verificar permisos antes de eliminar"""
-        # Verificar que el usuario pertenezca al equipo de la cabaña
-        team_member = TeamMember.objects.filter(
-            user=self.request.user,
-            team=instance.team
-        ).first()
-        
-        if not team_member:
-            raise PermissionDenied("No tienes permisos para eliminar esta cabaña.")
-        
-        instance.delete()
-
     @action(detail=True, methods=['get'])
     def disponibilidad(self, request, pk=None):
         """Endpoint para consultar disponibilidad de una cabaña"""
@@ -155,22 +264,116 @@ class CabanaViewSet(viewsets.ModelViewSet):
             'mensaje': 'Cabaña disponible para reservas' if cabana.estado == 'disponible' else 'Cabaña no disponible'
         })
 
-    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
-    def agregar_imagen(self, request, pk=None):
-        """Agregar imágenes a una cabaña"""
+    @action(detail=True, methods=['get'])
+    def calendario(self, request, pk=None):
+        """
+        Calendario de ocupación de una cabaña entre desde y hasta (máximo 12 meses),
+        como rangos de noches ocupadas. Responde 304 si el calendario no cambió.
+        """
         cabana = self.get_object()
-        
-        # Verificar permisos
-        team_member = TeamMember.objects.filter(
-            user=request.user,
-            team=cabana.team
-        ).first()
-        
-        if not team_member:
+
+        try:
+            desde = request.query_params.get('desde')
+            desde = datetime.strptime(desde, '%Y-%m-%d').date() if desde else timezone.localdate()
+            hasta = request.query_params.get('hasta')
+            hasta = datetime.strptime(hasta, '%Y-%m-%d').date() if hasta else desde + timedelta(days=MAX_DIAS_CALENDARIO)
+        except ValueError:
+            return Response(
+                {'error': 'Formato de fecha inválido. Use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if hasta <= desde or (hasta - desde).days > MAX_DIAS_CALENDARIO:
             return Response(
-                {"detail": "No tienes permisos para agregar imágenes a esta cabaña."},
-                status=status.HTTP_403_FORBIDDEN
+                {'error': f'El rango debe ser positivo y de máximo {MAX_DIAS_CALENDARIO} días'},
+                status=status.HTTP_400_BAD_REQUEST
             )
+
+        def generar():
+            fechas = OcupacionNoche.objects.filter(
+                cabana=cabana, fecha__gte=desde, fecha__lt=hasta
+            ).order_by('fecha').values_list('fecha', flat=True)
+            return Response({
+                'cabana_id': cabana.id,
+                'desde': desde,
+                'hasta': hasta,
+                'ocupado': _agrupar_noches(fechas),
+            })
+
+        # La versión del calendario se conoce sin consultar las noches ocupadas
+        version = cabana.calendario_actualizado_en or cabana.creada_en
+        return respuesta_condicional(request, version, generar, cabana.pk, desde, hasta)
+
+    @action(detail=False, methods=['get'])
+    def mapa(self, request):
+        """
+        Cabañas del mapa para un zoom y una vista (?zoom=&bbox=oeste,sur,este,norte),
+        con los filtros del listado. Por debajo de ZOOM_PUNTOS_MAPA devuelve grupos
+        (total y centro de cada celda de la rejilla) y desde ahí, puntos. Cada tesela
+        se cachea aparte: al mover el mapa solo se calculan, en una consulta, las nuevas.
+        """
+        try:
+            zoom = int(request.query_params.get('zoom', ''))
+        except ValueError:
+            raise ValidationError({'zoom': 'Debe ser un número entero.'})
+        if not 0 <= zoom <= ZOOM_MAXIMO_MAPA:
+            raise ValidationError({'zoom': f'Debe estar entre 0 y {ZOOM_MAXIMO_MAPA}.'})
+        if 'bbox' in request.query_params:
+            caja = leer_bbox(request.query_params['bbox'])
+        else:
+            caja = (-LATITUD_MAXIMA_MERCATOR, -180.0, LATITUD_MAXIMA_MERCATOR, 180.0)
+        teselas = teselas_caja(*caja, zoom)
+        if len(teselas) > MAX_TESELAS_MAPA:
+            raise ValidationError({'bbox': 'La vista abarca demasiadas teselas para este zoom.'})
+
+        # Los filtros del listado, sin los de ubicación ni orden, que aquí no aplican
+        queryset = self.get_queryset()
+        for backend in (DjangoFilterBackend, BusquedaCabanasFilter):
+            queryset = backend().filter_queryset(request, queryset, self)
+        con_puntos = zoom >= ZOOM_PUNTOS_MAPA
+        precision = precision_para_zoom(zoom)
+        filtros = self._firma_filtros(PARAMETROS_FUERA_DEL_MAPA)
+        firmas = {f"mapa|{zoom}/{x}/{y}|{filtros}": (x, y) for x, y in teselas}
+
+        def calcular(faltantes):
+            # Una sola consulta para todas las teselas que no estaban en caché
+            por_tesela = {firmas[firma]: [] for firma in faltantes}
+            cabanas = queryset.en_caja(*caja_teselas(zoom, list(por_tesela)))
+            if con_puntos:
+                for punto in cabanas.puntos_mapa():
+                    por_tesela.get(tesela(punto['lat'], punto['lng'], zoom), []).append(punto)
+            else:
+                for grupo in cabanas.grupos_mapa(zoom, precision):
+                    por_tesela.get((int(grupo['tesela_x']), int(grupo['tesela_y'])), []).append({
+                        'lat': round(grupo['lat'], 6), 'lng': round(grupo['lng'], 6), 'total': grupo['total'],
+                    })
+            return {firma: por_tesela[firmas[firma]] for firma in faltantes}
+
+        valores = valores_cacheados(list(firmas), self.get_espacios_listado(), calcular, prefijo='mapa')
+        elementos = [elemento for firma in firmas for elemento in valores[firma]]
+        return Response({
+            'zoom': zoom,
+            'grupos': [] if con_puntos else elementos,
+            'puntos': elementos if con_puntos else [],
+        })
+
+    @action(detail=True, methods=['get'])
+    def resenas(self, request, pk=None):
+        """Reseñas de una cabaña, de la más reciente a la más antigua, paginadas por cursor"""
+        cabana = self.get_object()
+        resenas = self.podar_queryset(Resena.objects.filter(cabana=cabana).select_related('usuario__persona'))
+
+        paginador = PaginacionCursorResenas()
+        # Sin view: el orden es el del paginador y no el de las cabañas
+        page = paginador.paginate_queryset(resenas, request)
+        serializer = self.get_serializer(page, many=True)
+        return paginador.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated, IsTeamMember])
+    def agregar_imagen(self, request, pk=None):
+        """Agregar imágenes a una cabaña"""
+        # get_object() comprueba que el usuario sea miembro del equipo de la cabaña
+        cabana = self.get_object()
         
         serializer = ImagenCabanaCreateSerializer(
             data=request.data,
@@ -182,6 +385,22 @@ class CabanaViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['post'], parser_classes=[MultiPartParser])
+    def agregar_imagenes(self, request, pk=None):
+        """
+        Subir varias imágenes en una petición (campo 'imagenes' repetido). Los archivos
+        se reciben por trozos con límites de tamaño y se procesan en segundo plano.
+        """
+        # get_object() comprueba los permisos antes de leer el cuerpo
+        cabana = self.get_object()
+        archivos = request.FILES.getlist('imagenes')
+        if not archivos:
+            return Response({'imagenes': ["Envía al menos una imagen."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        imagenes = crear_imagenes(cabana, archivos)
+        serializer = ImagenCabanaSerializer(imagenes, many=True, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def agregar_resena(self, request, pk=None):
         """Agregar reseña a una cabaña"""
@@ -211,13 +430,12 @@ class CabanaViewSet(viewsets.ModelViewSet):
             )
         
         # Obtener cabañas de los equipos donde el usuario es miembro
-        team_ids = TeamMember.objects.filter(user=request.user).values_list('team_id', flat=True)
-        cabanas = Cabana.objects.filter(team_id__in=team_ids).prefetch_related(
-            'servicios', 'imagenes', 'team'
-        )
-        
-        serializer = CabanaListSerializer(cabanas, many=True, context={'request': request})
-        return Response(serializer.data)
+        team_ids = list(obtener_membresias(request))
+        cabanas = Cabana.objects.filter(team_id__in=team_ids).valores_listado(self._campos_listado())
+
+        page = self.paginate_queryset(cabanas)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'], url_path='team/(?P<team_id>[^/.]+)')
     def cabanas_por_equipo(self, request, team_id=None):
@@ -226,36 +444,33 @@ class CabanaViewSet(viewsets.ModelViewSet):
         - Solo muestra cabañas disponibles si el usuario no está autenticado
         - Si el usuario pertenece al equipo, puede ver todas
         """
-        if request.user.is_authenticated:
-            # Verificar si el usuario pertenece al equipo
-            es_miembro = TeamMember.objects.filter(user=request.user, team_id=team_id).exists()
-            if es_miembro:
-                cabanas = Cabana.objects.filter(team_id=team_id).prefetch_related('servicios', 'imagenes', 'team')
-            else:
-                # Si no es miembro, mostrar solo las disponibles
-                cabanas = Cabana.objects.filter(team_id=team_id, estado='disponible').prefetch_related('servicios', 'imagenes', 'team')
+        if rol_en_equipo(request, team_id) is not None:
+            cabanas = Cabana.objects.filter(team_id=team_id).valores_listado(self._campos_listado())
         else:
-            # Usuario no autenticado: solo cabañas disponibles
-            cabanas = Cabana.objects.filter(team_id=team_id, estado='disponible').prefetch_related('servicios', 'imagenes', 'team')
+            # Usuario no autenticado o que no es miembro: solo cabañas disponibles
+            cabanas = Cabana.objects.filter(team_id=team_id, estado='disponible').valores_listado(
+                self._campos_listado()
+            )
 
-        serializer = CabanaListSerializer(cabanas, many=True, context={'request': request})
-        return Response(serializer.data)
+        page = self.paginate_queryset(cabanas)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
 
-class ImagenCabanaViewSet(viewsets.ModelViewSet):
+class ImagenCabanaViewSet(CamposElegidosMixin, viewsets.ModelViewSet):
     """
     ViewSet para manejar imágenes de cabañas
     """
     serializer_class = ImagenCabanaSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsTeamMember]
     parser_classes = [MultiPartParser, FormParser]
+    team_field = 'cabana.team_id'
 
     def get_queryset(self):
         # Solo imágenes de cabañas donde el usuario es miembro del equipo
-        user = self.request.user
-        team_ids = TeamMember.objects.filter(user=user).values_list('team_id', flat=True)
-        return ImagenCabana.objects.filter(cabana__team_id__in=team_ids)
+        team_ids = list(obtener_membresias(self.request))
+        return ImagenCabana.objects.filter(cabana__team_id__in=team_ids).select_related('cabana')
 
     def perform_create(self, serializer):
         """Verificar permisos antes de crear imagen"""
@@ -266,49 +481,20 @@ class ImagenCabanaViewSet(viewsets.ModelViewSet):
         cabana = get_object_or_404(Cabana, id=cabana_id)
         
         # Verificar permisos
-        team_member = TeamMember.objects.filter(
-            user=self.request.user,
-            team=cabana.team
-        ).first()
-        
-        if not team_member:
+        if rol_en_equipo(self.request, cabana.team_id) is None:
             raise PermissionDenied("No tienes permisos para agregar imágenes a esta cabaña.")
         
         serializer.save(cabana=cabana)
 
-    def perform_update(self, serializer):
-        """Verificar permisos antes de actualizar"""
-        imagen = self.get_object()
-        
-        team_member = TeamMember.objects.filter(
-            user=self.request.user,
-            team=imagen.cabana.team
-        ).first()
-        
-        if not team_member:
-            raise PermissionDenied("No tienes permisos para editar esta imagen.")
-        
-        serializer.save()
-
-    def perform_destroy(self, instance):
-        """Verificar permisos antes de eliminar"""
-        team_member = TeamMember.objects.filter(
-            user=self.request.user,
-            team=instance.cabana.team
-        ).first()
-        
-        if not team_member:
-            raise PermissionDenied("No tienes permisos para eliminar esta imagen.")
-        
-        instance.delete()
-
 
-class ResenaViewSet(viewsets.ModelViewSet):
+class ResenaViewSet(GetCondicionalMixin, CamposElegidosMixin, viewsets.ModelViewSet):
     """
     ViewSet para manejar reseñas
     """
+    campo_modificacion = 'fecha_actualizacion'
     serializer_class = ResenaSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PaginacionCursorResenas
 
     def get_queryset(self):
         if self.action in ['list', 'retrieve']:
@@ -1,5 +1,13 @@
 from django.contrib import admin
-from .models import Reserva, ReservaCabana
+from .models import Reserva, ReservaCabana, OcupacionNoche, TarifaTemporada
+
+
+@admin.register(Reserva)
+class ReservaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'cliente', 'fecha_inicio', 'fecha_fin', 'estado', 'pago_en_conflicto')
+    list_filter = ('estado', 'pago_en_conflicto')
+
 
-admin.site.register(Reserva)
 admin.site.register(ReservaCabana)
+admin.site.register(OcupacionNoche)
+admin.site.register(TarifaTemporada)
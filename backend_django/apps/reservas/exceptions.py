@@ -0,0 +1,9 @@
+# apps/reservas/exceptions.py
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class ReservaSolapada(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'La cabaña ya está reservada en alguna de las noches seleccionadas.'
+    default_code = 'reserva_solapada'
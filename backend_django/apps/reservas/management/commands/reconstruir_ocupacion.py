@@ -0,0 +1,74 @@
+# apps/reservas/management/commands/reconstruir_ocupacion.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+
+from apps.reservas.models import OcupacionNoche, ReservaCabana, marcar_calendarios
+
+ESTADOS_ACTIVOS = ['pendiente', 'confirmada']
+
+
+class Command(BaseCommand):
+    help = "Rellena el registro de noches ocupadas (OcupacionNoche) a partir de las reservas existentes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limpiar', action='store_true',
+            help="Borra todo el registro antes de reconstruirlo."
+        )
+        parser.add_argument('--lote', type=int, default=1000, help="Filas por inserción.")
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        if options['limpiar']:
+            OcupacionNoche.objects.all().delete()
+        else:
+            # Quedan solo las filas de una noche de una cabaña de una reserva activa: se
+            # van las de reservas canceladas y las que dejaron cambios de fechas o cabañas
+            respaldada = ReservaCabana.objects.filter(
+                reserva_id=OuterRef('reserva_id'), cabana_id=OuterRef('cabana_id'),
+                reserva__estado__in=ESTADOS_ACTIVOS,
+            )
+            OcupacionNoche.objects.exclude(
+                Exists(respaldada), fecha__gte=F('reserva__fecha_inicio'), fecha__lt=F('reserva__fecha_fin'),
+            ).delete()
+        conservadas = OcupacionNoche.objects.count()
+
+        activas = ReservaCabana.objects.filter(
+            reserva__estado__in=ESTADOS_ACTIVOS
+        ).select_related('reserva').order_by('reserva_id')
+
+        esperadas = insertadas = 0
+        filas = []
+
+        def insertar(filas):
+            # ignore_conflicts no dice qué filas entraron: se cuentan antes y después
+            antes = OcupacionNoche.objects.count()
+            OcupacionNoche.objects.bulk_create(filas, ignore_conflicts=True)
+            return OcupacionNoche.objects.count() - antes
+
+        for reserva_cabana in activas.iterator():
+            for fecha in reserva_cabana.reserva.noches():
+                filas.append(OcupacionNoche(
+                    cabana_id=reserva_cabana.cabana_id, fecha=fecha, reserva_id=reserva_cabana.reserva_id
+                ))
+            if len(filas) >= options['lote']:
+                esperadas += len(filas)
+                insertadas += insertar(filas)
+                filas = []
+        if filas:
+            esperadas += len(filas)
+            insertadas += insertar(filas)
+        marcar_calendarios()
+
+        # Cada noche esperada ya estaba registrada, se insertó o la ocupa otra reserva
+        # (solapamientos previos a la restricción única)
+        conflictos = esperadas - conservadas - insertadas
+        self.stdout.write(self.style.SUCCESS(
+            f"{conservadas + insertadas} noches ocupadas registradas ({insertadas} nuevas)."
+        ))
+        if conflictos:
+            self.stdout.write(self.style.WARNING(
+                f"{conflictos} noches no se registraron porque ya estaban ocupadas por otra reserva."
+            ))
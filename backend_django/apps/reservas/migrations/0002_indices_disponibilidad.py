@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cabanas', '0002_calificaciones_agregadas'),
+        ('reservas', '0001_initial'),
+        ('usuarios', '0005_usuario_rol_alter_usuario_tipo_usuario'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['fecha_inicio', 'fecha_fin', 'estado'], name='reservas_re_fecha_i_11a125_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservacabana',
+            index=models.Index(fields=['cabana', 'reserva'], name='reservas_re_cabana__86e81e_idx'),
+        ),
+    ]
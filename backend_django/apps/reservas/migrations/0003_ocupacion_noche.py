@@ -0,0 +1,49 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:09
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def ocupar_reservas_activas(apps, schema_editor):
+    ReservaCabana = apps.get_model('reservas', 'ReservaCabana')
+    OcupacionNoche = apps.get_model('reservas', 'OcupacionNoche')
+    activas = ReservaCabana.objects.filter(
+        reserva__estado__in=['pendiente', 'confirmada']
+    ).select_related('reserva').order_by('reserva_id')
+    filas = []
+    for rc in activas.iterator():
+        reserva = rc.reserva
+        for i in range((reserva.fecha_fin - reserva.fecha_inicio).days):
+            filas.append(OcupacionNoche(
+                cabana_id=rc.cabana_id, fecha=reserva.fecha_inicio + timedelta(days=i), reserva_id=reserva.id
+            ))
+    # Si ya existían reservas solapadas, la más antigua conserva la noche
+    OcupacionNoche.objects.bulk_create(filas, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cabanas', '0002_calificaciones_agregadas'),
+        ('reservas', '0002_indices_disponibilidad'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcupacionNoche',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('cabana', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ocupaciones', to='cabanas.cabana')),
+                ('reserva', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ocupaciones', to='reservas.reserva')),
+            ],
+            options={
+                'verbose_name': 'Ocupación por noche',
+                'verbose_name_plural': 'Ocupaciones por noche',
+                'constraints': [models.UniqueConstraint(fields=('cabana', 'fecha'), name='ocupacion_unica_por_noche')],
+            },
+        ),
+        migrations.RunPython(ocupar_reservas_activas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cabanas', '0003_calendario_actualizado_en'),
+        ('reservas', '0003_ocupacion_noche'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TarifaTemporada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100)),
+                ('fecha_inicio', models.DateField(blank=True, help_text='Primer día de la temporada. Vacío: sin límite', null=True)),
+                ('fecha_fin', models.DateField(blank=True, help_text='Último día de la temporada (incluido). Vacío: sin límite', null=True)),
+                ('dias_semana', models.CharField(blank=True, default='', help_text="Días en que aplica (0=lunes ... 6=domingo), p. ej. '45' para viernes y sábado. Vacío: todos", max_length=7)),
+                ('precio_por_noche', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('prioridad', models.PositiveIntegerField(default=0)),
+                ('activa', models.BooleanField(default=True)),
+                ('cabana', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tarifas', to='cabanas.cabana')),
+            ],
+            options={
+                'verbose_name': 'Tarifa de temporada',
+                'verbose_name_plural': 'Tarifas de temporada',
+                'ordering': ['cabana', '-prioridad'],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cabanas', '0007_ubicacion'),
+        ('reservas', '0004_tarifas_temporada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='cabanas',
+            field=models.ManyToManyField(related_name='reservas', through='reservas.ReservaCabana', to='cabanas.cabana'),
+        ),
+    ]
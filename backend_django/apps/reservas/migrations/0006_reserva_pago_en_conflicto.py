@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 12:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0005_reserva_cabanas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='pago_en_conflicto',
+            field=models.BooleanField(default=False),
+        ),
+    ]
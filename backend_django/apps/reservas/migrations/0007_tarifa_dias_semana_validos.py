@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-18 12:08
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0006_reserva_pago_en_conflicto'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tarifatemporada',
+            name='dias_semana',
+            field=models.CharField(blank=True, default='', help_text="Días en que aplica (0=lunes ... 6=domingo), p. ej. '45' para viernes y sábado. Vacío: todos", max_length=7, validators=[django.core.validators.RegexValidator('^[0-6]*$', 'Solo dígitos del 0 (lunes) al 6 (domingo).')]),
+        ),
+    ]
@@ -1,6 +1,11 @@
-from django.db import models
+from datetime import timedelta
+
+from django.core.validators import RegexValidator
+from django.db import connection, models
+from django.utils import timezone
 from apps.cabanas.models import Cabana
 from apps.usuarios.models import Cliente
+from myproject.cache import invalidar
 
 class Reserva(models.Model):
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE)
@@ -12,10 +17,83 @@ class Reserva(models.Model):
         ('confirmada', 'Confirmada'),
         ('cancelada', 'Cancelada')
     ], default='pendiente')
+    # Pagada en Stripe cuando sus noches ya eran de otra reserva: sigue pendiente y hay que resolverla a mano
+    pago_en_conflicto = models.BooleanField(default=False)
+    # Las filas las crea y cambia ReservaSerializer sobre ReservaCabana
+    cabanas = models.ManyToManyField(Cabana, through='ReservaCabana', related_name='reservas')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_inicio', 'fecha_fin', 'estado']),
+        ]
 
     def __str__(self):
         return f"Reserva: {self.cliente.persona.nombre} {self.cliente.persona.apellido}"
 
+    def noches(self):
+        """Fechas de cada noche de la estancia (la fecha de salida no se ocupa)"""
+        return [self.fecha_inicio + timedelta(days=i) for i in range((self.fecha_fin - self.fecha_inicio).days)]
+
+    def ocupar(self, cabanas):
+        """
+        Registra una fila por cabaña y noche. El índice único de OcupacionNoche
+        rechaza con IntegrityError cualquier noche ya ocupada por otra reserva.
+        """
+        OcupacionNoche.objects.bulk_create([
+            OcupacionNoche(cabana=cabana, fecha=fecha, reserva=self)
+            for cabana in cabanas
+            for fecha in self.noches()
+        ])
+        marcar_calendarios([cabana.pk for cabana in cabanas])
+
+    def liberar(self):
+        """Libera todas las noches ocupadas por esta reserva"""
+        cabana_ids = set(self.ocupaciones.values_list('cabana_id', flat=True))
+        if cabana_ids:
+            self.ocupaciones.all().delete()
+            marcar_calendarios(cabana_ids)
+
+    def sincronizar_ocupacion(self):
+        """
+        Ajusta el registro de noches al estado actual de la reserva: una reserva
+        cancelada no ocupa noches y una activa ocupa exactamente las noches de
+        sus cabañas. Lanza IntegrityError si alguna noche ya está ocupada.
+        """
+        if self.estado == 'cancelada':
+            self.liberar()
+            return
+
+        cabana_ids = list(self.reservacabana_set.values_list('cabana_id', flat=True))
+        esperadas = {(cabana_id, fecha) for cabana_id in cabana_ids for fecha in self.noches()}
+        existentes = set(self.ocupaciones.values_list('cabana_id', 'fecha'))
+        sobrantes = existentes - esperadas
+        faltantes = esperadas - existentes
+
+        if sobrantes:
+            self.ocupaciones.exclude(
+                cabana_id__in=cabana_ids, fecha__gte=self.fecha_inicio, fecha__lt=self.fecha_fin
+            ).delete()
+        if faltantes:
+            OcupacionNoche.objects.bulk_create([
+                OcupacionNoche(cabana_id=cabana_id, fecha=fecha, reserva=self)
+                for cabana_id, fecha in faltantes
+            ])
+        marcar_calendarios({cabana_id for cabana_id, _ in sobrantes | faltantes})
+
+
+def marcar_calendarios(cabana_ids=None):
+    """
+    Registra que el calendario de ocupación de estas cabañas (todas si no se indican)
+    cambió, para ETag/Last-Modified, e invalida las respuestas que dependen de la
+    ocupación. Todo cambio de OcupacionNoche pasa por aquí.
+    """
+    cabanas = Cabana.objects.all()
+    if cabana_ids is not None:
+        if not cabana_ids:
+            return
+        cabanas = cabanas.filter(pk__in=cabana_ids)
+    cabanas.update(calendario_actualizado_en=timezone.now())
+    invalidar('ocupacion')
 
 
 class ReservaCabana(models.Model):
@@ -24,7 +102,106 @@ class ReservaCabana(models.Model):
 
     class Meta:
         unique_together = ('reserva', 'cabana')
+        indexes = [
+            models.Index(fields=['cabana', 'reserva']),
+        ]
 
     def __str__(self):
         return f"Reserva {self.reserva.id} - {self.cabana.nombre}"
 
+
+class OcupacionNocheManager(models.Manager):
+
+    def disponibilidad_en_lote(self, consultas):
+        """
+        Resuelve muchas consultas (cabana_id, fecha_inicio, fecha_fin) con una sola
+        consulta: una lista VALUES unida a las cabañas y a las noches ocupadas.
+        Devuelve {indice: (existe_cabana, disponible)}.
+        """
+        if not consultas:
+            return {}
+
+        valores = ', '.join(['(%s, %s, %s, %s)'] * len(consultas))
+        parametros = []
+        for indice, (cabana_id, fecha_inicio, fecha_fin) in enumerate(consultas):
+            parametros.extend([indice, cabana_id, fecha_inicio, fecha_fin])
+
+        sql = f"""
+            WITH consultas (indice, cabana_id, fecha_inicio, fecha_fin) AS (VALUES {valores})
+            SELECT c.indice,
+                   cab.id IS NOT NULL,
+                   NOT EXISTS (
+                       SELECT 1 FROM {self.model._meta.db_table} o
+                       WHERE o.cabana_id = c.cabana_id
+                         AND o.fecha >= c.fecha_inicio
+                         AND o.fecha < c.fecha_fin
+                   )
+            FROM consultas c
+            LEFT JOIN {Cabana._meta.db_table} cab ON cab.id = c.cabana_id
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, parametros)
+            return {indice: (bool(existe), bool(disponible)) for indice, existe, disponible in cursor.fetchall()}
+
+
+RESTRICCION_OCUPACION = 'ocupacion_unica_por_noche'
+
+
+class OcupacionNoche(models.Model):
+    """
+    Una noche ocupada de una cabaña por una reserva pendiente o confirmada.
+    La restricción única (cabana, fecha) impide reservas solapadas a nivel de base de datos.
+    """
+    cabana = models.ForeignKey(Cabana, on_delete=models.CASCADE, related_name='ocupaciones')
+    fecha = models.DateField()
+    reserva = models.ForeignKey(Reserva, on_delete=models.CASCADE, related_name='ocupaciones')
+
+    objects = OcupacionNocheManager()
+
+    class Meta:
+        verbose_name = 'Ocupación por noche'
+        verbose_name_plural = 'Ocupaciones por noche'
+        constraints = [
+            models.UniqueConstraint(fields=['cabana', 'fecha'], name=RESTRICCION_OCUPACION),
+        ]
+
+    def __str__(self):
+        return f"{self.cabana.nombre} - {self.fecha}"
+
+    @classmethod
+    def es_solapamiento(cls, error):
+        """True si el IntegrityError viene de la restricción única (cabana, fecha) y no de otra"""
+        # psycopg indica la restricción; SQLite solo la describe en el mensaje
+        diag = getattr(error.__cause__, 'diag', None)
+        if diag is not None and diag.constraint_name:
+            return diag.constraint_name == RESTRICCION_OCUPACION
+        tabla = cls._meta.db_table
+        mensaje = str(error)
+        return RESTRICCION_OCUPACION in mensaje or f'{tabla}.cabana_id, {tabla}.fecha' in mensaje
+
+
+class TarifaTemporada(models.Model):
+    """
+    Precio por noche especial de una cabaña para una temporada y/o ciertos días de la semana.
+    Si varias tarifas aplican a la misma noche, gana la de mayor prioridad.
+    """
+    cabana = models.ForeignKey(Cabana, on_delete=models.CASCADE, related_name='tarifas')
+    nombre = models.CharField(max_length=100)
+    fecha_inicio = models.DateField(null=True, blank=True, help_text="Primer día de la temporada. Vacío: sin límite")
+    fecha_fin = models.DateField(null=True, blank=True, help_text="Último día de la temporada (incluido). Vacío: sin límite")
+    dias_semana = models.CharField(
+        max_length=7, blank=True, default='',
+        validators=[RegexValidator(r'^[0-6]*$', "Solo dígitos del 0 (lunes) al 6 (domingo).")],
+        help_text="Días en que aplica (0=lunes ... 6=domingo), p. ej. '45' para viernes y sábado. Vacío: todos"
+    )
+    precio_por_noche = models.DecimalField(max_digits=10, decimal_places=2)
+    prioridad = models.PositiveIntegerField(default=0)
+    activa = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name = 'Tarifa de temporada'
+        verbose_name_plural = 'Tarifas de temporada'
+        ordering = ['cabana', '-prioridad']
+
+    def __str__(self):
+        return f"{self.nombre} - {self.cabana.nombre}"
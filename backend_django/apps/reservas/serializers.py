@@ -1,14 +1,30 @@
 # apps/reservas/serializers.py
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from .models import Reserva, ReservaCabana
+from .exceptions import ReservaSolapada
+from .models import OcupacionNoche, Reserva, ReservaCabana
+from .tarifas import cotizar
 from apps.cabanas.models import Cabana
+from apps.cabanas.serializers import CabanaResumenSerializer
+from myproject.campos import CamposElegiblesMixin
+from myproject.incluidos import IncluiblesMixin
+
+# Noches como máximo por estancia: acota el cálculo del precio noche a noche y su desglose
+MAX_NOCHES_ESTANCIA = 366
+
+
+def validar_estancia(fecha_inicio, fecha_fin):
+    if fecha_fin <= fecha_inicio:
+        raise serializers.ValidationError({'fecha_fin': 'Debe ser posterior a fecha_inicio.'})
+    if (fecha_fin - fecha_inicio).days > MAX_NOCHES_ESTANCIA:
+        raise serializers.ValidationError({'fecha_fin': f'La estancia no puede pasar de {MAX_NOCHES_ESTANCIA} noches.'})
 
 class ReservaCabanaSerializer(serializers.ModelSerializer):
     class Meta:
         model = ReservaCabana
         fields = ['cabana']
 
-class ReservaSerializer(serializers.ModelSerializer):
+class ReservaSerializer(CamposElegiblesMixin, IncluiblesMixin, serializers.ModelSerializer):
     cabanas = serializers.PrimaryKeyRelatedField(
         queryset=Cabana.objects.all(), many=True, write_only=True
     )
@@ -16,11 +32,70 @@ class ReservaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Reserva
         fields = ['id', 'cliente', 'fecha_inicio', 'fecha_fin', 'precio_final', 'estado', 'cabanas']
-        read_only_fields = ['estado']
+        read_only_fields = ['estado', 'precio_final']
+        # Solo se escriben; con ?include=cabanas se leen como ids y se describen aparte
+        incluibles = {'cabanas': CabanaResumenSerializer}
+
+    def validate(self, data):
+        cabanas = data.get('cabanas')
+        if cabanas is not None and len({cabana.pk for cabana in cabanas}) != len(cabanas):
+            raise serializers.ValidationError({'cabanas': 'No se puede repetir una cabaña.'})
+
+        fecha_inicio = data.get('fecha_inicio', getattr(self.instance, 'fecha_inicio', None))
+        fecha_fin = data.get('fecha_fin', getattr(self.instance, 'fecha_fin', None))
+        if fecha_inicio and fecha_fin:
+            validar_estancia(fecha_inicio, fecha_fin)
+
+        # El precio siempre se calcula en el servidor con las tarifas de cada cabaña
+        if self.instance is None or {'fecha_inicio', 'fecha_fin', 'cabanas'} & data.keys():
+            cabanas = data.get('cabanas')
+            if cabanas is None:
+                cabanas = Cabana.objects.filter(reservacabana__reserva=self.instance)
+            data['precio_final'] = sum(
+                cotizar(cabana, fecha_inicio, fecha_fin)['total'] for cabana in cabanas
+            )
+        return data
 
     def create(self, validated_data):
         cabanas = validated_data.pop('cabanas')
-        reserva = Reserva.objects.create(**validated_data)
-        for cabana in cabanas:
-            ReservaCabana.objects.create(reserva=reserva, cabana=cabana)
+        try:
+            with transaction.atomic():
+                reserva = Reserva.objects.create(**validated_data)
+                ReservaCabana.objects.bulk_create([
+                    ReservaCabana(reserva=reserva, cabana=cabana) for cabana in cabanas
+                ])
+                reserva.ocupar(cabanas)
+        except IntegrityError as error:
+            if OcupacionNoche.es_solapamiento(error):
+                raise ReservaSolapada()
+            raise
         return reserva
+
+    def update(self, instance, validated_data):
+        cabanas = validated_data.pop('cabanas', None)
+        try:
+            with transaction.atomic():
+                if cabanas is not None:
+                    ReservaCabana.objects.filter(reserva=instance).delete()
+                    ReservaCabana.objects.bulk_create([
+                        ReservaCabana(reserva=instance, cabana=cabana) for cabana in cabanas
+                    ])
+                # Al guardar, la señal post_save ajusta las noches a las fechas y cabañas vigentes
+                instance = super().update(instance, validated_data)
+        except IntegrityError as error:
+            if OcupacionNoche.es_solapamiento(error):
+                raise ReservaSolapada()
+            raise
+        return instance
+
+
+class ConsultaEstanciaSerializer(serializers.Serializer):
+    """Una cabaña y un rango de fechas, para consultas de disponibilidad y cotizaciones"""
+    cabana_id = serializers.IntegerField(min_value=1)
+    fecha_inicio = serializers.DateField()
+    fecha_fin = serializers.DateField()
+
+    def validate(self, data):
+        validar_estancia(data['fecha_inicio'], data['fecha_fin'])
+        return data
+
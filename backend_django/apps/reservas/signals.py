@@ -1,10 +1,44 @@
-
-# apps/reservas/signals.py (opcional si quieres crear hooks automáticos al crear reservas)
-from django.db.models.signals import post_save
+# apps/reservas/signals.py
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
-from .models import Reserva
+from django.utils import timezone
+from apps.cabanas.models import Cabana
+from .models import Reserva, TarifaTemporada, marcar_calendarios
+from .tarifas import invalidar_tabla
 
 @receiver(post_save, sender=Reserva)
-def enviar_notificacion_reserva(sender, instance, created, **kwargs):
-    if created:
-        print(f"Nueva reserva creada: #{instance.id}")
+def sincronizar_noches_reserva(sender, instance, created, **kwargs):
+    """
+    Mantiene el registro de noches ocupadas cuando una reserva se confirma o se cancela.
+    Al crearla, las noches las registra ReservaSerializer junto con sus cabañas.
+    """
+    if not created:
+        instance.sincronizar_ocupacion()
+
+
+@receiver(pre_delete, sender=Reserva)
+def recordar_cabanas_ocupadas(sender, instance, **kwargs):
+    """Las noches se borran en cascada con la reserva: guarda antes sus cabañas"""
+    instance._cabanas_ocupadas = set(instance.ocupaciones.values_list('cabana_id', flat=True))
+
+
+@receiver(post_delete, sender=Reserva)
+def liberar_noches_reserva_borrada(sender, instance, **kwargs):
+    marcar_calendarios(getattr(instance, '_cabanas_ocupadas', ()))
+
+
+@receiver(post_save, sender=Cabana)
+def invalidar_tarifas_cabana(sender, instance, **kwargs):
+    """
+    Descarta la tabla de tarifas compilada al guardar la cabaña
+    """
+    invalidar_tabla(instance.pk)
+
+@receiver(post_save, sender=TarifaTemporada)
+@receiver(post_delete, sender=TarifaTemporada)
+def invalidar_tarifas_temporada(sender, instance, **kwargs):
+    """
+    Cambia la versión de la cabaña para que todos los procesos recompilen sus tarifas
+    """
+    Cabana.objects.filter(pk=instance.cabana_id).update(actualizada_en=timezone.now())
+    invalidar_tabla(instance.cabana_id)
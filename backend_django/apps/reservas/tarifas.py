@@ -0,0 +1,69 @@
+# apps/reservas/tarifas.py
+"""
+Motor de precios de las reservas.
+
+El precio de cada noche es el de la tarifa de temporada de mayor prioridad
+que aplique a esa fecha o, si ninguna aplica, el costo_por_noche de la cabaña.
+Las tarifas de cada cabaña se compilan una vez en una TablaTarifas que se
+guarda en memoria del proceso y se descarta cuando cambia actualizada_en
+de la cabaña (al guardarla o al modificar sus tarifas).
+"""
+from datetime import timedelta
+
+_tablas = {}
+
+
+class TablaTarifas:
+    """Tarifas de una cabaña compiladas para calcular precios sin consultar la base de datos"""
+
+    def __init__(self, cabana, tarifas):
+        self.version = cabana.actualizada_en
+        self.precio_base = cabana.costo_por_noche
+        self.reglas = [
+            (
+                tarifa.fecha_inicio,
+                tarifa.fecha_fin,
+                {int(dia) for dia in tarifa.dias_semana if dia.isdigit()} if tarifa.dias_semana else None,
+                tarifa.precio_por_noche,
+                tarifa.nombre,
+            )
+            for tarifa in sorted(tarifas, key=lambda tarifa: -tarifa.prioridad)
+        ]
+
+    def precio_noche(self, fecha):
+        for inicio, fin, dias, precio, nombre in self.reglas:
+            if inicio and fecha < inicio:
+                continue
+            if fin and fecha > fin:
+                continue
+            if dias is not None and fecha.weekday() not in dias:
+                continue
+            return precio, nombre
+        return self.precio_base, None
+
+    def cotizar(self, fecha_inicio, fecha_fin):
+        desglose = []
+        total = 0
+        for i in range((fecha_fin - fecha_inicio).days):
+            fecha = fecha_inicio + timedelta(days=i)
+            precio, tarifa = self.precio_noche(fecha)
+            desglose.append({'fecha': fecha, 'precio': precio, 'tarifa': tarifa})
+            total += precio
+        return {'noches': len(desglose), 'desglose': desglose, 'total': total}
+
+
+def obtener_tabla(cabana):
+    tabla = _tablas.get(cabana.pk)
+    if tabla is None or tabla.version != cabana.actualizada_en:
+        tabla = TablaTarifas(cabana, cabana.tarifas.filter(activa=True))
+        _tablas[cabana.pk] = tabla
+    return tabla
+
+
+def invalidar_tabla(cabana_id):
+    _tablas.pop(cabana_id, None)
+
+
+def cotizar(cabana, fecha_inicio, fecha_fin):
+    """Desglose y total de la estancia en una cabaña (fecha_fin es el día de salida)"""
+    return obtener_tabla(cabana).cotizar(fecha_inicio, fecha_fin)
@@ -1,7 +1,236 @@
+from datetime import date
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
 from django.test import TestCase
-from .models import Reserva
+from .models import OcupacionNoche, Reserva, ReservaCabana
 
 class ReservaModelTest(TestCase):
     def test_crear_reserva(self):
         reserva = Reserva.objects.create(cliente='Cliente Test')
         self.assertEqual(reserva.cliente, 'Cliente Test')
+
+
+class ReservaSolapadaTest(TestCase):
+    def setUp(self):
+        from rest_framework.test import APIClient
+        from apps.cabanas.models import Cabana
+        from apps.teams.models import Team
+        from apps.usuarios.models import Usuario, Cliente
+
+        usuario = Usuario.objects.create_user(email='cliente@test.com', password='x', nombre_usuario='cliente')
+        self.cliente = Cliente.objects.create(persona=usuario.persona)
+        team = Team.objects.create(name='Equipo')
+        self.cabana = Cabana.objects.create(
+            team=team, nombre='Cabaña', descripcion='d', capacidad=2, costo_por_noche=100
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(usuario)
+
+    def reservar(self, fecha_inicio, fecha_fin):
+        return self.client.post('/api/reservas/reservas/', {
+            'cliente': self.cliente.pk,
+            'fecha_inicio': fecha_inicio,
+            'fecha_fin': fecha_fin,
+            'precio_final': '100.00',
+            'cabanas': [self.cabana.pk],
+        }, format='json')
+
+    def test_reserva_solapada_devuelve_409(self):
+        self.assertEqual(self.reservar('2026-07-10', '2026-07-13').status_code, 201)
+        self.assertEqual(self.reservar('2026-07-12', '2026-07-14').status_code, 409)
+        self.assertEqual(Reserva.objects.count(), 1)
+
+    def test_cabana_repetida_responde_400(self):
+        response = self.client.post('/api/reservas/reservas/', {
+            'cliente': self.cliente.pk, 'fecha_inicio': '2026-07-10', 'fecha_fin': '2026-07-13',
+            'cabanas': [self.cabana.pk, self.cabana.pk],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cabanas', response.data)
+        self.assertFalse(Reserva.objects.exists())
+
+    def test_otra_restriccion_no_es_solapamiento(self):
+        reserva = Reserva.objects.get(pk=self.reservar('2026-07-10', '2026-07-13').data['id'])
+        with self.assertRaises(IntegrityError) as contexto, transaction.atomic():
+            ReservaCabana.objects.create(reserva=reserva, cabana=self.cabana)
+        self.assertFalse(OcupacionNoche.es_solapamiento(contexto.exception))
+
+    def test_include_cabanas(self):
+        self.reservar('2026-07-10', '2026-07-13')
+        response = self.client.get('/api/reservas/reservas/?include=cabanas')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['cabanas'], [self.cabana.pk])
+        self.assertEqual(response.data['included']['cabanas'][self.cabana.pk]['nombre'], 'Cabaña')
+
+    def test_reserva_contigua_permitida(self):
+        self.assertEqual(self.reservar('2026-07-10', '2026-07-13').status_code, 201)
+        self.assertEqual(self.reservar('2026-07-13', '2026-07-15').status_code, 201)
+
+    def test_cancelar_libera_las_noches(self):
+        reserva = Reserva.objects.get(pk=self.reservar('2026-07-10', '2026-07-13').data['id'])
+        reserva.estado = 'cancelada'
+        reserva.save()
+        self.assertEqual(self.reservar('2026-07-10', '2026-07-13').status_code, 201)
+
+    def test_borrar_reserva_cambia_el_etag_del_calendario(self):
+        reserva_id = self.reservar('2026-07-10', '2026-07-13').data['id']
+        url = f'/api/cabanas/cabanas/{self.cabana.pk}/calendario/?desde=2026-07-01&hasta=2026-08-01'
+        etag = self.client.get(url)['ETag']
+
+        self.assertEqual(self.client.delete(f'/api/reservas/reservas/{reserva_id}/').status_code, 204)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['ocupado'], [])
+    def test_listado_por_fechas_se_invalida_al_crear_y_borrar(self):
+        cache.clear()
+        url = '/api/cabanas/cabanas/?fecha_inicio=2026-07-11&fecha_fin=2026-07-12'
+        self.assertEqual(len(self.client.get(url).data['results']), 1)
+        # invalidar() actúa al confirmar la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva_id = self.reservar('2026-07-10', '2026-07-13').data['id']
+        self.assertEqual(len(self.client.get(url).data['results']), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/reservas/reservas/{reserva_id}/')
+        self.assertEqual(len(self.client.get(url).data['results']), 1)
+
+    def test_pago_con_noches_ocupadas_queda_marcado(self):
+        reserva = Reserva.objects.get(pk=self.reservar('2026-07-10', '2026-07-13').data['id'])
+        reserva.estado = 'cancelada'
+        reserva.save()
+        self.assertEqual(self.reservar('2026-07-10', '2026-07-13').status_code, 201)
+
+        evento = {'type': 'checkout.session.completed',
+                  'data': {'object': {'metadata': {'reserva_id': str(reserva.pk)}}}}
+        with mock.patch('stripe.Webhook.construct_event', return_value=evento):
+            response = self.client.post('/api/reservas/stripe/webhook/', {}, format='json')
+        self.assertEqual(response.status_code, 200)
+        reserva.refresh_from_db()
+        self.assertTrue(reserva.pago_en_conflicto)
+        self.assertEqual(reserva.estado, 'cancelada')
+
+
+    def test_reconstruir_ocupacion_borra_noches_sin_respaldo(self):
+        reserva = Reserva.objects.get(pk=self.reservar('2026-07-10', '2026-07-13').data['id'])
+        # Cambio de fechas sin pasar por save(): las noches viejas quedan en el registro
+        Reserva.objects.filter(pk=reserva.pk).update(fecha_inicio='2026-08-01', fecha_fin='2026-08-03')
+        # Otra reserva activa con las mismas noches, de antes de la restricción única
+        solapada = Reserva.objects.create(
+            cliente=self.cliente, fecha_inicio='2026-08-02', fecha_fin='2026-08-04', precio_final=100
+        )
+        ReservaCabana.objects.create(reserva=solapada, cabana=self.cabana)
+
+        salida = StringIO()
+        call_command('reconstruir_ocupacion', stdout=salida)
+        noches = set(OcupacionNoche.objects.values_list('reserva_id', 'fecha'))
+        self.assertEqual(noches, {
+            (reserva.pk, date(2026, 8, 1)), (reserva.pk, date(2026, 8, 2)), (solapada.pk, date(2026, 8, 3)),
+        })
+        self.assertIn('1 noches no se registraron', salida.getvalue())
+
+
+class TarifasTest(TestCase):
+    def test_precio_por_noche_con_tarifas(self):
+        from datetime import date
+        from apps.cabanas.models import Cabana
+        from apps.teams.models import Team
+        from .models import TarifaTemporada
+        from .tarifas import cotizar
+
+        cabana = Cabana.objects.create(
+            team=Team.objects.create(name='Equipo'), nombre='Cabaña', descripcion='d',
+            capacidad=2, costo_por_noche=100
+        )
+        TarifaTemporada.objects.create(
+            cabana=cabana, nombre='Fin de semana', dias_semana='45', precio_por_noche=150, prioridad=1
+        )
+        TarifaTemporada.objects.create(
+            cabana=cabana, nombre='Verano', fecha_inicio=date(2026, 7, 1), fecha_fin=date(2026, 7, 31),
+            precio_por_noche=200, prioridad=2
+        )
+        cabana.refresh_from_db()
+
+        # Jueves 25/06 a jueves 02/07: 4 noches base, viernes y sábado de fin de semana, 1 de verano
+        cotizacion = cotizar(cabana, date(2026, 6, 25), date(2026, 7, 2))
+        self.assertEqual(cotizacion['noches'], 7)
+        self.assertEqual(cotizacion['total'], 4 * 100 + 2 * 150 + 200)
+
+    def test_estancia_demasiado_larga_responde_400(self):
+        from rest_framework.test import APIClient
+
+        response = APIClient().get(
+            '/api/reservas/reservas/cotizar/', {'cabana_id': 1, 'fecha_inicio': '0001-01-01', 'fecha_fin': '9999-12-31'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fecha_fin', response.data)
+
+    def test_dias_semana_solo_acepta_digitos_0_a_6(self):
+        from django.core.exceptions import ValidationError
+        from .models import TarifaTemporada
+
+        with self.assertRaises(ValidationError):
+            TarifaTemporada(dias_semana='lu').clean_fields(exclude=['cabana', 'nombre', 'precio_por_noche'])
+
+
+class DisponibilidadEnLoteTest(TestCase):
+    def setUp(self):
+        from rest_framework.test import APIClient
+        from apps.cabanas.models import Cabana
+        from apps.teams.models import Team
+        from apps.usuarios.models import Usuario, Cliente
+
+        usuario = Usuario.objects.create_user(email='cliente@test.com', password='x', nombre_usuario='cliente')
+        cliente = Cliente.objects.create(persona=usuario.persona)
+        team = Team.objects.create(name='Equipo')
+        self.ocupada, self.libre = [
+            Cabana.objects.create(team=team, nombre=f'Cabaña {i}', descripcion='d', capacidad=2, costo_por_noche=100)
+            for i in range(2)
+        ]
+        # Ocupa las noches del 10 y el 11 de julio (sale el 12)
+        reserva = Reserva.objects.create(
+            cliente=cliente, fecha_inicio=date(2026, 7, 10), fecha_fin=date(2026, 7, 12), precio_final=200
+        )
+        reserva.ocupar([self.ocupada])
+        self.client = APIClient()
+        self.client.force_authenticate(usuario)
+
+    def test_consulta_sql_en_lote(self):
+        disponibilidad = OcupacionNoche.objects.disponibilidad_en_lote([
+            (self.ocupada.pk, date(2026, 7, 11), date(2026, 7, 13)),  # pisa la noche del 11
+            (self.ocupada.pk, date(2026, 7, 12), date(2026, 7, 14)),  # entra el día de salida
+            (self.ocupada.pk, date(2026, 7, 8), date(2026, 7, 10)),   # sale el día de entrada
+            (self.libre.pk, date(2026, 7, 10), date(2026, 7, 12)),
+            (999999, date(2026, 7, 10), date(2026, 7, 12)),
+        ])
+        self.assertEqual(disponibilidad, {
+            0: (True, False), 1: (True, True), 2: (True, True), 3: (True, True), 4: (False, True),
+        })
+        self.assertEqual(OcupacionNoche.objects.disponibilidad_en_lote([]), {})
+
+    def test_endpoint_mezcla_validas_e_invalidas_con_una_consulta(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        consultas = [
+            {'cabana_id': self.ocupada.pk, 'fecha_inicio': '2026-07-10', 'fecha_fin': '2026-07-11'},
+            {'cabana_id': self.libre.pk, 'fecha_inicio': '2026-07-12', 'fecha_fin': '2026-07-10'},
+            {'cabana_id': 999999, 'fecha_inicio': '2026-07-10', 'fecha_fin': '2026-07-11'},
+            {'cabana_id': self.libre.pk, 'fecha_inicio': '2026-07-10', 'fecha_fin': '2026-07-11'},
+        ]
+        with CaptureQueriesContext(connection) as capturadas:
+            response = self.client.post(
+                '/api/reservas/reservas/check-availability-bulk/', {'consultas': consultas}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        resultados = response.data['resultados']
+        self.assertEqual([resultado['indice'] for resultado in resultados], [0, 1, 2, 3])
+        self.assertFalse(resultados[0]['available'])
+        self.assertIn('fecha_fin', resultados[1]['errores'])
+        self.assertIn('cabana_id', resultados[2]['errores'])
+        self.assertTrue(resultados[3]['available'])
+        self.assertEqual(sum('WITH consultas' in consulta['sql'] for consulta in capturadas.captured_queries), 1)
@@ -4,33 +4,49 @@ from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 from datetime import datetime
-from .models import Reserva
-from .serializers import ReservaSerializer
+from .models import Reserva, OcupacionNoche
+from .serializers import ReservaSerializer, ConsultaEstanciaSerializer
+from . import tarifas
 import stripe
 import json
+import logging
 from apps.usuarios.permissions import PropietarioOAdministrador
 from apps.cabanas.models import Cabana
 import os
 from dotenv import load_dotenv
 from apps.teams.models import Team  # si no lo tienes ya importado
+from myproject.campos import CamposElegidosMixin
+from myproject.incluidos import IncluidosMixin
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
 stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
 
+MAX_CONSULTAS_DISPONIBILIDAD = 500
+
 
-class ReservaViewSet(viewsets.ModelViewSet):
+class ReservaViewSet(IncluidosMixin, CamposElegidosMixin, viewsets.ModelViewSet):
     queryset = Reserva.objects.all()
     serializer_class = ReservaSerializer
     permission_classes = [permissions.IsAuthenticated, PropietarioOAdministrador]
+    incluibles = ('cabanas',)
 
     def get_queryset(self):
         user = self.request.user
         if user.is_staff:
-            return Reserva.objects.all()
-        return Reserva.objects.filter(cliente__persona__usuario=user)
+            reservas = Reserva.objects.order_by('-id')
+        else:
+            reservas = Reserva.objects.filter(cliente__persona__usuario=user).order_by('-id')
+        return self._con_incluidos(reservas)
+
+    def _con_incluidos(self, reservas):
+        # Las cabañas incluidas se cargan con un prefetch para toda la página
+        return reservas.prefetch_related('cabanas') if self.incluye('cabanas') else reservas
 
     @action(detail=True, methods=['post'], url_path='pagar')
     def iniciar_pago(self, request, pk=None):
@@ -87,15 +103,14 @@ class ReservaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Verificar si hay reservas que se solapan
-        reservas_solapadas = Reserva.objects.filter(
-            reservacabana__cabana=cabana,
-            estado__in=['pendiente', 'confirmada'],
-        ).filter(
-            Q(fecha_inicio__lt=fecha_fin) & Q(fecha_fin__gt=fecha_inicio)
+        # Verificar si alguna noche del rango ya está ocupada
+        noches_ocupadas = OcupacionNoche.objects.filter(
+            cabana=cabana,
+            fecha__gte=fecha_inicio,
+            fecha__lt=fecha_fin,
         )
 
-        disponible = not reservas_solapadas.exists()
+        disponible = not noches_ocupadas.exists()
 
         return Response({
             'available': disponible,
@@ -105,6 +120,62 @@ class ReservaViewSet(viewsets.ModelViewSet):
         })
     
 
+    @action(detail=False, methods=['post'], url_path='check-availability-bulk')
+    def check_availability_bulk(self, request):
+        """
+        Disponibilidad de muchas cabañas y rangos en una sola llamada.
+        Body: {"consultas": [{"cabana_id", "fecha_inicio", "fecha_fin"}, ...]}
+        """
+        consultas = request.data.get('consultas')
+        if not isinstance(consultas, list) or not consultas:
+            return Response(
+                {'error': 'Se requiere una lista no vacía en consultas'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(consultas) > MAX_CONSULTAS_DISPONIBILIDAD:
+            return Response(
+                {'error': f'Máximo {MAX_CONSULTAS_DISPONIBILIDAD} consultas por llamada'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        resultados = []
+        validas = []
+        for indice, consulta in enumerate(consultas):
+            serializer = ConsultaEstanciaSerializer(data=consulta)
+            if serializer.is_valid():
+                datos = serializer.validated_data
+                validas.append((indice, datos['cabana_id'], datos['fecha_inicio'], datos['fecha_fin']))
+                resultados.append({'indice': indice, **datos})
+            else:
+                resultados.append({'indice': indice, 'errores': serializer.errors})
+
+        disponibilidad = OcupacionNoche.objects.disponibilidad_en_lote([consulta[1:] for consulta in validas])
+        for posicion, (indice, *_) in enumerate(validas):
+            existe, disponible = disponibilidad[posicion]
+            if existe:
+                resultados[indice]['available'] = disponible
+            else:
+                resultados[indice]['errores'] = {'cabana_id': ['Cabaña no encontrada']}
+
+        return Response({'resultados': resultados})
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def cotizar(self, request):
+        """Precio de una estancia calculado con las tarifas de la cabaña"""
+        serializer = ConsultaEstanciaSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+
+        try:
+            cabana = Cabana.objects.get(id=datos['cabana_id'])
+        except Cabana.DoesNotExist:
+            return Response(
+                {'error': 'Cabaña no encontrada'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response({**datos, **tarifas.cotizar(cabana, datos['fecha_inicio'], datos['fecha_fin'])})
+
     @action(detail=False, methods=['get'], url_path='por-equipo')
     def reservas_por_equipo(self, request):
         team_id = request.query_params.get('team_id')
@@ -112,12 +183,13 @@ class ReservaViewSet(viewsets.ModelViewSet):
         if not team_id:
             return Response({'error': 'Se requiere team_id'}, status=status.HTTP_400_BAD_REQUEST)
 
-        reservas = Reserva.objects.filter(
+        reservas = self._con_incluidos(Reserva.objects.filter(
             reservacabana__cabana__team_id=team_id
-        ).distinct()
+        ).distinct().order_by('-id'))
 
-        serializer = self.get_serializer(reservas, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(reservas)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
 
@@ -142,8 +214,16 @@ def stripe_webhook(request):
         try:
             reserva = Reserva.objects.get(id=reserva_id)
             reserva.estado = 'confirmada'
-            reserva.save()
+            # La señal post_save asegura que sus noches queden registradas como ocupadas
+            with transaction.atomic():
+                reserva.save()
         except Reserva.DoesNotExist:
             pass
+        except IntegrityError as error:
+            if not OcupacionNoche.es_solapamiento(error):
+                raise
+            # Reintentar no lo arregla: queda pendiente y marcada para resolverla a mano
+            Reserva.objects.filter(pk=reserva_id).update(pago_en_conflicto=True)
+            logger.error("Reserva #%s pagada con noches ya ocupadas por otra reserva", reserva_id)
 
     return HttpResponse(status=200)
\ No newline at end of file
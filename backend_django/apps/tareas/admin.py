@@ -0,0 +1,16 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Tarea
+
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'estado', 'intentos', 'disponible_en', 'creada_en')
+    list_filter = ('estado', 'tipo')
+    readonly_fields = ('iniciada_en', 'error', 'creada_en')
+    actions = ['reintentar']
+
+    @admin.action(description="Reintentar las tareas seleccionadas")
+    def reintentar(self, request, queryset):
+        queryset.update(estado=Tarea.PENDIENTE, intentos=0, disponible_en=timezone.now())
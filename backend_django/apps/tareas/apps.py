@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class TareasConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.tareas'
+
+    def ready(self):
+        # Registra las tareas definidas en el tareas.py de cada app
+        autodiscover_modules('tareas')
@@ -0,0 +1,126 @@
+# apps/tareas/cola.py
+
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Tarea
+
+logger = logging.getLogger(__name__)
+
+# tipo -> (función, función a llamar con los datos si se agotan los intentos)
+registro = {}
+
+
+def tarea(tipo, al_fallar=None):
+    """
+    Registra una función como tarea. Las apps definen sus tareas en un módulo
+    tareas.py, que se importa al arrancar (ver TareasConfig.ready).
+    """
+    def decorador(funcion):
+        registro[tipo] = (funcion, al_fallar)
+        return funcion
+    return decorador
+
+
+def encolar(tipo, max_intentos=3, **datos):
+    """
+    Crea una tarea pendiente. Se guarda en la misma transacción que los cambios que
+    la originan, así que el worker no la ve hasta que se confirman.
+    """
+    return Tarea.objects.create(tipo=tipo, datos=datos, max_intentos=max_intentos)
+
+
+def encolar_varias(tipo, lista_datos, max_intentos=3):
+    """Como encolar(), pero crea todas las tareas con un solo INSERT"""
+    return Tarea.objects.bulk_create([
+        Tarea(tipo=tipo, datos=datos, max_intentos=max_intentos) for datos in lista_datos
+    ])
+
+
+def reclamar():
+    """
+    Toma la siguiente tarea disponible y la marca en proceso, o devuelve None. El
+    UPDATE condicional impide que dos workers se queden con la misma tarea.
+    """
+    ahora = timezone.now()
+    with transaction.atomic():
+        # skip_locked evita que los workers se esperen entre sí (SQLite lo ignora)
+        candidatas = Tarea.objects.select_for_update(skip_locked=True).filter(
+            estado=Tarea.PENDIENTE, disponible_en__lte=ahora
+        ).values_list('pk', flat=True)[:5]
+        for pk in candidatas:
+            tomada = Tarea.objects.filter(pk=pk, estado=Tarea.PENDIENTE).update(
+                estado=Tarea.EN_PROCESO, iniciada_en=ahora, intentos=F('intentos') + 1
+            )
+            if tomada:
+                return Tarea.objects.get(pk=pk)
+    return None
+
+
+def ejecutar(tarea):
+    """
+    Ejecuta una tarea reclamada. Si termina bien se borra; si falla se reintenta más
+    tarde con espera creciente y, agotados los intentos, queda como fallida.
+    """
+    funcion, al_fallar = registro.get(tarea.tipo, (None, None))
+    try:
+        if funcion is None:
+            raise LookupError(f"No hay ninguna tarea registrada como '{tarea.tipo}'")
+        funcion(**tarea.datos)
+    except Exception:
+        tarea.error = traceback.format_exc()
+        if funcion is not None and tarea.intentos < tarea.max_intentos:
+            tarea.estado = Tarea.PENDIENTE
+            tarea.disponible_en = timezone.now() + timedelta(
+                seconds=settings.TAREAS_ESPERA_REINTENTO * 2 ** (tarea.intentos - 1)
+            )
+        else:
+            tarea.estado = Tarea.FALLIDA
+            if al_fallar is not None:
+                al_fallar(**tarea.datos)
+        tarea.save(update_fields=['estado', 'disponible_en', 'error'])
+        logger.exception("Error en la tarea %s", tarea)
+        return False
+
+    tarea.delete()
+    return True
+
+
+def liberar_bloqueadas():
+    """
+    Revisa las tareas que llevan en proceso más de TAREAS_TIEMPO_MAXIMO segundos
+    (el worker que las tenía se detuvo a medias): vuelven a pendientes si les
+    quedan intentos y, si no, quedan como fallidas, como en ejecutar(). Una tarea
+    que tumba al worker (memoria, un fallo de PIL) no se reintenta para siempre.
+    Devuelve (liberadas, fallidas).
+    """
+    ahora = timezone.now()
+    bloqueadas = Tarea.objects.filter(
+        estado=Tarea.EN_PROCESO, iniciada_en__lt=ahora - timedelta(seconds=settings.TAREAS_TIEMPO_MAXIMO)
+    )
+    fallidas = 0
+    for tarea in bloqueadas.filter(intentos__gte=F('max_intentos')):
+        # El UPDATE condicional evita que dos workers la den por fallida a la vez
+        marcada = Tarea.objects.filter(pk=tarea.pk, estado=Tarea.EN_PROCESO).update(
+            estado=Tarea.FALLIDA,
+            error=f"El worker se detuvo durante el intento {tarea.intentos} de {tarea.max_intentos}.",
+        )
+        if not marcada:
+            continue
+        fallidas += 1
+        _, al_fallar = registro.get(tarea.tipo, (None, None))
+        if al_fallar is not None:
+            try:
+                al_fallar(**tarea.datos)
+            except Exception:
+                logger.exception("Error al marcar como fallida la tarea %s", tarea)
+    liberadas = bloqueadas.filter(intentos__lt=F('max_intentos')).update(
+        estado=Tarea.PENDIENTE, disponible_en=ahora
+    )
+    return liberadas, fallidas
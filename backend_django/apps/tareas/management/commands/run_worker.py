@@ -0,0 +1,93 @@
+# apps/tareas/management/commands/run_worker.py
+
+import logging
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.tareas.cola import ejecutar, liberar_bloqueadas, reclamar
+
+logger = logging.getLogger(__name__)
+
+
+def _ejecutar_en_hilo(tarea):
+    try:
+        return ejecutar(tarea)
+    except Exception:
+        # Un error al registrar el fallo no debe detener el worker
+        logger.exception("Error inesperado en la tarea %s", tarea)
+        return False
+    finally:
+        # Cada hilo abre su propia conexión; se cierra al terminar la tarea
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Procesa las tareas en segundo plano (imágenes, etc.) guardadas en la base de datos"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrencia', type=int, default=settings.TAREAS_CONCURRENCIA,
+            help="Número máximo de tareas ejecutándose a la vez."
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=2,
+            help="Segundos de espera entre consultas cuando no hay tareas."
+        )
+        parser.add_argument(
+            '--una-vez', action='store_true',
+            help="Procesa las tareas disponibles y termina (útil en cron o en pruebas)."
+        )
+
+    def handle(self, *args, **options):
+        concurrencia = max(1, options['concurrencia'])
+        intervalo = options['intervalo']
+        self.detener = False
+        if not options['una_vez']:
+            # SIGTERM (despliegues) deja terminar las tareas en curso antes de salir
+            signal.signal(signal.SIGTERM, self._detener)
+            signal.signal(signal.SIGINT, self._detener)
+
+        self.stdout.write(f"Worker iniciado con concurrencia {concurrencia}.")
+        completadas = fallidas = 0
+        ultima_revision = 0
+        en_curso = set()
+        with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+            while True:
+                if time.monotonic() - ultima_revision > settings.TAREAS_TIEMPO_MAXIMO:
+                    liberadas, agotadas = liberar_bloqueadas()
+                    if liberadas:
+                        self.stdout.write(self.style.WARNING(f"{liberadas} tareas bloqueadas vuelven a la cola."))
+                    if agotadas:
+                        self.stdout.write(self.style.WARNING(
+                            f"{agotadas} tareas bloqueadas quedan fallidas: agotaron sus intentos."
+                        ))
+                    ultima_revision = time.monotonic()
+
+                while not self.detener and len(en_curso) < concurrencia:
+                    tarea = reclamar()
+                    if tarea is None:
+                        break
+                    en_curso.add(pool.submit(_ejecutar_en_hilo, tarea))
+
+                if not en_curso:
+                    if self.detener or options['una_vez']:
+                        break
+                    time.sleep(intervalo)
+                    continue
+
+                terminadas, en_curso = wait(en_curso, timeout=intervalo, return_when=FIRST_COMPLETED)
+                for futuro in terminadas:
+                    if futuro.result():
+                        completadas += 1
+                    else:
+                        fallidas += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Worker detenido: {completadas} tareas completadas, {fallidas} con error."))
+
+    def _detener(self, *args):
+        self.detener = True
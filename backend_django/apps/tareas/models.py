@@ -0,0 +1,39 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Tarea(models.Model):
+    """
+    Trabajo pendiente para el worker (manage.py run_worker). Las tareas terminadas
+    se borran; solo quedan las pendientes, las que están en curso y las fallidas.
+    """
+    PENDIENTE = 'pendiente'
+    EN_PROCESO = 'en_proceso'
+    FALLIDA = 'fallida'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_PROCESO, 'En proceso'),
+        (FALLIDA, 'Fallida'),
+    ]
+
+    tipo = models.CharField(max_length=100)
+    datos = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    max_intentos = models.PositiveIntegerField(default=3)
+    disponible_en = models.DateTimeField(default=timezone.now)
+    iniciada_en = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    creada_en = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.estado})"
+
+    class Meta:
+        verbose_name = 'Tarea'
+        verbose_name_plural = 'Tareas'
+        ordering = ['disponible_en', 'id']
+        indexes = [
+            # El worker busca por estado y fecha de disponibilidad
+            models.Index(fields=['estado', 'disponible_en'], name='tarea_estado_disp_idx'),
+        ]
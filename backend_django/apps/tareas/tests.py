@@ -0,0 +1,63 @@
+from django.test import TestCase, override_settings
+
+from .cola import ejecutar, encolar, liberar_bloqueadas, reclamar, tarea
+from .models import Tarea
+
+llamadas = []
+
+
+@tarea('tests.anotar')
+def anotar(valor):
+    llamadas.append(valor)
+
+
+@tarea('tests.fallar', al_fallar=lambda valor: llamadas.append(f'fallida:{valor}'))
+def fallar(valor):
+    raise RuntimeError('fallo')
+
+
+class ColaTareasTest(TestCase):
+    def setUp(self):
+        llamadas.clear()
+
+    def test_ejecuta_y_borra_la_tarea(self):
+        encolar('tests.anotar', valor=1)
+        tarea = reclamar()
+        self.assertEqual(tarea.estado, Tarea.EN_PROCESO)
+        self.assertIsNone(reclamar())
+
+        self.assertTrue(ejecutar(tarea))
+        self.assertEqual(llamadas, [1])
+        self.assertFalse(Tarea.objects.exists())
+
+    @override_settings(TAREAS_ESPERA_REINTENTO=0)
+    def test_reintenta_y_marca_como_fallida(self):
+        encolar('tests.fallar', max_intentos=2, valor=1)
+
+        with self.assertLogs('apps.tareas.cola', 'ERROR') as registros:
+            self.assertFalse(ejecutar(reclamar()))
+        self.assertIn('RuntimeError: fallo', registros.output[0])
+        self.assertEqual(Tarea.objects.get().estado, Tarea.PENDIENTE)
+        self.assertEqual(llamadas, [])
+
+        with self.assertLogs('apps.tareas.cola', 'ERROR'):
+            self.assertFalse(ejecutar(reclamar()))
+        tarea = Tarea.objects.get()
+        self.assertEqual((tarea.estado, tarea.intentos), (Tarea.FALLIDA, 2))
+        self.assertIn('RuntimeError', tarea.error)
+        self.assertEqual(llamadas, ['fallida:1'])
+        self.assertIsNone(reclamar())
+
+    @override_settings(TAREAS_TIEMPO_MAXIMO=0)
+    def test_bloqueada_sin_intentos_queda_fallida(self):
+        encolar('tests.fallar', max_intentos=2, valor=1)
+        encolar('tests.fallar', max_intentos=1, valor=2)
+        # El worker las reclama y muere sin llegar a ejecutarlas
+        reclamar(), reclamar()
+
+        self.assertEqual(liberar_bloqueadas(), (1, 1))
+        self.assertEqual(
+            dict(Tarea.objects.values_list('max_intentos', 'estado')),
+            {2: Tarea.PENDIENTE, 1: Tarea.FALLIDA},
+        )
+        self.assertEqual(llamadas, ['fallida:2'])
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TeamsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.teams'
+
+    def ready(self):
+        from . import signals    # apps/teams/signals.py
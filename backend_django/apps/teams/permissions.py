@@ -0,0 +1,76 @@
+# apps/teams/permissions.py
+from django.core.cache import cache
+from rest_framework import permissions
+
+from myproject.cache import versiones
+from .models import TeamMember
+
+CACHE_TIMEOUT_MEMBRESIAS = 60 * 5
+
+
+def espacio_membresias(user_id):
+    return f"membresias:{user_id}"
+
+
+def obtener_membresias(request):
+    """
+    Devuelve {team_id: role} con los equipos del usuario de la petición. Se carga una
+    vez por petición y se guarda unos minutos en la caché compartida; las altas,
+    bajas y cambios de TeamMember invalidan la versión del usuario.
+    """
+    if not request.user.is_authenticated:
+        return {}
+    membresias = getattr(request, '_membresias', None)
+    if membresias is None:
+        user_id = request.user.pk
+        version, = versiones(espacio_membresias(user_id))
+        clave = f"{espacio_membresias(user_id)}:{version}"
+        membresias = cache.get(clave)
+        if membresias is None:
+            membresias = dict(TeamMember.objects.filter(user_id=user_id).values_list('team_id', 'role'))
+            cache.set(clave, membresias, timeout=CACHE_TIMEOUT_MEMBRESIAS)
+        request._membresias = membresias
+    return membresias
+
+
+def rol_en_equipo(request, team_id):
+    """Rol del usuario en el equipo ('ADMIN' o 'MEMBER'), o None si no es miembro"""
+    try:
+        team_id = int(team_id)
+    except (TypeError, ValueError):
+        return None
+    return obtener_membresias(request).get(team_id)
+
+
+def team_id_de(view, obj):
+    """
+    Equipo al que pertenece el objeto. Las vistas indican el atributo con team_field
+    (por defecto 'team_id'; se admiten rutas como 'cabana.team_id').
+    """
+    valor = obj
+    for atributo in getattr(view, 'team_field', 'team_id').split('.'):
+        valor = getattr(valor, atributo)
+    return valor
+
+
+class IsTeamMember(permissions.BasePermission):
+    """
+    Permite el acceso a los miembros del equipo al que pertenece el objeto.
+    """
+    message = "No tienes permisos sobre los recursos de este equipo."
+
+    def has_permission(self, request, view):
+        return request.user.is_authenticated
+
+    def has_object_permission(self, request, view, obj):
+        return rol_en_equipo(request, team_id_de(view, obj)) is not None
+
+
+class IsTeamAdmin(IsTeamMember):
+    """
+    Permite el acceso solo a los administradores del equipo al que pertenece el objeto.
+    """
+    message = "Solo los administradores del equipo pueden realizar esta acción."
+
+    def has_object_permission(self, request, view, obj):
+        return rol_en_equipo(request, team_id_de(view, obj)) == 'ADMIN'
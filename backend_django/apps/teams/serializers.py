@@ -2,10 +2,12 @@ from rest_framework import serializers
 from .models import Team, TeamMember, Invitation
 from django.contrib.auth import get_user_model
 from apps.usuarios.serializers import PersonaSerializer
+from myproject.campos import CamposElegiblesMixin
+from myproject.incluidos import IncluiblesMixin
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(CamposElegiblesMixin, serializers.ModelSerializer):
     persona = PersonaSerializer(read_only=True)
     
     class Meta:
@@ -13,21 +15,22 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ('id_usuario', 'nombre_usuario', 'email', 'phone', 'persona')
         read_only_fields = ('id_usuario',)
 
-class TeamSerializer(serializers.ModelSerializer):
+class TeamSerializer(CamposElegiblesMixin, serializers.ModelSerializer):
     class Meta:
         model = Team
         fields = ('id', 'name', 'description', 'created_at')
         read_only_fields = ('created_at',)
 
-class TeamMemberSerializer(serializers.ModelSerializer):
+class TeamMemberSerializer(CamposElegiblesMixin, IncluiblesMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     
     class Meta:
         model = TeamMember
         fields = ('id', 'team', 'user', 'role', 'joined_at')
         read_only_fields = ('id', 'joined_at')
+        incluibles = {'user': UserSerializer}
 
-class InvitationSerializer(serializers.ModelSerializer):
+class InvitationSerializer(CamposElegiblesMixin, IncluiblesMixin, serializers.ModelSerializer):
     # Utiliza TeamSerializer para obtener todos los detalles del equipo
     team = TeamSerializer(read_only=True)
     
@@ -45,6 +48,8 @@ class InvitationSerializer(serializers.ModelSerializer):
         model = Invitation
         fields = ('id', 'team', 'team_id', 'email', 'phone', 'status', 'created_at', 'created_by')
         read_only_fields = ('id', 'created_at', 'status')
+        # Con ?include=team,created_by van como ids y cada uno se envía una vez aparte
+        incluibles = {'team': TeamSerializer, 'created_by': UserSerializer}
     
     def validate(self, data):
         if not data.get('email') and not data.get('phone'):
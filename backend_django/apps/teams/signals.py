@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import TeamMember
+from .permissions import espacio_membresias
+from myproject.cache import invalidar
+
+@receiver(post_save, sender=TeamMember)
+@receiver(post_delete, sender=TeamMember)
+def invalidar_membresias(sender, instance, **kwargs):
+    """
+    Invalida el mapa de equipos del usuario cuando entra, sale o cambia de rol
+    """
+    invalidar(espacio_membresias(instance.user_id))
@@ -1,3 +1,106 @@
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from apps.usuarios.models import Usuario
+from .models import Invitation, Team, TeamMember
+
+
+class TeamGetCondicionalTest(TestCase):
+    def setUp(self):
+        usuario = Usuario.objects.create_user(email='admin@test.com', password='x', nombre_usuario='admin')
+        self.team = Team.objects.create(name='Equipo')
+        TeamMember.objects.create(team=self.team, user=usuario, role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(usuario)
+        self.url = f'/api/teams/teams/{self.team.pk}/'
+
+    def test_responde_304_si_el_equipo_no_cambio(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_cambia_el_etag_al_editar_el_equipo(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.patch(self.url, {'name': 'Otro nombre'}, format='json')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Otro nombre')
+
+
+class MembresiasTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = Usuario.objects.create_user(email='miembro@test.com', password='x', nombre_usuario='miembro')
+        self.team = Team.objects.create(name='Equipo')
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.url = f'/api/teams/teams/{self.team.pk}/invite_member/'
+
+    def test_cambio_de_rol_invalida_las_membresias(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            miembro = TeamMember.objects.create(team=self.team, user=self.usuario, role='MEMBER')
+        self.assertEqual(self.client.post(self.url, {'email': 'a@test.com'}).status_code, 403)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            miembro.role = 'ADMIN'
+            miembro.save()
+        self.assertEqual(self.client.post(self.url, {'email': 'a@test.com'}).status_code, 201)
+
+
+class IncluirRelacionesTest(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(email='admin@test.com', password='x', nombre_usuario='admin')
+        self.team = Team.objects.create(name='Equipo')
+        for i in range(3):
+            Invitation.objects.create(team=self.team, created_by=self.usuario, email=f'invitado{i}@test.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_include_envia_cada_relacion_una_vez(self):
+        response = self.client.get('/api/teams/invitations/?include=team,created_by')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({invitacion['team'] for invitacion in response.data['results']}, {self.team.pk})
+        self.assertEqual(list(response.data['included']['team']), [self.team.pk])
+        self.assertEqual(response.data['included']['team'][self.team.pk]['name'], 'Equipo')
+        self.assertEqual(list(response.data['included']['created_by']), [self.usuario.pk])
+
+    def test_sin_include_anida_las_relaciones(self):
+        response = self.client.get('/api/teams/invitations/')
+        self.assertNotIn('included', response.data)
+        self.assertEqual(response.data['results'][0]['team']['name'], 'Equipo')
+
+    def test_include_user_en_los_miembros(self):
+        TeamMember.objects.create(team=self.team, user=self.usuario, role='ADMIN')
+        response = self.client.get(f'/api/teams/teams/{self.team.pk}/members/?include=user')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['user'], self.usuario.pk)
+        self.assertEqual(response.data['included']['user'][self.usuario.pk]['email'], 'admin@test.com')
+
+    def test_include_desconocido_responde_400(self):
+        self.assertEqual(self.client.get('/api/teams/invitations/?include=otra').status_code, 400)
+
+
+class CamposElegidosTest(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(email='admin@test.com', password='x', nombre_usuario='admin')
+        self.team = Team.objects.create(name='Equipo')
+        Invitation.objects.create(team=self.team, created_by=self.usuario, email='invitado@test.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_fields_y_omit_eligen_los_campos(self):
+        response = self.client.get('/api/teams/invitations/?fields=id,email')
+        self.assertEqual(list(response.data['results'][0]), ['id', 'email'])
+        response = self.client.get('/api/teams/invitations/?omit=team,created_by')
+        self.assertNotIn('team', response.data['results'][0])
+        self.assertIn('status', response.data['results'][0])
+
+    def test_no_carga_las_relaciones_omitidas(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get('/api/teams/invitations/?fields=id,email')
+        self.assertFalse(any('JOIN' in consulta['sql'] for consulta in consultas.captured_queries))
+
+    def test_campo_desconocido_responde_400(self):
+        self.assertEqual(self.client.get('/api/teams/invitations/?fields=otro').status_code, 400)
@@ -1,5 +1,6 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 from .models import Team, TeamMember, Invitation
 from .serializers import (
@@ -9,8 +10,12 @@ from .serializers import (
     InviteMemberSerializer
 )
 from django.db.models import Q
+from myproject.cache import GetCondicionalMixin
+from myproject.campos import CamposElegidosMixin
+from myproject.incluidos import IncluidosMixin
+from .permissions import IsTeamAdmin, rol_en_equipo
 
-class IsTeamAdminOrReadOnly(permissions.BasePermission):
+class IsTeamAdminOrReadOnly(IsTeamAdmin):
     """
     Permiso personalizado para permitir solo a los administradores del equipo
     modificar o eliminar el equipo.
@@ -25,16 +30,21 @@ class IsTeamAdminOrReadOnly(permissions.BasePermission):
             return True
         
         # Verificar si el usuario es administrador del equipo
-        return TeamMember.objects.filter(
-            team=obj,
-            user=request.user,
-            role='ADMIN'
-        ).exists()
+        return super().has_object_permission(request, view, obj)
 
-class TeamViewSet(viewsets.ModelViewSet):
-    queryset = Team.objects.all()
+class TeamViewSet(GetCondicionalMixin, IncluidosMixin, CamposElegidosMixin, viewsets.ModelViewSet):
+    queryset = Team.objects.order_by('id')
+    campo_modificacion = 'updated_at'
+    team_field = 'pk'
     serializer_class = TeamSerializer
     permission_classes = [permissions.IsAuthenticated, IsTeamAdminOrReadOnly]
+    # members?include=user
+    incluibles = ('user',)
+
+    def get_serializer_class(self):
+        if self.action == 'members':
+            return TeamMemberSerializer
+        return super().get_serializer_class()
     
     def perform_create(self, serializer):
         # Crear el equipo y añadir al creador como administrador
@@ -48,30 +58,28 @@ class TeamViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def my_teams(self, request):
         """Obtener todos los equipos del usuario"""
-        teams = Team.objects.filter(members__user=request.user)
-        serializer = self.get_serializer(teams, many=True)
-        return Response(serializer.data)
+        teams = Team.objects.filter(members__user=request.user).order_by('id')
+        page = self.paginate_queryset(teams)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['get'], url_path='members')
     def members(self, request, pk=None):
         """Obtener todos los miembros de un equipo"""
         team = self.get_object()
-        team_members = TeamMember.objects.filter(team=team)
-        serializer = TeamMemberSerializer(team_members, many=True)
-        return Response(serializer.data)
+        team_members = TeamMember.objects.filter(team=team).select_related(
+            'user__persona__cliente', 'user__persona__arrendador'
+        ).order_by('joined_at', 'id')
+        page = self.paginate_queryset(team_members)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['post'], url_path='invite_member')
     def invite_member(self, request, pk=None):
         """Invitar a un nuevo miembro al equipo"""
+        # get_object() comprueba que el usuario sea administrador del equipo
         team = self.get_object()
         
-        # Verificar si el usuario es administrador del equipo
-        if not TeamMember.objects.filter(team=team, user=request.user, role='ADMIN').exists():
-            return Response(
-                {"detail": "Solo los administradores pueden invitar miembros."},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
         serializer = InviteMemberSerializer(data=request.data)
         if serializer.is_valid():
             # Crear la invitación
@@ -95,16 +103,15 @@ class TeamViewSet(viewsets.ModelViewSet):
         team = self.get_object()
         
         # Verificar si el usuario es miembro del equipo
-        try:
-            member = TeamMember.objects.get(team=team, user=request.user)
-        except TeamMember.DoesNotExist:
+        rol = rol_en_equipo(request, team.pk)
+        if rol is None:
             return Response(
                 {"detail": "No eres miembro de este equipo."},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         # Verificar si el usuario es el único administrador
-        if member.role == 'ADMIN':
+        if rol == 'ADMIN':
             admin_count = TeamMember.objects.filter(team=team, role='ADMIN').count()
             if admin_count == 1:
                 return Response(
@@ -113,7 +120,7 @@ class TeamViewSet(viewsets.ModelViewSet):
                 )
         
         # Eliminar al miembro
-        member.delete()
+        TeamMember.objects.filter(team=team, user=request.user).delete()
         
         return Response(
             {"detail": "Has abandonado el equipo correctamente."},
@@ -123,6 +130,7 @@ class TeamViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], url_path='remove_member')
     def remove_member(self, request, pk=None):
         """Eliminar a un miembro del equipo"""
+        # get_object() comprueba que el usuario sea administrador del equipo
         team = self.get_object()
         user_id = request.data.get('user_id')
         
@@ -132,13 +140,6 @@ class TeamViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Verificar si el usuario es administrador del equipo
-        if not TeamMember.objects.filter(team=team, user=request.user, role='ADMIN').exists():
-            return Response(
-                {"detail": "Solo los administradores pueden eliminar miembros."},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
         # Usar id_usuario en lugar de user_id para buscar al miembro
         try:
             member = TeamMember.objects.get(team=team, user__id_usuario=user_id)
@@ -149,7 +150,7 @@ class TeamViewSet(viewsets.ModelViewSet):
             )
         
         # No permitir eliminar a sí mismo a través de esta acción
-        if member.user.id_usuario == request.user.id_usuario:
+        if member.user_id == request.user.id_usuario:
             return Response(
                 {"detail": "No puedes eliminarte a ti mismo. Usa la acción 'leave_team'."},
                 status=status.HTTP_400_BAD_REQUEST
@@ -165,28 +166,45 @@ class TeamViewSet(viewsets.ModelViewSet):
 
 
 
-class InvitationViewSet(viewsets.ModelViewSet):
-    queryset = Invitation.objects.all()
+class InvitationViewSet(IncluidosMixin, CamposElegidosMixin, viewsets.ModelViewSet):
+    # El serializer anida el equipo y el creador con su persona
+    queryset = Invitation.objects.select_related(
+        'team', 'created_by__persona__cliente', 'created_by__persona__arrendador'
+    ).order_by('-created_at', '-id')
     serializer_class = InvitationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    incluibles = ('team', 'created_by')
     
     def get_queryset(self):
         # Por defecto, solo mostrar invitaciones creadas por el usuario actual
         if self.action == 'list':
-            return Invitation.objects.filter(created_by=self.request.user)
+            return super().get_queryset().filter(created_by=self.request.user)
         return super().get_queryset()
+
+    def get_permissions(self):
+        if self.action in ['update', 'partial_update', 'destroy']:
+            # Solo los administradores del equipo pueden modificar sus invitaciones
+            return [permissions.IsAuthenticated(), IsTeamAdmin()]
+        return super().get_permissions()
+
+    def perform_create(self, serializer):
+        team = serializer.validated_data['team']
+        if rol_en_equipo(self.request, team.pk) != 'ADMIN':
+            raise PermissionDenied("Solo los administradores pueden invitar miembros.")
+        serializer.save(created_by=self.request.user)
     
     @action(detail=False, methods=['get'], url_path='my_invitations')
     def my_invitations(self, request):
         """Obtener todas las invitaciones del usuario"""
         # Buscar invitaciones por email o teléfono
-        invitations = Invitation.objects.filter(
+        invitations = self.queryset.filter(
             Q(email=request.user.email) | Q(phone=request.user.phone),
             status='PENDING'
         )
-        
-        serializer = self.get_serializer(invitations, many=True)
-        return Response(serializer.data)
+
+        page = self.paginate_queryset(invitations)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['post'], url_path='accept')
     def accept_invitation(self, request, pk=None):
@@ -265,7 +283,7 @@ class InvitationViewSet(viewsets.ModelViewSet):
             )
         
         # Verificar si el usuario es administrador del equipo
-        if not TeamMember.objects.filter(team_id=team_id, user=request.user, role='ADMIN').exists():
+        if rol_en_equipo(request, team_id) != 'ADMIN':
             return Response(
                 {"detail": "Solo los administradores pueden invitar miembros."},
                 status=status.HTTP_403_FORBIDDEN
@@ -52,6 +52,13 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
         verbose_name = 'Usuario'
         verbose_name_plural = 'Usuarios'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Para saber al guardar si cambió el nombre que se muestra en las reseñas
+        instance._nombre_usuario_original = instance.__dict__.get('nombre_usuario')
+        return instance
+
     def __str__(self):
         return self.email
 
@@ -66,6 +73,13 @@ class Persona(models.Model):
         verbose_name = 'Persona'
         verbose_name_plural = 'Personas'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Para saber al guardar si cambió el nombre que se muestra en las reseñas
+        instance._nombre_original = (instance.__dict__.get('nombre'), instance.__dict__.get('apellido'))
+        return instance
+
     def __str__(self):
         return f"{self.nombre} {self.apellido}"
     
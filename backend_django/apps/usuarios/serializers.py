@@ -1,6 +1,7 @@
 # backend/apps/usuarios/serializers.py
 
 from rest_framework import serializers
+from myproject.campos import CamposElegiblesMixin
 from .models import Usuario, Persona, Cliente, Arrendador
 
 
@@ -14,28 +15,28 @@ class ArrendadorSerializer(serializers.ModelSerializer):
         model = Arrendador
         fields = ['id_arrendador']
 
-class PersonaSerializer(serializers.ModelSerializer):
+class PersonaSerializer(CamposElegiblesMixin, serializers.ModelSerializer):
     cliente = serializers.SerializerMethodField()
     arrendador = serializers.SerializerMethodField()
 
     class Meta:
         model = Persona
         fields = ['id_persona', 'nombre', 'apellido', 'cliente', 'arrendador']
+        relaciones_de_campos = {'cliente': ('cliente',), 'arrendador': ('arrendador',)}
+
+    # Con select_related('cliente', 'arrendador') en la consulta no se hace ninguna
+    # consulta extra: Django guarda también la ausencia de la relación inversa
 
     def get_cliente(self, obj):
-        try:
-            return ClienteSerializer(obj.cliente).data
-        except Cliente.DoesNotExist:
-            return None
+        cliente = getattr(obj, 'cliente', None)
+        return ClienteSerializer(cliente).data if cliente else None
 
     def get_arrendador(self, obj):
-        try:
-            return ArrendadorSerializer(obj.arrendador).data
-        except Arrendador.DoesNotExist:
-            return None
+        arrendador = getattr(obj, 'arrendador', None)
+        return ArrendadorSerializer(arrendador).data if arrendador else None
 
 
-class UsuarioSerializer(serializers.ModelSerializer):
+class UsuarioSerializer(CamposElegiblesMixin, serializers.ModelSerializer):
     persona = PersonaSerializer(required=False, allow_null=True)
     password = serializers.CharField(write_only=True)
 
@@ -21,16 +21,18 @@ from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 from .models import Usuario, Persona
 from .serializers import UsuarioSerializer, PersonaSerializer
+from myproject.campos import CamposElegidosMixin
+from myproject.slugs import crear_con_valor_unico
 
 class IsOwnerOrAdmin(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Si el objeto tiene 'usuario' (Persona), comparar con el request.user
-        if hasattr(obj, 'usuario'):
-            return obj.usuario == request.user or request.user.is_staff
+        if hasattr(obj, 'usuario_id'):
+            return obj.usuario_id == request.user.pk or request.user.is_staff
         # Si el objeto es un usuario directamente
         return obj == request.user or request.user.is_staff
 
-class UsuarioViewSet(viewsets.ModelViewSet):
+class UsuarioViewSet(CamposElegidosMixin, viewsets.ModelViewSet):
     queryset = Usuario.objects.all()
     serializer_class = UsuarioSerializer
 
@@ -40,9 +42,10 @@ class UsuarioViewSet(viewsets.ModelViewSet):
         return [permissions.IsAuthenticated(), IsOwnerOrAdmin()]
 
     def get_queryset(self):
+        usuarios = Usuario.objects.select_related('persona__cliente', 'persona__arrendador')
         if self.request.user.is_staff:
-            return Usuario.objects.all()
-        return Usuario.objects.filter(id_usuario=self.request.user.id_usuario)
+            return usuarios.order_by('id_usuario')
+        return usuarios.filter(id_usuario=self.request.user.id_usuario).order_by('id_usuario')
 
     @action(detail=False, methods=['get', 'put', 'patch'], url_path='me')
     def me(self, request):
@@ -56,15 +59,16 @@ class UsuarioViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
 
 
-class PersonaViewSet(viewsets.ModelViewSet):
+class PersonaViewSet(CamposElegidosMixin, viewsets.ModelViewSet):
     queryset = Persona.objects.all()
     serializer_class = PersonaSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrAdmin]
 
     def get_queryset(self):
+        personas = Persona.objects.select_related('cliente', 'arrendador')
         if self.request.user.is_staff:
-            return Persona.objects.all()
-        return Persona.objects.filter(usuario=self.request.user)
+            return personas.order_by('id_persona')
+        return personas.filter(usuario=self.request.user).order_by('id_persona')
 
 
 
@@ -260,20 +264,15 @@ class GoogleAuthCallbackView(View):
             # Crear nuevo usuario - solo con campos que existen en tu modelo
             print(f"Creando nuevo usuario para: {email}")
             
-            # Crear nombre_usuario a partir del email
-            nombre_usuario = email.split('@')[0]
-            
-            # Asegurar que el nombre_usuario sea único
-            counter = 1
-            original_nombre = nombre_usuario
-            while User.objects.filter(nombre_usuario=nombre_usuario).exists():
-                nombre_usuario = f"{original_nombre}_{counter}"
-                counter += 1
-            
-            user = User.objects.create_user(
-                email=email,
-                nombre_usuario=nombre_usuario,
-                tipo_usuario='usuario'  # Valor por defecto
+            # Crear nombre_usuario único a partir del email (nombre, nombre_1, nombre_2...)
+            user = crear_con_valor_unico(
+                User, 'nombre_usuario', email.split('@')[0],
+                lambda nombre_usuario: User.objects.create_user(
+                    email=email,
+                    nombre_usuario=nombre_usuario,
+                    tipo_usuario='usuario'  # Valor por defecto
+                ),
+                separador='_',
             )
             
             # Crear el registro en Persona si es necesario
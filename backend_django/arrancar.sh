@@ -0,0 +1,30 @@
+#!/bin/sh
+# Proceso de las máquinas de la app: gunicorn y el worker de tareas (apps/tareas) juntos.
+# El worker lee y escribe los archivos de MEDIA_ROOT e invalida la caché en archivos,
+# que solo existen en el disco de esta máquina: en otra máquina sus cambios no
+# llegarían a la app.
+
+detener() {
+    kill -TERM "$GUNICORN" "$WORKER" 2>/dev/null
+}
+
+# Si el worker muere (sin memoria, un fallo de PIL) vuelve a arrancar; con SIGTERM
+# termina las tareas en curso y sale
+(
+    trap 'kill -TERM "$HIJO" 2>/dev/null; wait "$HIJO"; exit 0' TERM
+    while true; do
+        python manage.py run_worker &
+        HIJO=$!
+        wait "$HIJO"
+        sleep 5
+    done
+) &
+WORKER=$!
+
+gunicorn --bind :8000 --workers 1 myproject.wsgi:application &
+GUNICORN=$!
+
+trap detener TERM INT
+wait "$GUNICORN"
+detener
+wait
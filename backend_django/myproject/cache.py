@@ -0,0 +1,193 @@
+# myproject/cache.py
+
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+PREFIJO_VERSION = 'version'
+PREFIJO_RESPUESTA = 'respuesta'
+
+
+def _clave_version(espacio):
+    return f"{PREFIJO_VERSION}:{espacio}"
+
+
+def versiones(*espacios):
+    """
+    Devuelve la versión actual de cada espacio de claves. Un espacio sin versión
+    (nuevo, invalidado o expulsado de la caché) recibe una nueva al azar, de modo
+    que nunca se reutiliza una versión anterior.
+    """
+    claves = [_clave_version(espacio) for espacio in espacios]
+    actuales = cache.get_many(claves)
+    for clave in claves:
+        if clave not in actuales:
+            # add() no pisa la versión que otro proceso haya creado a la vez
+            cache.add(clave, uuid.uuid4().hex, timeout=None)
+            actuales[clave] = cache.get(clave)
+    return [actuales[clave] for clave in claves]
+
+
+def invalidar(*espacios):
+    """
+    Invalida todas las respuestas guardadas bajo estos espacios. Se aplica al
+    confirmar la transacción para que nadie guarde datos viejos con la versión nueva.
+    """
+    claves = [_clave_version(espacio) for espacio in espacios]
+    transaction.on_commit(lambda: cache.delete_many(claves))
+
+
+def _clave_valor(prefijo, firma, versiones_espacios):
+    firma = '|'.join([firma, *versiones_espacios])
+    return f"{prefijo}:{hashlib.md5(firma.encode()).hexdigest()}"
+
+
+def valor_cacheado(firma, espacios, calcular, prefijo='valor'):
+    """
+    Devuelve calcular() guardado bajo la firma dada y la versión de cada espacio,
+    para cachear datos que no son una respuesta completa.
+    """
+    clave = _clave_valor(prefijo, firma, versiones(*espacios))
+    valor = cache.get(clave)
+    if valor is None:
+        valor = calcular()
+        cache.set(clave, valor, timeout=settings.CACHE_RESPUESTAS_TIMEOUT)
+    return valor
+
+
+def valores_cacheados(firmas, espacios, calcular, prefijo='valor'):
+    """
+    Como valor_cacheado() para varias firmas: las lee con un solo get_many y calcula
+    las que faltan de una vez con calcular(faltantes), que devuelve {firma: valor}.
+    """
+    version = versiones(*espacios)
+    claves = {firma: _clave_valor(prefijo, firma, version) for firma in firmas}
+    guardados = cache.get_many(claves.values())
+    valores = {firma: guardados[clave] for firma, clave in claves.items() if clave in guardados}
+    faltantes = [firma for firma in firmas if firma not in valores]
+    if faltantes:
+        calculados = calcular(faltantes)
+        cache.set_many(
+            {claves[firma]: calculados[firma] for firma in faltantes},
+            timeout=settings.CACHE_RESPUESTAS_TIMEOUT,
+        )
+        valores.update(calculados)
+    return valores
+
+
+def respuesta_cacheada(request, espacios, generar):
+    """
+    Devuelve la respuesta de generar() guardada por URL completa (host, ruta y
+    query string) y por la versión de cada espacio. Solo se guardan respuestas 200.
+    """
+    firma = '|'.join([request.build_absolute_uri(), *versiones(*espacios)])
+    clave = f"{PREFIJO_RESPUESTA}:{hashlib.md5(firma.encode()).hexdigest()}"
+
+    datos = cache.get(clave)
+    if datos is not None:
+        return Response(datos)
+
+    response = generar()
+    if response.status_code == 200:
+        cache.set(clave, response.data, timeout=settings.CACHE_RESPUESTAS_TIMEOUT)
+    return response
+
+
+def respuesta_condicional(request, ultima_modificacion, generar, *partes, total=None):
+    """
+    GET condicional a partir de la fecha de última modificación del recurso, sin
+    serializarlo: responde 304 si el cliente ya tiene esta versión y, si no, añade
+    ETag y Last-Modified a la respuesta de generar(). Las partes extra entran en el ETag.
+
+    Los listados pasan su número de elementos en total y no llevan Last-Modified,
+    porque una baja no cambia la fecha máxima del conjunto.
+    """
+    if ultima_modificacion is None:
+        return generar()
+
+    firma = '|'.join([
+        request.get_full_path(), request.META.get('HTTP_ACCEPT', ''),
+        str(ultima_modificacion.timestamp()), str(total), *map(str, partes),
+    ])
+    etag = quote_etag(hashlib.md5(firma.encode()).hexdigest())
+    last_modified = None if total is not None else int(ultima_modificacion.timestamp())
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    response = generar()
+    if response.status_code == 200:
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class RespuestaCacheadaMixin:
+    """
+    Cachea las respuestas de list y retrieve con respuesta_cacheada(). Las vistas
+    indican de qué espacios de versión dependen su listado y cada detalle.
+    """
+
+    def get_espacios_listado(self):
+        raise NotImplementedError
+
+    def get_espacios_detalle(self, lookup):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        return respuesta_cacheada(
+            request, self.get_espacios_listado(),
+            lambda: super(RespuestaCacheadaMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        return respuesta_cacheada(
+            request, self.get_espacios_detalle(lookup),
+            lambda: super(RespuestaCacheadaMixin, self).retrieve(request, *args, **kwargs)
+        )
+
+
+class GetCondicionalMixin:
+    """
+    ETag y Last-Modified para list y retrieve a partir de campo_modificacion, con
+    una sola consulta de agregación antes de cargar o serializar nada.
+    """
+    campo_modificacion = None
+
+    def get_agregados_modificacion(self):
+        """Agregados que identifican la versión de un listado, además del total"""
+        return {'ultima': Max(self.campo_modificacion)}
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        resumen = queryset.aggregate(total=Count('pk'), **self.get_agregados_modificacion())
+        total, ultima = resumen.pop('total'), resumen.pop('ultima')
+        return respuesta_condicional(
+            request, ultima,
+            lambda: super(GetCondicionalMixin, self).list(request, *args, **kwargs),
+            *resumen.values(), total=total
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        try:
+            ultima = self.get_queryset().prefetch_related(None).filter(
+                **{self.lookup_field: lookup}
+            ).values_list(self.campo_modificacion, flat=True).first()
+        except (TypeError, ValueError, ValidationError):
+            # Identificador inválido: retrieve responderá 404
+            ultima = None
+        return respuesta_condicional(
+            request, ultima,
+            lambda: super(GetCondicionalMixin, self).retrieve(request, *args, **kwargs)
+        )
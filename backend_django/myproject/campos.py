@@ -0,0 +1,159 @@
+# myproject/campos.py
+
+from django.db.models import Prefetch
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework import permissions, serializers
+from rest_framework.exceptions import ValidationError
+
+PARAMETRO_FIELDS = 'fields'
+PARAMETRO_OMIT = 'omit'
+
+
+def _nombres(texto):
+    return {nombre.strip() for nombre in texto.split(',') if nombre.strip()}
+
+
+def campos_del_serializer(serializer_class):
+    """
+    Campos que se pueden elegir de un serializer: sus fields si usa
+    CamposElegiblesMixin, los de su atributo `campos` si está hecho a mano, o
+    None si no admite elegirlos.
+    """
+    if issubclass(serializer_class, CamposElegiblesMixin):
+        return serializer_class().fields
+    return getattr(serializer_class, 'campos', None)
+
+
+class Campos:
+    """
+    Campos de la respuesta elegidos con ?fields= (solo esos) y ?omit= (todos
+    menos esos) para el serializer principal de la vista.
+    """
+
+    def __init__(self, serializer_class, todos, pedidos, omitidos):
+        self.serializer_class = serializer_class
+        # Todos los campos del serializer (sus fields, o sus nombres si está hecho a mano)
+        self.todos = todos
+        self.pedidos = pedidos
+        self.omitidos = omitidos
+        errores = {}
+        for parametro, nombres in ((PARAMETRO_FIELDS, pedidos or set()), (PARAMETRO_OMIT, omitidos)):
+            desconocidos = nombres - set(todos)
+            if desconocidos:
+                errores[parametro] = (
+                    f"Campos desconocidos: {', '.join(sorted(desconocidos))}. "
+                    f"Opciones: {', '.join(todos)}."
+                )
+        if errores:
+            raise ValidationError(errores)
+
+    def incluye(self, nombre):
+        return (self.pedidos is None or nombre in self.pedidos) and nombre not in self.omitidos
+
+    def filtrar(self, nombres):
+        return [nombre for nombre in nombres if self.incluye(nombre)]
+
+
+def podar_relaciones(queryset, raices):
+    """Quita del queryset los select_related y prefetch_related que parten de alguna de las raíces"""
+    def sobra(ruta):
+        return ruta.split(LOOKUP_SEP)[0] in raices
+
+    # prefetch_related y select_related no tienen API para quitar un solo lookup:
+    # se vacían y se vuelven a poner los que quedan
+    prefetch = [
+        lookup for lookup in queryset._prefetch_related_lookups
+        if not sobra(lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup)
+    ]
+    queryset = queryset.prefetch_related(None).prefetch_related(*prefetch)
+    if isinstance(queryset.query.select_related, dict):
+        rutas = [ruta for ruta in _rutas(queryset.query.select_related) if not sobra(ruta)]
+        queryset = queryset.select_related(None)
+        if rutas:
+            queryset = queryset.select_related(*rutas)
+    return queryset
+
+
+def _rutas(arbol, prefijo=''):
+    """Rutas completas (a__b__c) de las hojas del árbol de select_related"""
+    for nombre, hijos in arbol.items():
+        if hijos:
+            yield from _rutas(hijos, prefijo + nombre + LOOKUP_SEP)
+        else:
+            yield prefijo + nombre
+
+
+class CamposElegiblesMixin:
+    """
+    Para ModelSerializer: con ?fields= / ?omit= (ver CamposElegidosMixin) el
+    serializer principal de la respuesta solo construye los campos elegidos, así
+    que los demás ni se calculan. Meta.relaciones_de_campos ({campo: relaciones})
+    indica de qué relaciones dependen los campos calculados con métodos.
+    """
+
+    def get_fields(self):
+        campos = super().get_fields()
+        elegidos = self.context.get('campos')
+        if elegidos is None or type(self) is not elegidos.serializer_class:
+            return campos
+        return {nombre: campo for nombre, campo in campos.items() if elegidos.incluye(nombre)}
+
+
+class CamposElegidosMixin:
+    """
+    ?fields=a,b / ?omit=c en las lecturas de la vista: la respuesta solo lleva
+    esos campos de su serializer, y el queryset deja de cargar las relaciones
+    (select_related / prefetch_related) que solo servían a los campos quitados.
+    """
+
+    def get_campos(self):
+        """Campos elegidos en esta petición, o None si no eligió (o el serializer no lo admite)"""
+        if not hasattr(self, '_campos'):
+            self._campos = None
+            if self.request.method in permissions.SAFE_METHODS:
+                pedidos = _nombres(self.request.query_params.get(PARAMETRO_FIELDS, ''))
+                omitidos = _nombres(self.request.query_params.get(PARAMETRO_OMIT, ''))
+                serializer_class = self.get_serializer_class()
+                todos = campos_del_serializer(serializer_class)
+                if (pedidos or omitidos) and todos is not None:
+                    self._campos = Campos(serializer_class, todos, pedidos or None, omitidos)
+        return self._campos
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        campos = self.get_campos()
+        if campos is not None:
+            context['campos'] = campos
+        return context
+
+    def podar_queryset(self, queryset):
+        """
+        Quita del queryset las relaciones de los campos no elegidos que no usa
+        ningún campo elegido. La relación de un campo es el principio de su source
+        (o la de Meta.relaciones_de_campos); un id (PrimaryKeyRelatedField) no la usa.
+        """
+        campos = self.get_campos()
+        if campos is None or not issubclass(campos.serializer_class, CamposElegiblesMixin):
+            return queryset
+        relaciones = getattr(campos.serializer_class.Meta, 'relaciones_de_campos', {})
+
+        def raices(nombre):
+            if nombre in relaciones:
+                return set(relaciones[nombre])
+            campo = campos.todos[nombre]
+            if campo.source == '*' or isinstance(campo, serializers.PrimaryKeyRelatedField):
+                return set()
+            return {campo.source.split('.')[0]}
+
+        usadas, sobrantes = set(), set()
+        for nombre in campos.todos:
+            (usadas if campos.incluye(nombre) else sobrantes).update(raices(nombre))
+        sobrantes -= usadas
+        return podar_relaciones(queryset, sobrantes) if sobrantes else queryset
+
+    def filter_queryset(self, queryset):
+        return self.podar_queryset(super().filter_queryset(queryset))
+
+    def paginate_queryset(self, queryset):
+        # Las acciones de listado que arman su propio queryset pasan por aquí
+        return super().paginate_queryset(self.podar_queryset(queryset))
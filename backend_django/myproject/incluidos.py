@@ -0,0 +1,120 @@
+# myproject/incluidos.py
+
+from rest_framework import permissions, serializers
+from rest_framework.exceptions import ValidationError
+
+PARAMETRO_INCLUDE = 'include'
+
+
+class Incluidos:
+    """
+    Objetos relacionados pedidos con ?include=, reunidos mientras se serializa la
+    respuesta para enviar cada uno una sola vez en 'included', por relación e id.
+    """
+
+    def __init__(self, nombres):
+        self.nombres = set(nombres)
+        # nombre -> (serializer, {pk: objeto})
+        self.objetos = {}
+
+    def agregar(self, nombre, serializer_class, objeto):
+        _, objetos = self.objetos.setdefault(nombre, (serializer_class, {}))
+        objetos.setdefault(objeto.pk, objeto)
+
+    def serializar(self, context):
+        # Sin 'incluidos' en el contexto, los objetos incluidos se serializan completos
+        context = {clave: valor for clave, valor in context.items() if clave != 'incluidos'}
+        incluidos = {nombre: {} for nombre in self.nombres}
+        for nombre, (serializer_class, objetos) in self.objetos.items():
+            datos = serializer_class(list(objetos.values()), many=True, context=context).data
+            incluidos[nombre] = dict(zip(objetos, datos))
+        return incluidos
+
+
+class RelacionIncluida(serializers.RelatedField):
+    """Ocupa el lugar de una relación incluida: envía su id y apunta el objeto"""
+
+    def __init__(self, nombre=None, serializer_class=None, **kwargs):
+        self.nombre = nombre
+        self.serializer_class = serializer_class
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        self.context['incluidos'].agregar(self.nombre, self.serializer_class, value)
+        return value.pk
+
+
+class IncluiblesMixin:
+    """
+    Para ModelSerializer: los campos de Meta.incluibles ({campo: serializer}) se
+    envían como ids cuando la petición los pide con ?include= (ver IncluidosMixin).
+    """
+
+    def get_fields(self):
+        campos = super().get_fields()
+        incluidos = self.context.get('incluidos')
+        if incluidos is None:
+            return campos
+        for nombre, serializer_class in getattr(self.Meta, 'incluibles', {}).items():
+            if nombre in incluidos.nombres and nombre in campos:
+                actual = campos[nombre]
+                campos[nombre] = RelacionIncluida(
+                    nombre, serializer_class, source=actual.source, read_only=True,
+                    many=isinstance(actual, (serializers.ListSerializer, serializers.ManyRelatedField)),
+                )
+        return campos
+
+
+class IncluidosMixin:
+    """
+    ?include=a,b en las lecturas de la vista: las relaciones pedidas (de entre
+    `incluibles`) llegan como ids y cada objeto relacionado una sola vez en
+    'included'. Los listados lo llevan junto a results y el detalle, como un campo más.
+    """
+    incluibles = ()
+
+    def get_incluidos(self):
+        """Incluidos de esta petición, o None si no pidió ninguno"""
+        if not hasattr(self, '_incluidos'):
+            self._incluidos = None
+            texto = ''
+            if self.request.method in permissions.SAFE_METHODS:
+                texto = self.request.query_params.get(PARAMETRO_INCLUDE, '')
+            nombres = {nombre.strip() for nombre in texto.split(',') if nombre.strip()}
+            desconocidos = nombres - set(self.incluibles)
+            if desconocidos:
+                raise ValidationError({PARAMETRO_INCLUDE: (
+                    f"No se puede incluir {', '.join(sorted(desconocidos))}. "
+                    f"Opciones: {', '.join(self.incluibles)}."
+                )})
+            if nombres:
+                self._incluidos = Incluidos(nombres)
+        return self._incluidos
+
+    def incluye(self, nombre):
+        incluidos = self.get_incluidos()
+        return incluidos is not None and nombre in incluidos.nombres
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        incluidos = self.get_incluidos()
+        if incluidos is not None:
+            context['incluidos'] = incluidos
+        return context
+
+    def agregar_incluidos(self, datos):
+        incluidos = self.get_incluidos()
+        if incluidos is not None:
+            datos['included'] = incluidos.serializar(self.get_serializer_context())
+        return datos
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        self.agregar_incluidos(response.data)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if response.status_code == 200:
+            self.agregar_incluidos(response.data)
+        return response
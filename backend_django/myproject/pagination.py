@@ -0,0 +1,28 @@
+# myproject/pagination.py
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class PaginacionEstandar(PageNumberPagination):
+    """Paginación por número de página para todos los listados"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class PaginacionCursor(CursorPagination):
+    """
+    Paginación por cursor (keyset) sobre un orden estable: cada página filtra
+    a partir del último elemento visto, así que las páginas profundas cuestan
+    lo mismo que la primera. Las subclases definen `ordering`.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class PaginacionCursorCabanas(PaginacionCursor):
+    ordering = ('-creada_en', '-id')
+
+
+class PaginacionCursorResenas(PaginacionCursor):
+    ordering = ('-fecha_creacion', '-id')
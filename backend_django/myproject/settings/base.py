@@ -1,5 +1,6 @@
 # backend/myproject/settings/base.py
 import os
+import tempfile
 from pathlib import Path
 from decouple import config  
 
@@ -19,6 +20,8 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites',
+    # Búsqueda de texto completo y trigramas en PostgreSQL
+    'django.contrib.postgres',
     'corsheaders',
     'rest_framework',
     'rest_framework.authtoken',
@@ -34,6 +37,7 @@ INSTALLED_APPS = [
     #'apps.productos.apps.ProductosConfig',
     'apps.cabanas.apps.CabanasConfig',
     'apps.reservas.apps.ReservasConfig',
+    'apps.tareas.apps.TareasConfig',
     'allauth',
     'allauth.account',
     'allauth.socialaccount',
@@ -203,6 +207,43 @@ ALLOWED_HOSTS = [
 # También agrega esto para Fly.dev específicamente
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
+# Caché compartida entre procesos y máquinas. Con REDIS_URL se usa Redis; sin él,
+# una caché en archivos del disco local, que solo sirve con una sola máquina
+# (desarrollo). Producción exige REDIS_URL (ver production.py) y los tests usan
+# su propia caché en memoria (ver test.py).
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'cabanas',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_DIR', default=os.path.join(tempfile.gettempdir(), 'cabanas-cache')),
+            'KEY_PREFIX': 'cabanas',
+        }
+    }
+
+# Las respuestas cacheadas se invalidan por versión; el tiempo solo limita lo que ocupan
+CACHE_RESPUESTAS_TIMEOUT = config('CACHE_RESPUESTAS_TIMEOUT', default=60 * 60, cast=int)
+
+# Cola de tareas en segundo plano (apps/tareas, manage.py run_worker)
+TAREAS_CONCURRENCIA = config('TAREAS_CONCURRENCIA', default=2, cast=int)
+# Segundos antes del primer reintento; se duplica en cada intento
+TAREAS_ESPERA_REINTENTO = config('TAREAS_ESPERA_REINTENTO', default=30, cast=int)
+# Una tarea en proceso durante más tiempo se considera abandonada y vuelve a la cola
+TAREAS_TIEMPO_MAXIMO = config('TAREAS_TIEMPO_MAXIMO', default=10 * 60, cast=int)
+
+# Límites de la subida de imágenes por lotes (POST /api/cabanas/cabanas/{id}/agregar_imagenes/)
+SUBIDA_IMAGEN_MAX_BYTES = config('SUBIDA_IMAGEN_MAX_BYTES', default=10 * 1024 * 1024, cast=int)
+SUBIDA_LOTE_MAX_BYTES = config('SUBIDA_LOTE_MAX_BYTES', default=100 * 1024 * 1024, cast=int)
+SUBIDA_LOTE_MAX_ARCHIVOS = config('SUBIDA_LOTE_MAX_ARCHIVOS', default=30, cast=int)
+
 # DRF settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -212,6 +253,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'myproject.pagination.PaginacionEstandar',
     'DEFAULT_THROTTLE_CLASSES': [
         'rest_framework.throttling.AnonRateThrottle',
         'rest_framework.throttling.UserRateThrottle'
@@ -277,6 +319,10 @@ LOGGING = {
             'handlers': ['console'],
             'level': 'DEBUG' if DEBUG else 'INFO',
         },
+        'apps': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
     },
 }
 
@@ -1,6 +1,7 @@
 from .base import *
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -25,3 +26,9 @@ DATABASES = {
     }
 }
 
+# Las versiones de la caché (myproject/cache.py) invalidan las respuestas de todas
+# las máquinas a la vez: una caché en archivos local dejaría a cada una con las suyas
+if not REDIS_URL:
+    raise ImproperlyConfigured(
+        "REDIS_URL es obligatorio en producción (fly secrets set REDIS_URL=...)."
+    )
@@ -0,0 +1,13 @@
+# settings/test.py
+"""
+Configuración de los tests: python manage.py test --settings=myproject.settings.test,
+o DJANGO_SETTINGS_MODULE=myproject.settings.test con cualquier otro runner.
+"""
+from .development import *
+
+# Caché en memoria, aislada de la compartida
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
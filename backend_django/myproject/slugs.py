@@ -0,0 +1,45 @@
+# myproject/slugs.py
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, IntegerField, Max, Value, When
+from django.db.models.functions import Cast, Substr
+
+MAX_CIFRAS_SUFIJO = 9
+
+
+def siguiente_valor_libre(model, campo, base, separador='-'):
+    """
+    Primer valor libre para un campo único a partir de base: base, base-1, base-2...
+    Una sola consulta agrega el mayor sufijo numérico en uso, sin recorrer los
+    valores ocupados uno a uno. Los sufijos de más de 9 cifras (p. ej. el de un
+    correo como maria-5512345678) no cuentan: no caben en un entero de 32 bits.
+    """
+    patron = rf"^{re.escape(base)}({re.escape(separador)}[0-9]{{1,{MAX_CIFRAS_SUFIJO}}})?$"
+    mayor = model._default_manager.filter(**{f'{campo}__regex': patron}).aggregate(
+        sufijo=Max(Case(
+            When(**{campo: base}, then=Value(0)),
+            default=Cast(Substr(campo, len(base) + len(separador) + 1), IntegerField()),
+            output_field=IntegerField(),
+        ))
+    )['sufijo']
+    if mayor is None:
+        return base
+    return f"{base}{separador}{mayor + 1}"
+
+
+def crear_con_valor_unico(model, campo, base, crear, separador='-', intentos=3):
+    """
+    Llama a crear(valor) con el primer valor libre del campo, dentro de un savepoint.
+    Si otra petición ocupa el mismo valor a la vez, el índice único lo rechaza y se
+    calcula de nuevo.
+    """
+    for intento in range(intentos):
+        valor = siguiente_valor_libre(model, campo, base, separador)
+        try:
+            with transaction.atomic():
+                return crear(valor)
+        except IntegrityError:
+            # Solo se reintenta si el conflicto es del propio campo
+            if intento == intentos - 1 or not model._default_manager.filter(**{campo: valor}).exists():
+                raise
@@ -47,4 +47,15 @@ api.interceptors.response.use(
   }
 );
 
+// Los listados de la API vienen paginados: { next, previous, results } (y count si no es por cursor)
+export interface Paginated<T> {
+  count?: number;
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
+export const resultados = <T>(data: T[] | Paginated<T>): T[] =>
+  Array.isArray(data) ? data : data.results;
+
 export default api;
\ No newline at end of file
@@ -1,5 +1,5 @@
 // src/services/cabanas.service.ts
-import api from '@/lib/api';
+import api, { resultados } from '@/lib/api';
 import { 
   CabanaList, 
   CabanaDetail, 
@@ -10,14 +10,23 @@ import {
   Resena, 
   ResenaCreate, 
   DisponibilidadResponse,
-  CabanaFilters 
+  CabanaFilters,
+  ListadoCabanas,
+  MapaCabanas
 } from '@/types/cabanasTypes';
 
+// Los listados envían los servicios de cada cabaña como ids y los describen una vez aparte
+const conServicios = (data: ListadoCabanas): CabanaList[] =>
+  data.results.map((cabana) => ({
+    ...cabana,
+    servicios: cabana.servicios.map((id) => data.servicios[id]).filter(Boolean),
+  }));
+
 export const cabanasService = {
   // Servicios
   async getServicios() {
     const response = await api.get('/cabanas/servicios/');
-    return response.data as Servicio[];
+    return resultados<Servicio>(response.data);
   },
 
   // Cabañas - CRUD
@@ -33,11 +42,35 @@ export const cabanasService = {
     if (filters?.capacidad) params.append('capacidad', filters.capacidad.toString());
     if (filters?.permite_mascotas !== undefined) params.append('permite_mascotas', filters.permite_mascotas.toString());
     if (filters?.team) params.append('team', filters.team.toString());
-    if (filters?.search) params.append('search', filters.search);
+    if (filters?.search) params.append('q', filters.search);
+    if (filters?.precio_min !== undefined) params.append('precio_min', filters.precio_min.toString());
+    if (filters?.precio_max !== undefined) params.append('precio_max', filters.precio_max.toString());
+    filters?.servicios?.forEach((servicio) => params.append('servicios', servicio.toString()));
+    if (filters?.lat !== undefined && filters?.lng !== undefined) {
+      params.append('lat', filters.lat.toString());
+      params.append('lng', filters.lng.toString());
+      if (filters.radio_km !== undefined) params.append('radio_km', filters.radio_km.toString());
+    }
+    if (filters?.bbox) params.append('bbox', filters.bbox.join(','));
     if (filters?.ordering) params.append('ordering', filters.ordering);
 
     const response = await api.get(`/cabanas/cabanas/?${params.toString()}`);
-    return response.data as CabanaList[];
+    return conServicios(response.data as ListadoCabanas);
+  },
+
+  // Mapa: grupos o puntos de la vista [oeste, sur, este, norte] en este zoom
+  async getMapa(zoom: number, bbox: [number, number, number, number], filters?: CabanaFilters) {
+    const params = new URLSearchParams({ zoom: zoom.toString(), bbox: bbox.join(',') });
+
+    if (filters?.capacidad) params.append('capacidad', filters.capacidad.toString());
+    if (filters?.permite_mascotas !== undefined) params.append('permite_mascotas', filters.permite_mascotas.toString());
+    if (filters?.search) params.append('q', filters.search);
+    if (filters?.precio_min !== undefined) params.append('precio_min', filters.precio_min.toString());
+    if (filters?.precio_max !== undefined) params.append('precio_max', filters.precio_max.toString());
+    filters?.servicios?.forEach((servicio) => params.append('servicios', servicio.toString()));
+
+    const response = await api.get(`/cabanas/cabanas/mapa/?${params.toString()}`);
+    return response.data as MapaCabanas;
   },
 
   async getCabanaDetail(id: number) {
@@ -57,13 +90,13 @@ export const cabanasService = {
   // Cabañas del usuario
   async getMyCabanas() {
     const response = await api.get('/cabanas/cabanas/mis_cabanas/');
-    return response.data as CabanaList[];
+    return conServicios(response.data as ListadoCabanas);
   },
 
   // Cabañas por ID de equipo
   async getCabanasByTeam(teamId: number) {
     const response = await api.get(`/cabanas/cabanas/team/${teamId}/`);
-    return response.data as CabanaList[];
+    return conServicios(response.data as ListadoCabanas);
   },
 
   // Disponibilidad
@@ -75,7 +108,7 @@ export const cabanasService = {
   // Imágenes
   async getImagenesCabana(cabanaId: number) {
     const response = await api.get(`/cabanas/imagenes/?cabana_id=${cabanaId}`);
-    return response.data as ImagenCabana[];
+    return resultados<ImagenCabana>(response.data);
   },
 
   async agregarImagen(cabanaId: number, data: ImagenCabanaCreate) {
@@ -93,6 +126,18 @@ export const cabanasService = {
     return response.data as ImagenCabana;
   },
 
+  async agregarImagenes(cabanaId: number, imagenes: File[]) {
+    const formData = new FormData();
+    imagenes.forEach((imagen) => formData.append('imagenes', imagen));
+
+    const response = await api.post(`/cabanas/cabanas/${cabanaId}/agregar_imagenes/`, formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+    return response.data as ImagenCabana[];
+  },
+
   async updateImagen(imagenId: number, data: Partial<ImagenCabanaCreate>) {
     const formData = new FormData();
     if (data.imagen) formData.append('imagen', data.imagen);
@@ -114,9 +159,9 @@ export const cabanasService = {
 
   // Reseñas
   async getResenas(cabanaId?: number) {
-    const url = cabanaId ? `/cabanas/resenas/?cabana_id=${cabanaId}` : '/cabanas/resenas/';
+    const url = cabanaId ? `/cabanas/cabanas/${cabanaId}/resenas/` : '/cabanas/resenas/';
     const response = await api.get(url);
-    return response.data as Resena[];
+    return resultados<Resena>(response.data);
   },
 
   async agregarResena(cabanaId: number, data: ResenaCreate) {
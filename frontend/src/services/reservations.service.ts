@@ -1,5 +1,5 @@
 // src/services/reservationService.ts
-import api from '@/lib/api';
+import api, { Paginated, resultados } from '@/lib/api';
 import { ReservationFormData, ReservationResponse, TeamReservationResponse } from '@/types/reservationTypes';
 import { AxiosError } from 'axios';
 import { toSnakeCase } from '@/lib/utils';
@@ -48,8 +48,8 @@ export class ReservationService {
 
   static async getUserReservations(): Promise<ReservationResponse[]> {
     try {
-      const response = await api.get<ReservationResponse[]>('/reservas/');
-      return response.data;
+      const response = await api.get<Paginated<ReservationResponse>>('/reservas/');
+      return resultados(response.data);
     } catch {
       throw new Error('Error al obtener reservaciones');
     }
@@ -65,10 +65,10 @@ export class ReservationService {
 
   static async getReservationsByTeam(teamId: number): Promise<TeamReservationResponse[]> {
     try {
-      const response = await api.get<TeamReservationResponse[]>('/reservas/reservas/por-equipo/', {
+      const response = await api.get<Paginated<TeamReservationResponse>>('/reservas/reservas/por-equipo/', {
         params: { team_id: teamId },
       });
-      return response.data;
+      return resultados(response.data);
     } catch {
       throw new Error('Error al obtener reservaciones del equipo');
     }
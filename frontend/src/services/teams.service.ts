@@ -1,5 +1,5 @@
 // src/services/teams.service.ts
-import api from '@/lib/api';
+import api, { resultados } from '@/lib/api';
 
 interface TeamData {
   name: string;
@@ -14,7 +14,7 @@ interface InviteMemberData {
 export const teamsService = {
   async getMyTeams() {
     const response = await api.get('/teams/teams/my_teams/');
-    return response.data;
+    return resultados(response.data);
   },
 
   async createTeam(data: TeamData) {
@@ -24,7 +24,7 @@ export const teamsService = {
 
   async getTeamMembers(teamId: number) {
     const response = await api.get(`/teams/teams/${teamId}/members/`);
-    return response.data;
+    return resultados(response.data);
   },
 
   async inviteMember(teamId: number, data: InviteMemberData) {
@@ -46,7 +46,7 @@ export const teamsService = {
   
   async getMyInvitations() {
     const response = await api.get('/teams/invitations/my_invitations/');
-    return response.data;
+    return resultados(response.data);
   },
 
   async acceptInvitation(invitationId: number) {
@@ -11,6 +11,7 @@ export interface Servicio {
   export interface ImagenCabana {
     id: number;
     imagen: string;
+    estado?: 'procesando' | 'lista' | 'error';
     es_principal: boolean;
     descripcion?: string;
     orden: number;
@@ -54,6 +55,9 @@ export interface Servicio {
     numero_habitaciones: number;
     numero_banos: number;
     permite_mascotas: boolean;
+    latitud?: number | null;
+    longitud?: number | null;
+    distancia_km?: number | null;
     imagen_principal: string ;
     calificacion_promedio: number;
     total_resenas: number;
@@ -61,12 +65,26 @@ export interface Servicio {
     creada_en: string;
   }
   
+  // Así llegan las cabañas en los listados: servicios como ids y descripcion
+  // recortada; cabanasService los completa con el mapa servicios de la respuesta
+  export type CabanaListado = Omit<CabanaList, 'servicios'> & { servicios: number[] };
+
+  export interface ListadoCabanas {
+    count?: number;
+    next: string | null;
+    previous: string | null;
+    results: CabanaListado[];
+    servicios: Record<number, Servicio>;
+    facets?: Facetas;
+  }
+
   export interface CabanaDetail extends CabanaList {
     reglas_casa?: string;
     hora_checkin: string;
     hora_checkout: string;
     imagenes: ImagenCabana[];
-    resenas: Resena[];
+    resenas: Resena[];  // solo las más recientes
+    resenas_url: string;
     team: Team;
     actualizada_en: string;
   }
@@ -117,9 +135,50 @@ export interface Servicio {
     permite_mascotas?: boolean;
     team?: number;
     search?: string;
+    precio_min?: number;
+    precio_max?: number;
+    servicios?: number[];
+    lat?: number;
+    lng?: number;
+    radio_km?: number;
+    bbox?: [number, number, number, number];
     ordering?: 'costo_por_noche' | '-costo_por_noche' | 'capacidad' | '-capacidad' | 'creada_en' | '-creada_en' | 'calificacion_promedio' | '-calificacion_promedio';
   }
   
+  export interface RangoFaceta {
+    desde: number;
+    hasta: number | null;
+    total: number;
+  }
+
+  export interface Facetas {
+    servicios: { id: number; nombre: string; total: number }[];
+    capacidad: RangoFaceta[];
+    precio: RangoFaceta[];
+    permite_mascotas: { true: number; false: number };
+  }
+
+  export interface GrupoMapa {
+    lat: number;
+    lng: number;
+    total: number;
+  }
+
+  export interface PuntoMapa {
+    id: number;
+    slug: string;
+    lat: number;
+    lng: number;
+    precio: number;
+  }
+
+  // Con poco zoom llegan grupos; desde zoom 14, puntos
+  export interface MapaCabanas {
+    zoom: number;
+    grupos: GrupoMapa[];
+    puntos: PuntoMapa[];
+  }
+
   export interface CabanasState {
     currentCabana: Cabanas | null;
     servicios: Servicio[];